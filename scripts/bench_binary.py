@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Recall and latency of binary first-stage search with float rescoring.
+
+Writes the vectors to a temporary chunk store, builds each binary index
+type over their sign bits and, for a range of rescore factors, compares
+the two-stage results with exact float search (inner product). Reports
+recall@k, ms/query and index size next to the float IndexFlatIP baseline.
+
+Vectors come from the chunk store if one has been built, otherwise they
+are synthetic clustered unit vectors (see bench_quantization.py).
+
+Usage:
+    python scripts/bench_binary.py [--num-vectors 100000] [--num-queries 1000] [--top-k 10]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_quantization import load_vectors, make_queries  # noqa: E402
+from retrieval.binary import (  # noqa: E402
+    SUPPORTED_BINARY_INDEX_TYPES,
+    build_binary_index,
+    search_binary_index,
+)
+from retrieval.store import ChunkStore  # noqa: E402
+
+RESCORE_FACTORS = [0, 1, 2, 5, 10, 20]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-vectors", type=int, default=100_000)
+    parser.add_argument("--num-queries", type=int, default=1000)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    vectors = load_vectors(args.num_vectors, args.seed)
+    queries = make_queries(vectors, min(args.num_queries, len(vectors)), args.seed)
+    n, dimension = vectors.shape
+    print(f"📊 {n} vectors x {dimension} dims, {len(queries)} queries, recall@{args.top_k} vs exact float search\n")
+
+    baseline = faiss.IndexFlatIP(dimension)
+    baseline.add(vectors)
+    start = time.perf_counter()
+    _, reference = baseline.search(queries, args.top_k)
+    baseline_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    baseline_bytes = len(faiss.serialize_index(baseline))
+    print(f"{'index':<12} {'rescore':>7} {'recall':>7} {'ms/query':>9} {'size MB':>8} {'vs float':>9}")
+    print(f"{'flat (float)':<12} {'-':>7} {1.0:7.4f} {baseline_ms:9.3f} {baseline_bytes / 2**20:8.1f} {1.0:8.1f}x")
+
+    chunks = [
+        {"text": str(i), "metadata": {"filename": "bench", "page_number": 1, "chunk_id": i}}
+        for i in range(n)
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ChunkStore.write(vectors, chunks, Path(tmp) / "store")
+        for index_type in SUPPORTED_BINARY_INDEX_TYPES:
+            index = build_binary_index(store, index_type)
+            size = len(faiss.serialize_index_binary(index))
+            for factor in RESCORE_FACTORS:
+                start = time.perf_counter()
+                results = search_binary_index(queries, index, store, args.top_k, rescore_factor=factor)
+                ms = (time.perf_counter() - start) * 1000 / len(queries)
+                hits = [
+                    len({int(r["text"]) for r in row} & set(expected)) / args.top_k
+                    for row, expected in zip(results, reference)
+                ]
+                label = str(factor) if factor else "none"
+                print(f"{index_type:<12} {label:>7} {np.mean(hits):7.4f} {ms:9.3f} "
+                      f"{size / 2**20:8.1f} {baseline_bytes / size:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Parity check and throughput comparison of the embedding backends.
+
+Embeds the same texts with the PyTorch sentence-transformers model
+(reference), the ONNX Runtime fp32 export and the int8-quantized export,
+then reports per-text cosine similarity to the reference, top-10
+neighbour agreement, and texts/second.
+
+Texts come from the chunk store if one has been built, otherwise they are
+synthetic.
+
+Usage:
+    python scripts/bench_embeddings.py [--model all-MiniLM-L6-v2] [--num-texts 2000]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from config import CHUNK_STORE_DIR, EMBEDDING_MODEL_NAME  # noqa: E402
+from components.embeddings import create_embedder  # noqa: E402
+
+# Minimum cosine similarity to the reference for the parity check to pass
+PARITY_THRESHOLDS = {"onnx fp32": 0.9999, "onnx int8": 0.98}
+
+WORDS = (
+    "the model attention layer embedding token sequence retrieval document query "
+    "neural network training loss gradient transformer encoder decoder vector index"
+).split()
+
+
+def load_texts(num_texts: int, seed: int) -> list:
+    try:
+        from retrieval.store import ChunkStore
+        store = ChunkStore(CHUNK_STORE_DIR)
+        ids = store.live_ids()[:num_texts]
+        if len(ids):
+            return [store.text(i) for i in ids]
+    except FileNotFoundError:
+        pass
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 120))) for _ in range(num_texts)]
+
+
+def time_encode(embedder, texts, batch_size):
+    embedder.encode(texts[:batch_size], batch_size=batch_size)  # warm up
+    start = time.perf_counter()
+    embeddings = embedder.encode(texts, batch_size=batch_size, normalize_embeddings=True)
+    return np.asarray(embeddings, dtype=np.float32), time.perf_counter() - start
+
+
+def top_k_agreement(reference, candidate, k=10, num_queries=100):
+    queries = slice(0, min(num_queries, len(reference)))
+    ref_top = np.argsort(-reference[queries] @ reference.T, axis=1)[:, :k]
+    cand_top = np.argsort(-candidate[queries] @ candidate.T, axis=1)[:, :k]
+    return np.mean([len(set(r) & set(c)) / k for r, c in zip(ref_top, cand_top)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=EMBEDDING_MODEL_NAME)
+    parser.add_argument("--num-texts", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=0, help="ONNX Runtime threads (0 = default)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    texts = load_texts(args.num_texts, args.seed)
+    print(f"📊 {len(texts)} texts, model {args.model}\n")
+
+    backends = {
+        "sentence-transformers": lambda: create_embedder("sentence-transformers", model_name=args.model, device="cpu"),
+        "onnx fp32": lambda: create_embedder("onnx", model_name=args.model, quantize=False, num_threads=args.threads),
+        "onnx int8": lambda: create_embedder("onnx", model_name=args.model, quantize=True, num_threads=args.threads),
+    }
+
+    results = {}
+    for name, create in backends.items():
+        embeddings, seconds = time_encode(create(), texts, args.batch_size)
+        results[name] = (embeddings, seconds)
+
+    reference, reference_seconds = results["sentence-transformers"]
+    print(f"{'backend':<22} {'texts/s':>9} {'speedup':>8} {'min cos':>9} {'mean cos':>9} {'top-10':>7}")
+    passed = True
+    for name, (embeddings, seconds) in results.items():
+        cosine = np.sum(reference * embeddings, axis=1)
+        agreement = top_k_agreement(reference, embeddings)
+        status = ""
+        if name in PARITY_THRESHOLDS:
+            ok = cosine.min() >= PARITY_THRESHOLDS[name]
+            passed &= bool(ok)
+            status = "✓" if ok else "⚠️"
+        print(
+            f"{name:<22} {len(texts) / seconds:9.1f} {reference_seconds / seconds:7.2f}x "
+            f"{cosine.min():9.5f} {cosine.mean():9.5f} {agreement:7.3f} {status}"
+        )
+
+    print("\n✓ Parity check passed" if passed else "\n⚠️  Parity check failed")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
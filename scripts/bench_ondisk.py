@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Latency and memory of the on-disk IVF index vs the resident IVF index.
+
+Builds the same IVF-Flat index twice over the same vectors: 'ivf_flat'
+loaded into RAM, and 'ivf_ondisk' whose inverted lists are merged from
+per-batch partial indexes into a file that query processes memory-map.
+For each it reports recall@k vs exact search, the resident memory added
+by loading it and by querying it, and query latency with the page cache
+dropped for the index files (cold) and after a full pass (warm).
+
+Dropping the page cache uses posix_fadvise(DONTNEED), which only evicts
+clean pages; cold numbers are the best case on a busy machine.
+
+Usage:
+    python scripts/bench_ondisk.py [--num-vectors 200000] [--num-queries 1000] [--batch-size 50000]
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from retrieval.indexing import (  # noqa: E402
+    add_in_batches,
+    build_ondisk_lists,
+    configure_search_params,
+    create_index,
+    load_faiss_index,
+    save_index,
+    train_index,
+)
+from bench_quantization import load_vectors, make_queries, recall  # noqa: E402
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def drop_page_cache(directory: Path) -> None:
+    for path in directory.iterdir():
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def timed_queries(index: faiss.Index, queries: np.ndarray, top_k: int):
+    """Per-query latency (one query at a time, like a serving process)."""
+    labels = np.empty((len(queries), top_k), dtype=np.int64)
+    latencies = []
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, labels[i:i + 1] = index.search(query[None, :], top_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return labels, np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-vectors", type=int, default=200_000)
+    parser.add_argument("--num-queries", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=50_000, help="Vectors per partial index")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", type=Path, default=None, help="Where to write the indexes (default: temp dir)")
+    args = parser.parse_args()
+
+    vectors = load_vectors(args.num_vectors, args.seed)
+    queries = make_queries(vectors, min(args.num_queries, len(vectors)), args.seed)
+    n, dimension = vectors.shape
+    ids = np.arange(n, dtype=np.int64)
+
+    exact = faiss.IndexFlatIP(dimension)
+    exact.add(vectors)
+    _, reference = exact.search(queries, args.top_k)
+    del exact
+
+    print(f"📊 {n} vectors x {dimension} dims, {len(queries)} queries, recall@{args.top_k} vs exact search\n")
+    print(f"{'index':<11} {'build s':>8} {'recall':>7} {'file MB':>8} {'load MB':>8} {'query MB':>9} "
+          f"{'cold p50':>9} {'cold p99':>9} {'warm p50':>9} {'warm p99':>9}")
+
+    with tempfile.TemporaryDirectory(dir=args.work_dir) as tmp:
+        for index_type in ("ivf_flat", "ivf_ondisk"):
+            directory = Path(tmp) / index_type
+            directory.mkdir()
+            path = directory / "vectors.index"
+            index = create_index(dimension, index_type, num_vectors=n)
+            train_index(index, vectors)
+            start = time.perf_counter()
+            if index_type == "ivf_ondisk":
+                build_ondisk_lists(index, vectors, ids, directory / "staging.ivfdata", batch_size=args.batch_size)
+            else:
+                add_in_batches(index, vectors, ids, batch_size=args.batch_size)
+            save_index(configure_search_params(index), path)
+            build_s = time.perf_counter() - start
+            del index
+            gc.collect()
+            file_mb = sum(p.stat().st_size for p in directory.iterdir()) / 2**20
+
+            drop_page_cache(directory)
+            before = rss_mb()
+            index = load_faiss_index(path, mmap=index_type == "ivf_ondisk")
+            loaded = rss_mb()
+            _, cold = timed_queries(index, queries, args.top_k)
+            labels, warm = timed_queries(index, queries, args.top_k)
+            queried = rss_mb()
+
+            print(f"{index_type:<11} {build_s:8.1f} {recall(reference, labels):7.4f} {file_mb:8.1f} "
+                  f"{loaded - before:8.1f} {queried - loaded:9.1f} {np.percentile(cold, 50):9.3f} {np.percentile(cold, 99):9.3f} "
+                  f"{np.percentile(warm, 50):9.3f} {np.percentile(warm, 99):9.3f}")
+            del index
+            gc.collect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Recall-vs-memory report of the reduced-precision index types.
+
+Builds every index type over the same vectors and compares its top-k
+results with the exact float32 IndexFlatL2 baseline. For each type it
+reports recall@k, serialized index size (bytes per vector and total) and
+query latency. The vector store itself is compared the same way, searching
+float32 vs float16 copies of the vectors exactly.
+
+Vectors come from the chunk store if one has been built, otherwise they
+are synthetic clustered unit vectors of the embedding dimension. Queries
+are corpus vectors with noise added, so they have close but not identical
+neighbours.
+
+Usage:
+    python scripts/bench_quantization.py [--num-vectors 100000] [--num-queries 1000] [--top-k 10]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from config import CHUNK_STORE_DIR  # noqa: E402
+from retrieval.indexing import (  # noqa: E402
+    SUPPORTED_INDEX_TYPES,
+    add_in_batches,
+    configure_search_params,
+    create_index,
+    train_index,
+)
+
+SYNTHETIC_DIMENSION = 384
+
+
+def load_vectors(num_vectors: int, seed: int) -> np.ndarray:
+    try:
+        from retrieval.store import ChunkStore
+        store = ChunkStore(CHUNK_STORE_DIR)
+        ids = store.live_ids()[:num_vectors]
+        if len(ids):
+            return np.ascontiguousarray(store.embeddings[ids], dtype=np.float32)
+    except FileNotFoundError:
+        pass
+    # Real embeddings are far from uniform; clusters keep the benchmark honest
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(num_vectors // 100, 1), SYNTHETIC_DIMENSION))
+    vectors = centers[rng.integers(len(centers), size=num_vectors)]
+    vectors += 0.6 * rng.normal(size=vectors.shape)
+    return _normalize(vectors.astype(np.float32))
+
+
+def make_queries(vectors: np.ndarray, num_queries: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed + 1)
+    queries = vectors[rng.choice(len(vectors), size=num_queries, replace=False)]
+    return _normalize(queries + 0.05 * rng.normal(size=queries.shape).astype(np.float32))
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def recall(reference: np.ndarray, labels: np.ndarray) -> float:
+    k = reference.shape[1]
+    return float(np.mean([len(set(r) & set(c)) / k for r, c in zip(reference, labels)]))
+
+
+def timed_search(index: faiss.Index, queries: np.ndarray, top_k: int):
+    start = time.perf_counter()
+    _, labels = index.search(queries, top_k)
+    return labels, (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-vectors", type=int, default=100_000)
+    parser.add_argument("--num-queries", type=int, default=1000)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    vectors = load_vectors(args.num_vectors, args.seed)
+    queries = make_queries(vectors, min(args.num_queries, len(vectors)), args.seed)
+    n, dimension = vectors.shape
+    print(f"📊 {n} vectors x {dimension} dims, {len(queries)} queries, recall@{args.top_k} vs IndexFlatL2\n")
+
+    baseline = faiss.IndexFlatL2(dimension)
+    baseline.add(vectors)
+    reference, baseline_ms = timed_search(baseline, queries, args.top_k)
+    baseline_bytes = len(faiss.serialize_index(baseline))
+
+    print(f"{'index':<10} {'recall':>7} {'bytes/vec':>10} {'size MB':>9} {'vs flat':>8} {'ms/query':>9}")
+    print(f"{'flat (L2)':<10} {1.0:7.4f} {baseline_bytes / n:10.1f} {baseline_bytes / 2**20:9.1f} "
+          f"{1.0:7.2f}x {baseline_ms:9.3f}")
+
+    for index_type in SUPPORTED_INDEX_TYPES:
+        if index_type in ("flat", "ivf_ondisk"):
+            continue  # ivf_ondisk holds ivf_flat codes; see bench_ondisk.py
+        index = create_index(dimension, index_type, num_vectors=n)
+        train_index(index, vectors)
+        add_in_batches(index, vectors)
+        configure_search_params(index)
+        labels, ms = timed_search(index, queries, args.top_k)
+        size = len(faiss.serialize_index(index))
+        print(f"{index_type:<10} {recall(reference, labels):7.4f} {size / n:10.1f} {size / 2**20:9.1f} "
+              f"{baseline_bytes / size:7.2f}x {ms:9.3f}")
+
+    # Chunk store dtype: exact search over float16-rounded vectors
+    half = vectors.astype(np.float16)
+    store_index = faiss.IndexFlatL2(dimension)
+    store_index.add(half.astype(np.float32))
+    labels, _ = timed_search(store_index, queries, args.top_k)
+    print(f"\nChunk store embeddings.npy: float32 {vectors.nbytes / 2**20:.1f} MB, "
+          f"float16 {half.nbytes / 2**20:.1f} MB, float16 recall@{args.top_k} {recall(reference, labels):.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Throughput and latency of the query server under concurrent load.
+
+Runs against a server started with `python src/main.py serve`. For each
+concurrency level, that many clients send /retrieve requests back to back
+over keep-alive connections for a fixed duration. The report shows
+requests per second, latency percentiles and the server's mean batch
+size. With micro-batching, throughput should rise with concurrency
+instead of staying flat.
+
+Queries are distinct, so the query embedding cache does not hide the
+cost of encoding.
+
+Usage:
+    python scripts/bench_server.py [--url http://127.0.0.1:8000] [--concurrency 1 4 16 64] [--duration 10]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+WORDS = (
+    "contract termination clause payment schedule warranty liability insurance report revenue "
+    "quarter forecast policy compliance audit safety procedure maintenance equipment training"
+).split()
+
+
+async def request(reader, writer, host: str, method: str, path: str, payload=None):
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def client(host: str, port: int, queries, deadline: float, top_k: int, latencies: list, errors: list):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            payload = {"query": next(queries), "top_k": top_k}
+            status, _ = await request(reader, writer, host, "POST", "/retrieve", payload)
+            if status == 200:
+                latencies.append((time.perf_counter() - start) * 1000)
+            else:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def server_stats(host: str, port: int) -> dict:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        return (await request(reader, writer, host, "GET", "/ready"))[1]
+    finally:
+        writer.close()
+
+
+async def run(args):
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    while not (await server_stats(host, port)).get("ready"):
+        print("Waiting for the server to warm up...")
+        await asyncio.sleep(1)
+
+    rng = np.random.default_rng(args.seed)
+    counter = itertools.count()
+    queries = (f"{' '.join(rng.choice(WORDS, size=6))} {next(counter)}" for _ in itertools.count())
+
+    print(f"📊 /retrieve top_k={args.top_k}, {args.duration:g}s per level\n")
+    print(f"{'clients':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'batch':>6}")
+    for concurrency in args.concurrency:
+        before = await server_stats(host, port)
+        latencies, errors = [], []
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(
+            client(host, port, queries, deadline, args.top_k, latencies, errors) for _ in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - start
+        after = await server_stats(host, port)
+        batches = after["batches"] - before["batches"]
+        batch_size = len(latencies) / batches if batches else 0.0
+        print(f"{concurrency:>8} {len(latencies) / elapsed:8.1f} {np.percentile(latencies, 50):8.2f} "
+              f"{np.percentile(latencies, 99):8.2f} {len(errors):>7} {batch_size:6.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", type=str, default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per concurrency level")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
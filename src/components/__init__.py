@@ -1,7 +1,8 @@
 # Components package
-from .llm import BaseLLM, LocalLLM, OpenAILLM, LLMFactory, create_llm
+from .llm import BaseLLM, LocalLLM, OpenAILLM, LLMFactory, create_llm, BatchedLLM
 from .vectorstore import BaseVectorStore, FAISSVectorStore
 from .data import BaseDataSource, PDFDataSource
+from .embeddings import BaseEmbedder, EmbedderFactory, create_embedder
 
 __all__ = [
     "BaseLLM",
@@ -9,8 +10,12 @@ __all__ = [
     "OpenAILLM",
     "LLMFactory",
     "create_llm",
+    "BatchedLLM",
     "BaseVectorStore",
     "FAISSVectorStore",
     "BaseDataSource",
     "PDFDataSource",
+    "BaseEmbedder",
+    "EmbedderFactory",
+    "create_embedder",
 ]
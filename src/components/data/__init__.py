@@ -1,8 +1,14 @@
 # Data sources package
 from .base import BaseDataSource
 from .pdf import PDFDataSource
+from .manifest import Manifest, file_hash
+from .dedup import ChunkDeduplicator, DuplicateMap
 
 __all__ = [
     "BaseDataSource",
     "PDFDataSource",
+    "Manifest",
+    "file_hash",
+    "ChunkDeduplicator",
+    "DuplicateMap",
 ]
@@ -0,0 +1,359 @@
+"""
+Exact and near-duplicate chunk elimination between chunking and embedding.
+
+Exact duplicates are found by hashing normalized chunk text. Near
+duplicates (boilerplate with small edits, the same appendix in two versions
+of a document) are found with MinHash signatures over character shingles,
+bucketed with locality-sensitive hashing (LSH) so each chunk is only
+compared against likely matches.
+
+Only the first (canonical) copy of a chunk is kept; every dropped copy is
+recorded in a DuplicateMap so citations can still point at all the places
+the text appears.
+
+A chunk's fingerprint (exact digest, MinHash signature and LSH band keys)
+can be stored with it, so later runs find the stored chunks a new chunk
+may duplicate without hashing the corpus again (see matching_rows).
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import (
+    DUPLICATES_PATH,
+    DEDUP_THRESHOLD,
+    DEDUP_NUM_PERM,
+    DEDUP_BANDS,
+    DEDUP_SHINGLE_SIZE,
+)
+
+# Universal hashing h(x) = (a * x + b) mod p with p = 2^31 - 1, so every
+# product stays within uint64
+_PRIME = np.uint64((1 << 31) - 1)
+_SHINGLE_BASE = 257
+
+# Stored rows are scanned for candidates in blocks of this many rows
+_MATCH_BLOCK_ROWS = 1 << 18
+
+# (digests, signatures, band keys) arrays of a batch of chunks
+Fingerprints = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def chunk_key(metadata: Dict) -> str:
+    """Location key of a chunk: 'filename:page_number:chunk_id'."""
+    return f"{metadata['filename']}:{metadata['page_number']}:{metadata['chunk_id']}"
+
+
+def _normalize(text: str) -> Tuple[str, np.ndarray]:
+    """Case- and whitespace-normalized text, and its exact-match digest (2 uint64)."""
+    text = " ".join(text.lower().split())
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+    return text, np.frombuffer(digest, dtype=np.uint64)
+
+
+class DuplicateMap:
+    """
+    Mapping of canonical chunk key -> locations of its dropped duplicates.
+
+    Args:
+        entries: Initial {chunk key: [duplicate metadata, ...]} entries
+    """
+
+    def __init__(self, entries: Optional[Dict[str, List[Dict]]] = None):
+        self.entries: Dict[str, List[Dict]] = entries or {}
+
+    @classmethod
+    def load(cls, path: Path = DUPLICATES_PATH) -> "DuplicateMap":
+        """Load a duplicate map, or return an empty one if none exists."""
+        path = Path(path)
+        if not path.exists():
+            return cls()
+        return cls(json.loads(path.read_text(encoding="utf-8")))
+
+    def save(self, path: Path = DUPLICATES_PATH) -> None:
+        """Persist the duplicate map atomically."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(json.dumps(self.entries), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def add(self, duplicate: Dict, canonical: Dict) -> None:
+        """Record that the chunk at duplicate repeats the one at canonical."""
+        location = {k: duplicate[k] for k in ("filename", "page_number", "chunk_id")}
+        self.entries.setdefault(chunk_key(canonical), []).append(location)
+
+    def get(self, metadata: Dict) -> List[Dict]:
+        """Locations of the duplicates of a canonical chunk."""
+        return self.entries.get(chunk_key(metadata), [])
+
+    def remove_files(self, filenames: Iterable[str]) -> List[Dict]:
+        """
+        Forget the chunks of files that are re-ingested or deleted.
+
+        Duplicate locations in those files are dropped. Entries whose
+        canonical chunk is in one of them are removed as well, and their
+        remaining duplicates are returned: no stored chunk holds their text
+        any more, so they have to be ingested in its place.
+
+        Returns:
+            Locations of the orphaned duplicates
+        """
+        filenames = set(filenames)
+        orphans = []
+        for key in list(self.entries):
+            locations = [loc for loc in self.entries[key] if loc["filename"] not in filenames]
+            if key.rsplit(":", 2)[0] in filenames:
+                orphans.extend(locations)
+                del self.entries[key]
+            elif locations:
+                self.entries[key] = locations
+            else:
+                del self.entries[key]
+        return orphans
+
+    def __len__(self) -> int:
+        return sum(len(locations) for locations in self.entries.values())
+
+
+class ChunkDeduplicator:
+    """
+    Streaming exact + MinHash/LSH near-duplicate filter for chunks.
+
+    Chunks are checked in order against everything kept so far, so the
+    first copy seen is the canonical one.
+
+    Args:
+        threshold: Min estimated Jaccard similarity for a near duplicate
+        num_perm: MinHash signature length
+        bands: LSH bands; num_perm must be divisible by it
+        shingle_size: Characters per shingle
+        seed: Seed for the MinHash permutations
+        duplicates: Duplicate map to record into (default: a new one)
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEDUP_THRESHOLD,
+        num_perm: int = DEDUP_NUM_PERM,
+        bands: int = DEDUP_BANDS,
+        shingle_size: int = DEDUP_SHINGLE_SIZE,
+        seed: int = 0,
+        duplicates: Optional[DuplicateMap] = None,
+    ):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_PRIME), size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, int(_PRIME), size=(num_perm, 1), dtype=np.uint64)
+        self._powers = np.array([_SHINGLE_BASE ** i for i in range(shingle_size)], dtype=np.uint64)
+        # Odd multipliers for the band keys, which are stored and so must not use hash()
+        self._band_weights = rng.integers(1, 1 << 63, size=self.rows, dtype=np.uint64) | np.uint64(1)
+        self.seed = seed
+
+        self._exact: Dict[bytes, Dict] = {}
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in range(bands)]
+        self._signatures: List[np.ndarray] = []
+        self._canonical: List[Dict] = []
+
+        self.duplicates = duplicates if duplicates is not None else DuplicateMap()
+        self.num_exact = 0
+        self.num_near = 0
+
+    @property
+    def params(self) -> Dict[str, int]:
+        """Settings a stored fingerprint depends on; fingerprints only compare under equal params."""
+        return {
+            "num_perm": self.num_perm,
+            "bands": self.bands,
+            "shingle_size": self.shingle_size,
+            "seed": self.seed,
+        }
+
+    def check(self, chunk: Dict) -> Optional[Dict]:
+        """
+        Check a chunk against the chunks kept so far.
+
+        Returns:
+            Metadata of the canonical chunk if this one is a duplicate
+            (and records it), otherwise None (and keeps the chunk)
+        """
+        return self._check(chunk["metadata"], *self.fingerprint(chunk["text"]))
+
+    def add(self, chunk: Dict) -> None:
+        """Register an already kept chunk (e.g. from an existing store) as canonical."""
+        self.add_fingerprint(chunk["metadata"], *self.fingerprint(chunk["text"]))
+
+    def add_fingerprint(self, metadata: Dict, digest: np.ndarray, signature: np.ndarray, band_keys: np.ndarray) -> None:
+        """Register a kept chunk as canonical from its stored fingerprint."""
+        self._keep(metadata, digest, signature, band_keys)
+
+    def fingerprint(self, text: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Exact digest, MinHash signature and LSH band keys of a chunk text.
+
+        Texts too short for a shingle get an all-zero signature and band
+        keys; computed band keys are never zero.
+
+        Returns:
+            (digest (2,) uint64, signature (num_perm,) uint32, band keys (bands,) uint64)
+        """
+        text, digest = _normalize(text)
+        signature = self._signature(text)
+        if signature is None:
+            return digest, np.zeros(self.num_perm, dtype=np.uint32), np.zeros(self.bands, dtype=np.uint64)
+        return digest, signature, self._band_keys(signature)
+
+    def fingerprints(self, chunks: Sequence[Dict]) -> Fingerprints:
+        """fingerprint() of several chunks, stacked into (digests, signatures, band keys) arrays."""
+        rows = [self.fingerprint(chunk["text"]) for chunk in chunks]
+        if not rows:
+            return (
+                np.empty((0, 2), dtype=np.uint64),
+                np.empty((0, self.num_perm), dtype=np.uint32),
+                np.empty((0, self.bands), dtype=np.uint64),
+            )
+        return tuple(np.stack(column) for column in zip(*rows))
+
+    def deduplicate_fingerprinted(self, chunks: Sequence[Dict], fingerprints: Fingerprints) -> np.ndarray:
+        """
+        deduplicate() for chunks whose fingerprints() were already computed.
+
+        Returns:
+            Boolean mask of the chunks that are kept
+        """
+        return np.array(
+            [self._check(chunk["metadata"], *row) is None for chunk, row in zip(chunks, zip(*fingerprints))],
+            dtype=bool,
+        )
+
+    def matching_rows(self, fingerprints: Fingerprints, stored: Fingerprints) -> np.ndarray:
+        """
+        Rows of stored fingerprints that may duplicate any of the given ones.
+
+        A row matches if it shares an exact digest or an LSH band key, which
+        is all check() compares against. Stored rows are scanned in blocks
+        with vectorized lookups, so this needs no per-row hashing or memory
+        proportional to the store.
+
+        Args:
+            fingerprints: Fingerprints of the new chunks
+            stored: Fingerprints of the stored chunks, one row per store row
+                (e.g. memory-mapped)
+
+        Returns:
+            Matching row ids, ascending
+        """
+        digests, _, band_keys = fingerprints
+        stored_digests, _, stored_band_keys = stored
+        digest_keys = np.unique(digests[:, 0])
+        band_key_sets = [np.unique(keys[keys != 0]) for keys in band_keys.T]
+
+        rows = []
+        for start in range(0, len(stored_digests), _MATCH_BLOCK_ROWS):
+            end = start + _MATCH_BLOCK_ROWS
+            # Matching the first digest word only lets a few extra rows through; check() compares the rest
+            mask = _isin_sorted(stored_digests[start:end, 0], digest_keys)
+            block = np.asarray(stored_band_keys[start:end])
+            for band, keys in enumerate(band_key_sets):
+                mask |= _isin_sorted(block[:, band], keys)
+            rows.append(start + np.flatnonzero(mask))
+        return np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+
+    def iter_unique(self, chunks: Iterable[Dict]) -> Iterator[Dict]:
+        """Lazily yield only the chunks that are not duplicates."""
+        for chunk in chunks:
+            if self.check(chunk) is None:
+                yield chunk
+
+    def deduplicate(self, chunks: Iterable[Dict]) -> List[Dict]:
+        """Return the chunks that are not duplicates, in order."""
+        return list(self.iter_unique(chunks))
+
+    def stats(self) -> Dict[str, int]:
+        """Counts of kept and dropped chunks."""
+        return {
+            "kept": len(self._exact),
+            "exact_duplicates": self.num_exact,
+            "near_duplicates": self.num_near,
+        }
+
+    # ----------------------------
+    # MinHash / LSH
+    # ----------------------------
+
+    def _signature(self, text: str) -> Optional[np.ndarray]:
+        """MinHash signature of the text's character shingles (None if too short)."""
+        data = np.frombuffer(text.encode("utf-8"), dtype=np.uint8)
+        if len(data) < self.shingle_size:
+            return None
+        windows = np.lib.stride_tricks.sliding_window_view(data, self.shingle_size)
+        shingles = np.unique(windows.astype(np.uint64) @ self._powers) % _PRIME
+        return ((self._a * shingles + self._b) % _PRIME).min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> np.ndarray:
+        """One key per band, a multiply-add hash of its rows; odd, so never zero."""
+        band_rows = signature.reshape(self.bands, self.rows).astype(np.uint64)
+        return (band_rows * self._band_weights).sum(axis=1, dtype=np.uint64) | np.uint64(1)
+
+    def _near_duplicate(self, signature: np.ndarray, band_keys: np.ndarray) -> Optional[Dict]:
+        """Return the most similar kept chunk above the threshold, if any."""
+        candidates = set()
+        for band, key in enumerate(band_keys.tolist()):
+            candidates.update(self._buckets[band].get(key, ()))
+
+        best, best_similarity = None, self.threshold
+        for candidate in candidates:
+            similarity = float(np.mean(self._signatures[candidate] == signature))
+            if similarity >= best_similarity:
+                best, best_similarity = candidate, similarity
+        return None if best is None else self._canonical[best]
+
+    def _check(
+        self, metadata: Dict, digest: np.ndarray, signature: np.ndarray, band_keys: np.ndarray
+    ) -> Optional[Dict]:
+        canonical = self._exact.get(digest.tobytes())
+        if canonical is not None:
+            self.num_exact += 1
+            self.duplicates.add(metadata, canonical)
+            return canonical
+
+        if band_keys[0]:
+            canonical = self._near_duplicate(signature, band_keys)
+            if canonical is not None:
+                self.num_near += 1
+                self.duplicates.add(metadata, canonical)
+                return canonical
+
+        self._keep(metadata, digest, signature, band_keys)
+        return None
+
+    def _keep(self, metadata: Dict, digest: np.ndarray, signature: np.ndarray, band_keys: np.ndarray) -> None:
+        self._exact.setdefault(digest.tobytes(), metadata)
+        if not band_keys[0]:
+            return  # Too short for a signature
+        position = len(self._signatures)
+        self._signatures.append(signature)
+        self._canonical.append(metadata)
+        for band, key in enumerate(band_keys.tolist()):
+            self._buckets[band].setdefault(key, []).append(position)
+
+
+def _isin_sorted(values: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """np.isin(values, keys) for sorted unique keys, in O(len(values) * log(len(keys)))."""
+    if len(keys) == 0:
+        return np.zeros(len(values), dtype=bool)
+    positions = np.minimum(np.searchsorted(keys, values), len(keys) - 1)
+    return keys[positions] == values
@@ -5,27 +5,67 @@ Data processing utilities for chunking and organizing data.
 from typing import List, Dict
 from pathlib import Path
 
-from config import PROCESSED_DIR, CHUNK_SIZE, CHUNK_OVERLAP
-from utils import load_pickle, save_pickle, chunk_text
+from config import (
+    PROCESSED_DIR,
+    DUPLICATES_PATH,
+    DEDUP_ENABLED,
+    CHUNKING_STRATEGY,
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
+    CHUNK_MAX_TOKENS,
+    CHUNK_OVERLAP_TOKENS,
+    EMBEDDING_MODEL_NAME,
+)
+from utils import load_pickle, save_pickle, chunk_text, chunk_texts_by_tokens
+from components.embeddings.base import load_tokenizer
+from .dedup import ChunkDeduplicator, DuplicateMap
 
+SUPPORTED_CHUNKING_STRATEGIES = ["chars", "tokens"]
 
-def chunk_pdf_page_data(page_data: List[Dict], filename: str) -> List[Dict]:
+
+def get_chunk_tokenizer(model_name: str = EMBEDDING_MODEL_NAME):
+    """Load (once) the fast tokenizer of the embedding model."""
+    return load_tokenizer(model_name)
+
+
+def chunk_pdf_page_data(
+    page_data: List[Dict],
+    filename: str,
+    strategy: str = CHUNKING_STRATEGY
+) -> List[Dict]:
     """
     Convert page-level data into chunks with metadata.
 
     Args:
         page_data: List of dicts with page number and text
         filename: Source filename for metadata
+        strategy: 'chars' (fixed CHUNK_SIZE windows) or 'tokens'
+            (sentence-aligned chunks within CHUNK_MAX_TOKENS)
 
     Returns:
         List of chunked data with metadata
     """
+    texts = [page["text"] for page in page_data]
+
+    if strategy == "chars":
+        pages_chunks = [chunk_text(text, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP) for text in texts]
+    elif strategy == "tokens":
+        tokenizer = get_chunk_tokenizer()
+        # The budget covers the [CLS]/[SEP]-style tokens the model adds
+        max_tokens = CHUNK_MAX_TOKENS - tokenizer.num_special_tokens_to_add()
+        pages_chunks = chunk_texts_by_tokens(
+            texts, tokenizer, max_tokens=max_tokens, overlap_tokens=CHUNK_OVERLAP_TOKENS
+        )
+    else:
+        raise ValueError(
+            f"Unsupported chunking strategy '{strategy}'. "
+            f"Supported: {SUPPORTED_CHUNKING_STRATEGIES}"
+        )
+
     all_chunks = []
 
-    for page in page_data:
+    for page, page_chunks in zip(page_data, pages_chunks):
         page_number = page["page_number"]
-        text = page["text"]
-        page_chunks = chunk_text(text, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP)
         for i, chunk in enumerate(page_chunks, start=1):
             all_chunks.append({
                 "text": chunk,
@@ -38,16 +78,21 @@ def chunk_pdf_page_data(page_data: List[Dict], filename: str) -> List[Dict]:
     return all_chunks
 
 
-def process_all_pickles() -> None:
+def process_all_pickles(dedup: bool = DEDUP_ENABLED) -> None:
     """
     Load all pickled PDFs in PROCESSED_DIR/pickle/ and generate chunks.
     Save all chunks in PROCESSED_DIR/chunks/
+
+    Args:
+        dedup: Drop exact and near-duplicate chunks, recording where each
+            dropped copy came from in DUPLICATES_PATH
     """
     pickle_dir = PROCESSED_DIR / "pickle"
     chunks_dir = PROCESSED_DIR / "chunks"
     chunks_dir.mkdir(parents=True, exist_ok=True)
 
-    pickle_files = list(pickle_dir.glob("*.pkl"))
+    # Sorted so the canonical copy of a duplicate is the same on every run
+    pickle_files = sorted(pickle_dir.glob("*.pkl"))
     all_chunks = []
 
     for pkl_file in pickle_files:
@@ -55,6 +100,18 @@ def process_all_pickles() -> None:
         chunks = chunk_pdf_page_data(page_data, pkl_file.stem)
         all_chunks.extend(chunks)
 
+    duplicates = DuplicateMap()
+    if dedup:
+        deduplicator = ChunkDeduplicator()
+        all_chunks = deduplicator.deduplicate(all_chunks)
+        duplicates = deduplicator.duplicates
+        stats = deduplicator.stats()
+        print(
+            f"Dropped {stats['exact_duplicates']} exact and "
+            f"{stats['near_duplicates']} near-duplicate chunks"
+        )
+    duplicates.save(DUPLICATES_PATH)
+
     # Save all chunks to a single pickle in chunks folder
     save_pickle(
         directory=chunks_dir,
@@ -0,0 +1,96 @@
+"""
+Ingestion manifest: content hash and chunk ids of every ingested PDF.
+
+Lets the pipeline work out which documents were added, changed or removed
+since the last run, so only those are re-parsed, re-chunked and re-embedded.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config import MANIFEST_PATH
+
+
+def file_hash(path: Path, block_size: int = 1 << 20) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """
+    Mapping of document name -> {"hash": content hash, "ids": chunk ids}.
+
+    Document names are PDF stems, matching the 'filename' chunk metadata;
+    chunk ids are chunk store row ids, which are also the FAISS ids.
+
+    Args:
+        documents: Initial manifest entries
+    """
+
+    def __init__(self, documents: Optional[Dict[str, Dict]] = None):
+        self.documents: Dict[str, Dict] = documents or {}
+
+    @classmethod
+    def load(cls, path: Path = MANIFEST_PATH) -> "Manifest":
+        """Load the manifest, or return an empty one if none exists yet."""
+        path = Path(path)
+        if not path.exists():
+            return cls()
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return cls(data.get("documents", {}))
+
+    def save(self, path: Path = MANIFEST_PATH) -> None:
+        """Persist the manifest atomically."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(json.dumps({"documents": self.documents}), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def diff(self, hashes: Dict[str, str]) -> tuple[List[str], List[str], List[str]]:
+        """
+        Compare current document hashes with the manifest.
+
+        Args:
+            hashes: Document name -> content hash for the current corpus
+
+        Returns:
+            (added, changed, removed) document names, each sorted
+        """
+        added = sorted(name for name in hashes if name not in self.documents)
+        changed = sorted(
+            name for name, digest in hashes.items()
+            if name in self.documents and self.documents[name]["hash"] != digest
+        )
+        removed = sorted(name for name in self.documents if name not in hashes)
+        return added, changed, removed
+
+    def ids(self, name: str) -> List[int]:
+        """Chunk ids recorded for a document."""
+        entry = self.documents.get(name)
+        return list(entry["ids"]) if entry else []
+
+    def live_ids(self) -> List[int]:
+        """Chunk ids of every document in the manifest."""
+        return sorted(i for entry in self.documents.values() for i in entry["ids"])
+
+    def update(self, name: str, digest: str, ids: List[int]) -> None:
+        """Record (or replace) a document's hash and chunk ids."""
+        self.documents[name] = {"hash": digest, "ids": [int(i) for i in ids]}
+
+    def remove(self, name: str) -> None:
+        """Forget a document."""
+        self.documents.pop(name, None)
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.documents
@@ -1,8 +1,11 @@
 import fitz
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional, Tuple
 
-from config import PDF_DIR, PROCESSED_DIR
+from config import PDF_DIR, PROCESSED_DIR, PDF_WORKERS, PDF_PAGES_PER_TASK
 from utils import save_pickle, clean_text
 from .base import BaseDataSource
 from components.storage.supabase import SupabaseStorage
@@ -11,16 +14,19 @@ from components.storage.supabase import SupabaseStorage
 class PDFDataSource(BaseDataSource):
     """Data source for PDF files."""
 
-    def __init__(self, pdf_dir: Path = PDF_DIR):
+    def __init__(self, pdf_dir: Path = PDF_DIR, workers: int = PDF_WORKERS):
         """
         Initialize PDF data source.
 
         Args:
             pdf_dir: Directory containing PDF files
+            workers: Processes used to parse PDFs (1 = parse in-process)
         """
         self.pdf_dir = Path(pdf_dir)
+        self.workers = workers
         self.pickle_dir = PROCESSED_DIR / "pickle"
         self.txt_dir = PROCESSED_DIR / "txt"
+        self.failed: Dict[str, str] = {}
         self.supabase = SupabaseStorage()
 
     def sync(self, prefix: str = "", overwrite: bool = True) -> None:
@@ -47,25 +53,127 @@ class PDFDataSource(BaseDataSource):
         Returns:
             List of dictionaries with page number and cleaned text
         """
-        page_data = []
-        with fitz.open(pdf_path) as doc:
-            for page_number, page in enumerate(doc, start=1):
-                raw_text = page.get_text()
-                cleaned_text = clean_text(raw_text)
-                if cleaned_text.strip():
-                    page_data.append({
-                        "page_number": page_number,
-                        "text": cleaned_text
-                    })
-        return page_data
+        return extract_page_range(pdf_path)
+
+    def extract_all(self, pdf_files: List[Path]) -> Iterator[Tuple[Path, List[Dict]]]:
+        """
+        Extract pages from many PDFs, spreading the work over self.workers processes.
+
+        PDFs longer than PDF_PAGES_PER_TASK pages are split into page ranges
+        so one large file does not serialize the run. Results are yielded in
+        the order of pdf_files regardless of completion order. A PDF that
+        fails to parse is skipped and recorded in self.failed.
+
+        Yields:
+            (pdf_file, pages) for every PDF that parsed successfully
+        """
+        self.failed = {}
+
+        if self.workers <= 1:
+            for pdf_file in pdf_files:
+                try:
+                    yield pdf_file, extract_page_range(pdf_file)
+                except Exception as e:
+                    self._record_failure(pdf_file, e)
+            return
+
+        yield from self._extract_in_pool(pdf_files)
+
+    def _extract_in_pool(self, pdf_files: List[Path]) -> Iterator[Tuple[Path, List[Dict]]]:
+        """
+        extract_all() over a process pool.
+
+        Workers count each PDF's pages and then extract its page ranges. A
+        bounded window of both is kept in flight, collected in submission
+        order, so memory does not grow with the corpus. If a worker dies
+        (e.g. a segfault or OOM on a malformed PDF), the pool is replaced
+        and everything it lost is resubmitted; the task being waited on is
+        first retried alone, so only a PDF that crashes a worker on its own
+        is recorded as failed.
+        """
+        max_in_flight = self.workers * 2
+        files = iter(pdf_files)
+        counts = deque()     # (pdf_file, page count future), in file order
+        ranges = deque()     # (pdf_file, start, end, is_last) awaiting submission
+        in_flight = deque()  # ((pdf_file, start, end, is_last), future), in submission order
+        executor = ProcessPoolExecutor(max_workers=self.workers)
+
+        def restart():
+            nonlocal executor
+            executor.shutdown(wait=False, cancel_futures=True)
+            executor = ProcessPoolExecutor(max_workers=self.workers)
+            for _ in range(len(counts)):
+                pdf_file, _ = counts.popleft()
+                counts.append((pdf_file, executor.submit(count_pages, pdf_file)))
+            for _ in range(len(in_flight)):
+                task, _ = in_flight.popleft()
+                in_flight.append((task, executor.submit(extract_page_range, *task[:3])))
+
+        def result(future, fn, *args):
+            try:
+                return future.result()
+            except BrokenProcessPool:
+                pass
+            # Any task in the broken pool may have killed it: retry this one alone
+            executor.shutdown(wait=False, cancel_futures=True)
+            try:
+                with ProcessPoolExecutor(max_workers=1) as solo:
+                    return solo.submit(fn, *args).result()
+            finally:
+                restart()
+
+        def refill():
+            while len(in_flight) < max_in_flight:
+                while len(counts) < max_in_flight:
+                    pdf_file = next(files, None)
+                    if pdf_file is None:
+                        break
+                    counts.append((pdf_file, executor.submit(count_pages, pdf_file)))
+                if not ranges:
+                    if not counts:
+                        return
+                    pdf_file, future = counts.popleft()
+                    try:
+                        page_count = result(future, count_pages, pdf_file)
+                    except Exception as e:
+                        self._record_failure(pdf_file, e)
+                        continue
+                    spans = _page_ranges(page_count, PDF_PAGES_PER_TASK)
+                    ranges.extend(
+                        (pdf_file, start, end, i == len(spans) - 1) for i, (start, end) in enumerate(spans)
+                    )
+                task = ranges.popleft()
+                in_flight.append((task, executor.submit(extract_page_range, *task[:3])))
+
+        try:
+            refill()
+            pages: List[Dict] = []
+            failed = False
+            while in_flight:
+                (pdf_file, start, end, is_last), future = in_flight.popleft()
+                if not failed:
+                    try:
+                        pages.extend(result(future, extract_page_range, pdf_file, start, end))
+                    except Exception as e:
+                        failed = True
+                        self._record_failure(pdf_file, e)
+                else:
+                    future.cancel()
+                refill()
+
+                if is_last:
+                    if not failed:
+                        yield pdf_file, pages
+                    pages, failed = [], False
+        finally:
+            executor.shutdown(cancel_futures=True)
 
     def load(self) -> List[Dict]:
         """Load and extract text from all PDFs in the directory."""
         all_pages = []
-        pdf_files = list(self.pdf_dir.glob("*.pdf"))
+        pdf_files = sorted(self.pdf_dir.glob("*.pdf"))
         
-        for pdf_file in pdf_files:
-            pages = self.extract_text_with_metadata(pdf_file)
+        for _, pages in self.extract_all(pdf_files):
             all_pages.extend(pages)
         
         return all_pages
@@ -78,7 +186,7 @@ class PDFDataSource(BaseDataSource):
         
         Note: Call sync() before process() to download latest files from cloud.
         """
-        pdf_files = list(self.pdf_dir.glob("*.pdf"))
+        pdf_files = sorted(self.pdf_dir.glob("*.pdf"))
         
         if not pdf_files:
             print("No PDF files found to process")
@@ -90,35 +198,122 @@ class PDFDataSource(BaseDataSource):
 
         print(f"Processing {len(pdf_files)} PDF(s)...")
 
-        for pdf_file in pdf_files:
-            pages = self.extract_text_with_metadata(pdf_file)
+        processed = self.process_files(pdf_files, save_txt=save_txt)
+
+        print(f"✓ Processed {len(processed)} PDF(s)")
+
+    def process_files(self, pdf_files: List[Path], save_txt: bool = True) -> Dict[str, List[Dict]]:
+        """
+        Extract several PDFs (in parallel if workers > 1) and save their outputs.
+
+        Returns:
+            {pdf stem: pages} for every PDF that parsed, in input order
+        """
+        self.pickle_dir.mkdir(parents=True, exist_ok=True)
+        processed = {}
+        for pdf_file, pages in self.extract_all(pdf_files):
+            self.save_outputs(pdf_file.stem, pages, save_txt=save_txt)
+            processed[pdf_file.stem] = pages
 
-            if not pages:
-                continue
+        if self.failed:
+            print(f"⚠️  {len(self.failed)} PDF(s) failed to parse and were skipped:")
+            for name, error in self.failed.items():
+                print(f"    - {name}: {error}")
+        return processed
 
-            # Save pickled object
-            save_pickle(
-                directory=self.pickle_dir,
-                data=pages,
-                filename=f"{pdf_file.stem}.pkl"
+    def process_file(self, pdf_file: Path, save_txt: bool = True) -> List[Dict]:
+        """
+        Extract one PDF and save its page-level pickle (and optional .txt).
+
+        Returns:
+            Extracted pages (empty if the PDF has no text)
+        """
+        pages = self.extract_text_with_metadata(pdf_file)
+        self.save_outputs(pdf_file.stem, pages, save_txt=save_txt)
+        return pages
+
+    def save_outputs(self, stem: str, pages: List[Dict], save_txt: bool = True) -> None:
+        """Save the page-level pickle (and optional .txt) for one PDF."""
+        if not pages:
+            self.remove_outputs(stem)
+            return
+
+        # Save pickled object
+        save_pickle(
+            directory=self.pickle_dir,
+            data=pages,
+            filename=f"{stem}.pkl"
+        )
+
+        # Optionally save human-readable text file
+        if save_txt:
+            self.txt_dir.mkdir(parents=True, exist_ok=True)
+            full_text = "\n\n".join(
+                f"[Page {p['page_number']}]\n{p['text']}" for p in pages
             )
+            txt_file = self.txt_dir / f"{stem}.txt"
+            txt_file.write_text(full_text, encoding="utf-8")
+
+    def remove_outputs(self, stem: str) -> None:
+        """Delete the pickle and .txt produced for a PDF that no longer exists."""
+        for path in (self.pickle_dir / f"{stem}.pkl", self.txt_dir / f"{stem}.txt"):
+            if path.exists():
+                path.unlink()
+
+    def _record_failure(self, pdf_file: Path, error: Exception) -> None:
+        self.failed[pdf_file.name] = f"{type(error).__name__}: {error}"
+
+
+# ----------------------------
+# Worker functions (module level so they can be pickled)
+# ----------------------------
+
+def extract_page_range(pdf_path: Path, start: int = 0, end: Optional[int] = None) -> List[Dict]:
+    """
+    Extract and clean the text of pages [start, end) of a PDF.
+
+    Returns:
+        List of dictionaries with (1-based) page number and cleaned text
+    """
+    page_data = []
+    with fitz.open(pdf_path) as doc:
+        end = doc.page_count if end is None else min(end, doc.page_count)
+        for page_index in range(start, end):
+            raw_text = doc[page_index].get_text()
+            cleaned_text = clean_text(raw_text)
+            if cleaned_text.strip():
+                page_data.append({
+                    "page_number": page_index + 1,
+                    "text": cleaned_text
+                })
+    return page_data
+
+
+def count_pages(pdf_path: Path) -> int:
+    """Number of pages in a PDF."""
+    with fitz.open(pdf_path) as doc:
+        return doc.page_count
+
 
-            # Optionally save human-readable text file
-            if save_txt:
-                full_text = "\n\n".join(
-                    f"[Page {p['page_number']}]\n{p['text']}" for p in pages
-                )
-                txt_file = self.txt_dir / f"{pdf_file.stem}.txt"
-                txt_file.write_text(full_text, encoding="utf-8")
+def _page_ranges(page_count: int, pages_per_task: int) -> List[Tuple[int, int]]:
+    """Split page_count pages into [start, end) ranges of at most pages_per_task pages."""
+    return [
+        (start, min(start + pages_per_task, page_count))
+        for start in range(0, page_count, pages_per_task)
+    ] or [(0, 0)]
 
-        print(f"✓ Processed {len(pdf_files)} PDF(s)")
 
+def process_all_pdfs(save_txt: bool = True, workers: int = PDF_WORKERS) -> Dict[str, str]:
+    """
+    Convenience function to process all PDFs.
 
-def process_all_pdfs(save_txt: bool = True) -> None:
-    """Convenience function to process all PDFs."""
-    pdf_source = PDFDataSource()
+    Returns:
+        {file name: error} of the PDFs that failed to parse
+    """
+    pdf_source = PDFDataSource(workers=workers)
     pdf_source.sync()  # Sync with cloud first
     pdf_source.process(save_txt=save_txt)
+    return pdf_source.failed
 
 
 if __name__ == "__main__":
@@ -0,0 +1,19 @@
+# Embedding backends package
+from .base import BaseEmbedder
+from .sentence_transformer import SentenceTransformerEmbedder
+from .onnx import ONNXEmbedder, export_onnx, quantize_onnx
+from .factory import EmbedderFactory, create_embedder
+from .pool import EmbeddingPool
+from .cache import EmbeddingCache
+
+__all__ = [
+    "BaseEmbedder",
+    "SentenceTransformerEmbedder",
+    "ONNXEmbedder",
+    "export_onnx",
+    "quantize_onnx",
+    "EmbedderFactory",
+    "create_embedder",
+    "EmbeddingPool",
+    "EmbeddingCache",
+]
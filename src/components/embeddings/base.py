@@ -0,0 +1,85 @@
+"""
+Abstract base class for embedding backends.
+
+Supports multiple runtimes for the same sentence-embedding model:
+- PyTorch sentence-transformers
+- ONNX Runtime (optionally int8-quantized)
+"""
+
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import List, Union
+
+import numpy as np
+
+
+class BaseEmbedder(ABC):
+    """
+    Abstract sentence-embedding interface.
+
+    Mirrors the parts of SentenceTransformer the pipeline uses (encode and
+    get_sentence_embedding_dimension), so backends are interchangeable.
+
+    Implementations should handle:
+    - Tokenizing and truncating to the model's max sequence length
+    - Pooling token embeddings into one vector per text
+    - Optional L2 normalization
+    """
+
+    model_name: str
+
+    @abstractmethod
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        show_progress_bar: bool = False,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False,
+    ) -> np.ndarray:
+        """
+        Embed one text or a list of texts.
+
+        Args:
+            sentences: Text or list of texts
+            batch_size: Texts per forward pass
+            show_progress_bar: Display a progress bar
+            convert_to_numpy: Return a numpy array (always true for non-torch backends)
+            normalize_embeddings: L2-normalize the embeddings
+
+        Returns:
+            (dim,) vector for a single text, or (n, dim) float32 matrix
+        """
+        pass
+
+    @abstractmethod
+    def get_sentence_embedding_dimension(self) -> int:
+        """Dimension of the produced embeddings."""
+        pass
+
+    @property
+    def backend_name(self) -> str:
+        """Identifier of the backend and model, e.g. for cache keys."""
+        return self.backend_name_for(self.model_name)
+
+    @classmethod
+    def backend_name_for(cls, model_name: str, **kwargs) -> str:
+        """
+        backend_name of an instance created with these arguments, without creating one.
+
+        Args:
+            model_name: Sentence-transformers model name or local path
+            **kwargs: Backend-specific constructor arguments
+        """
+        return f"{cls.__name__}:{model_name}"
+
+
+@lru_cache(maxsize=4)
+def load_tokenizer(model_name: str):
+    """Load (once) the fast tokenizer of a sentence-transformers model."""
+    from transformers import AutoTokenizer
+
+    # sentence-transformers resolves bare model names the same way
+    if "/" not in model_name:
+        model_name = f"sentence-transformers/{model_name}"
+    return AutoTokenizer.from_pretrained(model_name, use_fast=True)
@@ -0,0 +1,89 @@
+"""
+Content-addressed, on-disk cache of chunk embeddings.
+
+Embeddings are keyed on sha256(model id, chunk text), so any chunk whose
+text has been embedded before with the same model is never re-embedded:
+not after a crash, and not after re-chunking or re-ingesting documents
+whose text did not change. Entries live in a single SQLite file and are
+committed batch by batch, which doubles as the pipeline's checkpoint.
+"""
+
+import hashlib
+import sqlite3
+from pathlib import Path
+from typing import Dict, Sequence
+
+import numpy as np
+
+from config.paths import EMBEDDING_CACHE_PATH
+
+# SQLite limits the number of bound parameters per statement
+_QUERY_BATCH_SIZE = 500
+
+
+class EmbeddingCache:
+    """
+    Persistent {sha256(model id, text): float32 vector} store.
+
+    Args:
+        path: SQLite database file
+    """
+
+    def __init__(self, path: Path = EMBEDDING_CACHE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        # WAL keeps readers unblocked and makes per-batch commits cheap
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def key(model_id: str, text: str) -> bytes:
+        """Content address of a text embedded by a given model."""
+        digest = hashlib.sha256(model_id.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(text.encode("utf-8"))
+        return digest.digest()
+
+    def get_many(self, keys: Sequence[bytes]) -> Dict[bytes, np.ndarray]:
+        """Return the cached vectors for whichever keys are present."""
+        found = {}
+        for start in range(0, len(keys), _QUERY_BATCH_SIZE):
+            batch = keys[start:start + _QUERY_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+            )
+            for key, vector in rows:
+                found[key] = np.frombuffer(vector, dtype=np.float32)
+        return found
+
+    def put_many(self, keys: Sequence[bytes], vectors: np.ndarray) -> None:
+        """Store vectors and commit, so they survive a crash right after."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                ((key, vector.tobytes()) for key, vector in zip(keys, vectors)),
+            )
+
+    def clear(self) -> None:
+        """Delete every cached embedding."""
+        with self._conn:
+            self._conn.execute("DELETE FROM embeddings")
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def __enter__(self) -> "EmbeddingCache":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
@@ -0,0 +1,122 @@
+"""
+Embedding backend factory.
+
+The backend is configured via EMBEDDING_BACKEND in config/settings.py; all
+backends embed with the same model (EMBEDDING_MODEL_NAME) and expose the
+same encode() API.
+"""
+
+from typing import Optional
+
+from config.settings import EMBEDDING_BACKEND, EMBEDDING_MODEL_NAME
+from .base import BaseEmbedder
+from .sentence_transformer import SentenceTransformerEmbedder
+from .onnx import ONNXEmbedder
+
+
+class EmbedderFactory:
+    """
+    Factory for creating embedding backends.
+
+    Supports:
+    - PyTorch sentence-transformers (reference)
+    - ONNX Runtime, fp32 or int8-quantized (fast CPU inference)
+    """
+
+    # Supported embedding backends
+    SUPPORTED_BACKENDS = {
+        "sentence-transformers": SentenceTransformerEmbedder,
+        "onnx": ONNXEmbedder,
+    }
+
+    @staticmethod
+    def create(
+        backend: Optional[str] = None,
+        model_name: str = EMBEDDING_MODEL_NAME,
+        **kwargs
+    ) -> BaseEmbedder:
+        """
+        Create an embedding backend.
+
+        Args:
+            backend: Backend name (default: EMBEDDING_BACKEND)
+            model_name: Sentence-transformers model name or local path
+            **kwargs: Backend-specific arguments:
+                - sentence-transformers: device (str)
+                - onnx: model_dir (Path), quantize (bool), num_threads (int)
+
+        Returns:
+            BaseEmbedder instance
+
+        Raises:
+            ValueError: If backend not supported
+        """
+        return EmbedderFactory.backend_class(backend)(model_name=model_name, **kwargs)
+
+    @staticmethod
+    def backend_class(backend: Optional[str] = None) -> type:
+        """
+        Look up the class of a backend.
+
+        Args:
+            backend: Backend name (default: EMBEDDING_BACKEND)
+
+        Raises:
+            ValueError: If backend not supported
+        """
+        backend = backend or EMBEDDING_BACKEND
+        if backend not in EmbedderFactory.SUPPORTED_BACKENDS:
+            supported = list(EmbedderFactory.SUPPORTED_BACKENDS.keys())
+            raise ValueError(
+                f"Unknown embedding backend: {backend}. "
+                f"Supported backends: {supported}"
+            )
+        return EmbedderFactory.SUPPORTED_BACKENDS[backend]
+
+    @staticmethod
+    def list_backends() -> dict:
+        """
+        List all supported embedding backends.
+
+        Returns:
+            Dict mapping backend names to their classes
+        """
+        return EmbedderFactory.SUPPORTED_BACKENDS.copy()
+
+    @staticmethod
+    def register_backend(name: str, backend_class: type) -> None:
+        """
+        Register a new embedding backend.
+
+        Args:
+            name: Name of the backend
+            backend_class: Class that inherits from BaseEmbedder
+
+        Raises:
+            ValueError: If backend_class doesn't inherit from BaseEmbedder
+        """
+        if not issubclass(backend_class, BaseEmbedder):
+            raise ValueError(
+                f"{backend_class.__name__} must inherit from BaseEmbedder"
+            )
+        EmbedderFactory.SUPPORTED_BACKENDS[name] = backend_class
+
+
+# Convenience function for easy import
+def create_embedder(
+    backend: Optional[str] = None,
+    model_name: str = EMBEDDING_MODEL_NAME,
+    **kwargs
+) -> BaseEmbedder:
+    """
+    Convenience function to create an embedding backend.
+
+    Args:
+        backend: Backend name (default: EMBEDDING_BACKEND)
+        model_name: Sentence-transformers model name or local path
+        **kwargs: Backend-specific arguments
+
+    Returns:
+        BaseEmbedder instance
+    """
+    return EmbedderFactory.create(backend, model_name=model_name, **kwargs)
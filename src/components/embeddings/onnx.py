@@ -0,0 +1,243 @@
+"""
+ONNX Runtime backend for sentence-transformers models.
+
+The whole sentence-transformers pipeline (transformer, pooling and, if the
+model has one, normalization) is exported to a single ONNX graph, so the
+ONNX output matches SentenceTransformer.encode(). Optionally the graph is
+dynamically quantized to int8, which is usually much faster on CPU at a
+small accuracy cost (see scripts/bench_embeddings.py for a parity check).
+"""
+
+import inspect
+import json
+import warnings
+from pathlib import Path
+from typing import List, Optional, Union
+
+import numpy as np
+
+from config.paths import ONNX_MODELS_DIR
+from config.settings import EMBEDDING_MODEL_NAME, EMBEDDING_ONNX_QUANTIZE, EMBEDDING_ONNX_THREADS
+from .base import BaseEmbedder
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+
+FP32_MODEL_FILE = "model.onnx"
+INT8_MODEL_FILE = "model.int8.onnx"
+EXPORT_CONFIG_FILE = "embedder.json"
+_INPUT_NAMES = ("input_ids", "attention_mask", "token_type_ids")
+
+
+def onnx_model_dir(model_name: str = EMBEDDING_MODEL_NAME) -> Path:
+    """Directory holding the exported ONNX files of a model."""
+    return ONNX_MODELS_DIR / model_name.strip("/").replace("/", "__")
+
+
+def export_onnx(
+    model_name: str = EMBEDDING_MODEL_NAME,
+    output_dir: Optional[Path] = None,
+    quantize: bool = False,
+    opset: int = 17,
+) -> Path:
+    """
+    Export a sentence-transformers model to ONNX.
+
+    Args:
+        model_name: Sentence-transformers model name or local path
+        output_dir: Where to write the files (default: onnx_model_dir(model_name))
+        quantize: Also write a dynamically int8-quantized copy
+        opset: ONNX opset version
+
+    Returns:
+        The output directory
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from .sentence_transformer import _embedding_dimension
+
+    output_dir = Path(output_dir or onnx_model_dir(model_name))
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    model = SentenceTransformer(model_name, device="cpu").eval()
+    tokenizer = model.tokenizer
+    sample = tokenizer(
+        ["An example sentence.", "Another, somewhat longer example sentence."],
+        padding=True,
+        return_tensors="pt",
+    )
+    input_names = [name for name in _INPUT_NAMES if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["sentence_embedding"] = {0: "batch"}
+
+    # Keep the TorchScript exporter where newer torch defaults to torch.export
+    export_kwargs = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+
+    with torch.no_grad(), warnings.catch_warnings():
+        # Tracing warnings about shape-dependent Python branches are expected
+        warnings.simplefilter("ignore")
+        torch.onnx.export(
+            _sentence_embedding_graph(model, input_names),
+            tuple(sample[name] for name in input_names),
+            str(output_dir / FP32_MODEL_FILE),
+            input_names=input_names,
+            output_names=["sentence_embedding"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            **export_kwargs,
+        )
+
+    tokenizer.save_pretrained(str(output_dir))
+    config = {
+        "model_name": model_name,
+        "max_seq_length": model.max_seq_length,
+        "dimension": _embedding_dimension(model),
+        "input_names": input_names,
+    }
+    (output_dir / EXPORT_CONFIG_FILE).write_text(json.dumps(config, indent=2), encoding="utf-8")
+    print(f"✓ Exported {model_name} to {output_dir / FP32_MODEL_FILE}")
+
+    if quantize:
+        quantize_onnx(output_dir)
+    return output_dir
+
+
+def quantize_onnx(model_dir: Path) -> Path:
+    """
+    Write a dynamically int8-quantized copy of an exported model.
+
+    Returns:
+        Path of the quantized model
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    model_dir = Path(model_dir)
+    quantize_dynamic(
+        str(model_dir / FP32_MODEL_FILE),
+        str(model_dir / INT8_MODEL_FILE),
+        weight_type=QuantType.QInt8,
+    )
+    print(f"✓ Quantized model written to {model_dir / INT8_MODEL_FILE}")
+    return model_dir / INT8_MODEL_FILE
+
+
+class ONNXEmbedder(BaseEmbedder):
+    """
+    Sentence embeddings computed with ONNX Runtime on CPU.
+
+    The model is exported (and quantized) on first use if the ONNX files
+    are missing.
+
+    Args:
+        model_name: Sentence-transformers model name or local path
+        model_dir: Directory with the exported files (default: onnx_model_dir(model_name))
+        quantize: Use the int8 dynamically quantized graph
+        num_threads: ONNX Runtime intra-op threads (0 = runtime default)
+    """
+
+    def __init__(
+        self,
+        model_name: str = EMBEDDING_MODEL_NAME,
+        model_dir: Optional[Path] = None,
+        quantize: bool = EMBEDDING_ONNX_QUANTIZE,
+        num_threads: int = EMBEDDING_ONNX_THREADS,
+    ):
+        if ort is None:
+            raise ImportError("onnxruntime package not installed. Run: pip install onnxruntime")
+
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.quantize = quantize
+        self.model_dir = Path(model_dir or onnx_model_dir(model_name))
+
+        if not (self.model_dir / FP32_MODEL_FILE).exists():
+            export_onnx(model_name, self.model_dir)
+        model_file = self.model_dir / (INT8_MODEL_FILE if quantize else FP32_MODEL_FILE)
+        if not model_file.exists():
+            quantize_onnx(self.model_dir)
+
+        config = json.loads((self.model_dir / EXPORT_CONFIG_FILE).read_text(encoding="utf-8"))
+        self.max_seq_length = config["max_seq_length"]
+        self.dimension = config["dimension"]
+        self.input_names = config["input_names"]
+        self.tokenizer = AutoTokenizer.from_pretrained(str(self.model_dir))
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(
+            str(model_file), options, providers=["CPUExecutionProvider"]
+        )
+
+    @property
+    def backend_name(self) -> str:
+        return self.backend_name_for(self.model_name, quantize=self.quantize)
+
+    @classmethod
+    def backend_name_for(cls, model_name: str, quantize: bool = EMBEDDING_ONNX_QUANTIZE, **kwargs) -> str:
+        precision = "int8" if quantize else "fp32"
+        return f"onnx-{precision}:{model_name}"
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        show_progress_bar: bool = False,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False,
+    ) -> np.ndarray:
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        # Like sentence-transformers, batch texts of similar length together
+        # to minimize padding, then restore the input order
+        order = np.argsort([-len(text) for text in sentences], kind="stable")
+        embeddings = np.empty((len(sentences), self.dimension), dtype=np.float32)
+        starts = range(0, len(sentences), batch_size)
+        if show_progress_bar:
+            from tqdm import tqdm
+            starts = tqdm(starts, desc="Batches")
+
+        for start in starts:
+            batch_ids = order[start:start + batch_size]
+            batch = [sentences[i] for i in batch_ids]
+            encoded = self.tokenizer(
+                batch,
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np",
+            )
+            feeds = {name: encoded[name].astype(np.int64) for name in self.input_names}
+            embeddings[batch_ids] = self.session.run(None, feeds)[0]
+
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings /= np.maximum(norms, 1e-12)
+
+        return embeddings[0] if single else embeddings
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+
+def _sentence_embedding_graph(model, input_names: List[str]):
+    """Wrap a SentenceTransformer as a module taking positional token tensors."""
+    import torch
+
+    class SentenceEmbeddingGraph(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            features = dict(zip(input_names, inputs))
+            return self.model(features)["sentence_embedding"]
+
+    return SentenceEmbeddingGraph().eval()
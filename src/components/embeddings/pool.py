@@ -0,0 +1,232 @@
+"""
+Batch embedding runner for ingestion.
+
+Texts are sorted by token length so each batch holds texts of similar
+length (little padding), encoded in fixed-size batches, and optionally
+spread over a pool of worker processes that each load their own model copy.
+Results are written back in input order.
+"""
+
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from config.settings import (
+    EMBEDDING_BACKEND,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_MODEL_NAME,
+    EMBEDDING_WORKERS,
+)
+from .base import BaseEmbedder, load_tokenizer
+from .factory import EmbedderFactory, create_embedder
+from .onnx import ONNXEmbedder
+
+
+class EmbeddingPool(BaseEmbedder):
+    """
+    Length-sorted, batched and optionally multi-process embedder.
+
+    Implements the BaseEmbedder API, so it can be passed anywhere a single
+    model is expected. With workers <= 1 it encodes in-process.
+
+    Args:
+        backend: Embedding backend (default: EMBEDDING_BACKEND)
+        model_name: Sentence-transformers model name or local path
+        workers: Encoder processes (1 = encode in-process)
+        batch_size: Texts per encode batch
+        **kwargs: Backend-specific arguments passed to create_embedder
+    """
+
+    def __init__(
+        self,
+        backend: Optional[str] = None,
+        model_name: str = EMBEDDING_MODEL_NAME,
+        workers: int = EMBEDDING_WORKERS,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        **kwargs
+    ):
+        self.backend = backend or EMBEDDING_BACKEND
+        self.model_name = model_name
+        self.workers = workers
+        self.batch_size = batch_size
+        self.kwargs = kwargs
+
+        self._embedder: Optional[BaseEmbedder] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._dimension: Optional[int] = None
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: Optional[int] = None,
+        show_progress_bar: bool = False,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False,
+    ) -> np.ndarray:
+        """
+        Embed texts in length-sorted batches; rows follow the input order.
+
+        With show_progress_bar, progress and throughput (chunks/s) are printed.
+        """
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+        batch_size = batch_size or self.batch_size
+
+        embeddings = np.empty((len(sentences), self.get_sentence_embedding_dimension()), dtype=np.float32)
+        if not sentences:
+            return embeddings
+
+        order = np.argsort(-self._token_lengths(sentences), kind="stable")
+        batches = [order[start:start + batch_size] for start in range(0, len(order), batch_size)]
+
+        started = time.perf_counter()
+        done = 0
+        for batch_ids, batch_embeddings in self._encode_batches(sentences, batches, normalize_embeddings):
+            embeddings[batch_ids] = batch_embeddings
+            done += len(batch_ids)
+            if show_progress_bar:
+                rate = done / max(time.perf_counter() - started, 1e-9)
+                print(f"  embedded {done}/{len(sentences)} chunks ({rate:,.0f} chunks/s)", end="\r")
+
+        if show_progress_bar:
+            elapsed = time.perf_counter() - started
+            print(
+                f"\n✓ Embedded {len(sentences)} chunks in {elapsed:.1f}s "
+                f"({len(sentences) / max(elapsed, 1e-9):,.0f} chunks/s, {max(self.workers, 1)} worker(s))"
+            )
+        return embeddings[0] if single else embeddings
+
+    @property
+    def backend_name(self) -> str:
+        # Same identifier as the wrapped backend, without loading a model
+        return EmbedderFactory.backend_class(self.backend).backend_name_for(self.model_name, **self.kwargs)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        if self._dimension is None:
+            if self.workers <= 1:
+                self._dimension = self._local().get_sentence_embedding_dimension()
+            else:
+                self._dimension = self._pool().submit(_worker_dimension).result()
+        return self._dimension
+
+    def close(self) -> None:
+        """Shut down the worker processes (if any)."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> "EmbeddingPool":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    # ----------------------------
+    # Internals
+    # ----------------------------
+
+    def _token_lengths(self, texts: List[str]) -> np.ndarray:
+        """Token count of each text (batched fast tokenization)."""
+        tokenizer = load_tokenizer(self.model_name)
+        encoded = tokenizer(
+            texts,
+            add_special_tokens=False,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+            verbose=False,  # over-length texts are expected here; the model truncates them
+        )
+        return np.array([len(ids) for ids in encoded["input_ids"]], dtype=np.int64)
+
+    def _encode_batches(self, texts: List[str], batches: List[np.ndarray], normalize: bool):
+        """Yield (batch_ids, embeddings) for every batch, in batch order."""
+        if self.workers <= 1:
+            model = self._local()
+            for batch_ids in batches:
+                yield batch_ids, _encode(model, [texts[i] for i in batch_ids], normalize)
+            return
+
+        # Keep a bounded window of batches in flight so pending texts and
+        # results do not pile up in memory
+        executor = self._pool()
+        pending = iter(batches)
+        in_flight = deque()
+        max_in_flight = self.workers * 2
+
+        def refill():
+            while len(in_flight) < max_in_flight:
+                batch_ids = next(pending, None)
+                if batch_ids is None:
+                    return
+                future = executor.submit(_worker_encode, [texts[i] for i in batch_ids], normalize)
+                in_flight.append((batch_ids, future))
+
+        refill()
+        while in_flight:
+            batch_ids, future = in_flight.popleft()
+            embeddings = future.result()
+            refill()
+            yield batch_ids, embeddings
+
+    def _local(self) -> BaseEmbedder:
+        if self._embedder is None:
+            self._embedder = create_embedder(self.backend, model_name=self.model_name, **self.kwargs)
+        return self._embedder
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Share the cores between workers instead of oversubscribing them
+            threads = max(1, (os.cpu_count() or 1) // self.workers)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                # Spawned (not forked) workers: torch and tokenizers threads do not survive fork
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                # The class, not its name: backends registered at runtime are unknown to spawned workers
+                initargs=(EmbedderFactory.backend_class(self.backend), self.model_name, self.kwargs, threads),
+            )
+        return self._executor
+
+
+def _encode(model: BaseEmbedder, texts: List[str], normalize: bool) -> np.ndarray:
+    embeddings = model.encode(
+        texts,
+        batch_size=len(texts),
+        show_progress_bar=False,
+        convert_to_numpy=True,
+        normalize_embeddings=normalize
+    )
+    return np.asarray(embeddings, dtype=np.float32).reshape(len(texts), -1)
+
+
+# ----------------------------
+# Worker functions (module level so they can be pickled)
+# ----------------------------
+
+_worker_model: Optional[BaseEmbedder] = None
+
+
+def _init_worker(backend_class: type, model_name: str, kwargs: Dict, threads: int) -> None:
+    global _worker_model
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    if issubclass(backend_class, ONNXEmbedder) and not kwargs.get("num_threads"):
+        kwargs = {**kwargs, "num_threads": threads}
+    _worker_model = backend_class(model_name=model_name, **kwargs)
+
+
+def _worker_encode(texts: List[str], normalize: bool) -> np.ndarray:
+    return _encode(_worker_model, texts, normalize)
+
+
+def _worker_dimension() -> int:
+    return _worker_model.get_sentence_embedding_dimension()
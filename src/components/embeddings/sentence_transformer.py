@@ -0,0 +1,47 @@
+from typing import List, Optional, Union
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from config.settings import EMBEDDING_MODEL_NAME
+from .base import BaseEmbedder
+
+
+class SentenceTransformerEmbedder(BaseEmbedder):
+    """
+    PyTorch sentence-transformers backend (the reference implementation).
+
+    Args:
+        model_name: Sentence-transformers model name or local path
+        device: Torch device (None = sentence-transformers default)
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, device: Optional[str] = None):
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name, device=device)
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        show_progress_bar: bool = False,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False,
+    ) -> np.ndarray:
+        return self.model.encode(
+            sentences,
+            batch_size=batch_size,
+            show_progress_bar=show_progress_bar,
+            convert_to_numpy=convert_to_numpy,
+            normalize_embeddings=normalize_embeddings,
+        )
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return _embedding_dimension(self.model)
+
+
+def _embedding_dimension(model: SentenceTransformer) -> int:
+    """Embedding dimension (the method was renamed in sentence-transformers 6)."""
+    if hasattr(model, "get_embedding_dimension"):
+        return model.get_embedding_dimension()
+    return model.get_sentence_embedding_dimension()
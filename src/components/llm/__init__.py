@@ -2,6 +2,7 @@ from .base import BaseLLM
 from .local import LocalLLM
 from .openai import OpenAILLM
 from .factory import LLMFactory, create_llm
+from .batching import BatchedLLM
 
 __all__ = [
     "BaseLLM",
@@ -9,4 +10,5 @@ __all__ = [
     "OpenAILLM",
     "LLMFactory",
     "create_llm",
+    "BatchedLLM",
 ]
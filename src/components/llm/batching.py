@@ -0,0 +1,159 @@
+"""
+Micro-batching of concurrent LocalLLM generate calls.
+
+model.generate on one prompt leaves most of the model's throughput unused,
+and concurrent callers (server threads answering /query) would otherwise
+take turns. BatchedLLM queues prompts from any thread and a single
+scheduler thread runs them as padded batches, one generate call per batch.
+While a batch generates, new prompts queue up and form the next batch.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import List, Optional
+
+from config.settings import LLM_BATCH_MAX_WAIT_MS, LLM_MAX_BATCH_SIZE
+from .base import BaseLLM
+from .local import LocalLLM
+
+
+class BatchedLLM(BaseLLM):
+    """
+    LocalLLM wrapper that batches generate calls made concurrently.
+
+    A batch is dispatched when max_batch_size prompts with the same
+    generation settings are queued, or max_wait_ms after its oldest
+    prompt arrived. Prompts with different settings go to separate batches.
+
+    Args:
+        llm: Local model to generate with
+        max_batch_size: Max prompts per generate call
+        max_wait_ms: Max time a prompt waits for others to join its batch
+    """
+
+    def __init__(
+        self,
+        llm: LocalLLM,
+        max_batch_size: int = LLM_MAX_BATCH_SIZE,
+        max_wait_ms: float = LLM_BATCH_MAX_WAIT_MS,
+    ):
+        self.llm = llm
+        self.model_name = llm.model_name
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.batches = 0
+        self.items = 0
+
+        self._pending: deque = deque()  # (prompt, max_length, kwargs, settings key, future, arrival time)
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="llm-batcher", daemon=True)
+        self._thread.start()
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.items / self.batches if self.batches else 0.0
+
+    def submit(self, prompt: str, max_length: int = None, **generation_kwargs) -> Future:
+        """
+        Queue a prompt for generation.
+
+        Args:
+            prompt: Input prompt
+            max_length: Max tokens (uses model default if None)
+            **generation_kwargs: Additional generation parameters
+
+        Returns:
+            Future resolving to the generated text
+        """
+        future = Future()
+        key = (max_length, repr(sorted(generation_kwargs.items())))
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("BatchedLLM is closed")
+            self._pending.append((prompt, max_length, generation_kwargs, key, future, time.monotonic()))
+            self._condition.notify()
+        return future
+
+    def generate(self, prompt: str, max_length: int = None, **generation_kwargs) -> str:
+        """Generate text from a prompt, batched with concurrent calls."""
+        return self.submit(prompt, max_length, **generation_kwargs).result()
+
+    def get_max_tokens(self) -> int:
+        return self.llm.get_max_tokens()
+
+    def get_model_type(self) -> str:
+        return self.llm.get_model_type()
+
+    def close(self) -> None:
+        """Stop the scheduler; queued prompts fail with RuntimeError."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        while self._pending:
+            future = self._pending.popleft()[4]
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError("BatchedLLM closed"))
+
+    # ----------------------------
+    # Internals
+    # ----------------------------
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            # Skip prompts whose caller cancelled
+            batch = [request for request in batch if request[4].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            _, max_length, generation_kwargs, _, _, _ = batch[0]
+            try:
+                results = self.llm.generate_batch(
+                    [request[0] for request in batch], max_length, **generation_kwargs
+                )
+            except Exception as e:
+                for request in batch:
+                    request[4].set_exception(e)
+                continue
+
+            self.batches += 1
+            self.items += len(batch)
+            for request, result in zip(batch, results):
+                request[4].set_result(result)
+
+    def _next_batch(self) -> Optional[List[tuple]]:
+        """Wait for a batch of prompts sharing the oldest prompt's settings; None once closed."""
+        with self._condition:
+            while not self._pending and not self._closed:
+                self._condition.wait()
+            if self._closed:
+                return None
+
+            # Prompts that queued up during the previous batch are already due
+            key = self._pending[0][3]
+            deadline = self._pending[0][5] + self.max_wait_ms / 1000
+            while not self._closed and self._matching(key) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            if self._closed:
+                return None
+
+            batch, rest = [], deque()
+            for request in self._pending:
+                if request[3] == key and len(batch) < self.max_batch_size:
+                    batch.append(request)
+                else:
+                    rest.append(request)
+            self._pending = rest
+            return batch
+
+    def _matching(self, key: tuple) -> int:
+        return sum(1 for request in self._pending if request[3] == key)
@@ -4,6 +4,7 @@ from transformers import (
     AutoModelForSeq2SeqLM,
 )
 from config.llm_config import get_max_input_tokens, get_model_type
+from typing import Dict, List, Optional
 import torch
 from .base import BaseLLM
 
@@ -40,6 +41,11 @@ class LocalLLM(BaseLLM):
         self.max_length = max_length
 
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        if model_type == "causal":
+            # Decoder-only models continue from the last position, so batches pad on the left
+            self.tokenizer.padding_side = "left"
+            if self.tokenizer.pad_token is None:
+                self.tokenizer.pad_token = self.tokenizer.eos_token
 
         if model_type == "causal":
             self.model = AutoModelForCausalLM.from_pretrained(
@@ -75,18 +81,67 @@ class LocalLLM(BaseLLM):
         Returns:
             Generated text as string
         """
+        return self.generate_batch([prompt], max_length, **generation_kwargs)[0]
+
+    def generate_batch(self, prompts: List[str], max_length: int = None, **generation_kwargs) -> List[str]:
+        """
+        Generate text for several prompts with padded model.generate calls.
+
+        Each prompt gets the output it would get on its own. Seq2seq models
+        pad the encoder input and mask the padding out. Causal models are
+        padded on the left so every prompt ends where generation continues;
+        their max_length includes the prompt, so each prompt has its own
+        budget of new tokens. A batch generates up to the largest budget and
+        trims every output to its own, and prompts are grouped by length so
+        that no row runs past the model's position limit.
+
+        Args:
+            prompts: Input prompts
+            max_length: Max tokens (uses model default if None)
+            **generation_kwargs: Additional generation parameters
+
+        Returns:
+            Generated texts, in the order of prompts
+        """
         if max_length is None:
             max_length = self.max_length
-            
-        inputs = self.tokenizer(prompt, return_tensors="pt").to(self.device)
+        if self._model_type != "causal" or "max_new_tokens" in generation_kwargs:
+            return self._generate(prompts, {"max_length": max_length, **generation_kwargs})
+
+        lengths = [len(ids) for ids in self.tokenizer(prompts)["input_ids"]]
+        limit = getattr(self.model.config, "max_position_embeddings", None) or float("inf")
+        results: List[str] = [""] * len(prompts)
+        for group in _length_groups(lengths, limit - max_length):
+            budgets = [max(max_length - lengths[i], 0) for i in group]
+            settings = {"max_new_tokens": max(max(budgets), 1), **generation_kwargs}
+            texts = self._generate([prompts[i] for i in group], settings, budgets)
+            for i, text in zip(group, texts):
+                results[i] = text
+        return results
+
+    def _generate(self, prompts: List[str], settings: Dict, budgets: Optional[List[int]] = None) -> List[str]:
+        """Run one padded generate call; budgets cap each row's new tokens."""
+        inputs = self.tokenizer(prompts, return_tensors="pt", padding=True).to(self.device)
 
         # Merge default generation settings with any overrides
-        default_kwargs = {"max_length": max_length, "do_sample": True}
-        default_kwargs.update(generation_kwargs)
+        default_kwargs = {"do_sample": True, "pad_token_id": self.tokenizer.pad_token_id}
+        default_kwargs.update(settings)
 
         with torch.no_grad():
             outputs = self.model.generate(**inputs, **default_kwargs)
 
-        decoded = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-        return decoded
+        if budgets is not None:
+            prompt_end = inputs["input_ids"].shape[1]
+            outputs = [row[:prompt_end + budget] for row, budget in zip(outputs, budgets)]
+        return self.tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
 
+def _length_groups(lengths: List[int], max_spread: float) -> List[List[int]]:
+    """Group indices by length so that lengths within a group differ by at most max_spread."""
+    groups: List[List[int]] = []
+    for i in sorted(range(len(lengths)), key=lengths.__getitem__):
+        if groups and lengths[i] - lengths[groups[-1][0]] <= max_spread:
+            groups[-1].append(i)
+        else:
+            groups.append([i])
+    return groups
@@ -13,7 +13,22 @@ TEST_PDF_DIR = BASE_DIR / "tests/test_data/pdfs"
 PICKLE_DIR = PROCESSED_DIR / "pickle"       # for pickled raw text
 TEXT_DIR = PROCESSED_DIR / "text"           # for human-readable text
 CHUNKS_DIR = PROCESSED_DIR / "chunks"       # for chunked data
+DUPLICATES_PATH = CHUNKS_DIR / "duplicates.json"  # duplicate chunk -> canonical chunk mapping
 EMBEDDINGS_DIR = PROCESSED_DIR / "embeddings"  # for embeddings
+CHUNK_STORE_DIR = EMBEDDINGS_DIR / "store"  # columnar, memory-mapped chunk store
+EMBEDDING_CACHE_PATH = EMBEDDINGS_DIR / "cache.sqlite"  # content-addressed embedding cache
+
+# Exported embedding models (ONNX backend)
+ONNX_MODELS_DIR = BASE_DIR / "data/models/onnx"
 
 # Vector store index
 INDEX_PATH = PROCESSED_DIR / "vector_index.index"
+BINARY_INDEX_PATH = PROCESSED_DIR / "vector_index.binary.index"  # sign-bit codes ('binary' search engine)
+LEXICAL_INDEX_DIR = PROCESSED_DIR / "lexical"  # BM25 inverted index
+SHARDS_DIR = PROCESSED_DIR / "shards"  # per-shard chunk stores and indexes ('sharded' search engine)
+
+# Content hash and chunk ids of every ingested PDF, for incremental updates
+MANIFEST_PATH = PROCESSED_DIR / "manifest.json"
+
+# Common queries (one per line) used to warm the query embedding cache
+QUERY_WARMUP_PATH = PROCESSED_DIR / "common_queries.txt"
@@ -1,18 +1,89 @@
+# ----------------------------
+# PDF Ingestion Settings
+# ----------------------------
+PDF_WORKERS = 1  # Processes used to parse PDFs (1 = no process pool)
+PDF_PAGES_PER_TASK = 100  # Larger PDFs are split into page ranges across workers
+
 # ----------------------------
 # Chunking Settings
 # ----------------------------
+CHUNKING_STRATEGY = "chars"  # 'chars' (fixed-size windows) or 'tokens' (sentence-aware, token-budgeted)
 CHUNK_SIZE = 500      # Maximum characters per chunk
 CHUNK_OVERLAP = 50    # Number of overlapping characters between chunks
+CHUNK_MAX_TOKENS = 256  # Token budget per chunk incl. special tokens ('tokens' strategy; MiniLM max_seq_length)
+CHUNK_OVERLAP_TOKENS = 32  # Max tokens of whole trailing sentences repeated in the next chunk
+
+# ----------------------------
+# Deduplication Settings
+# ----------------------------
+DEDUP_ENABLED = True  # Drop exact and near-duplicate chunks before embedding
+STREAMING_DEDUP_ENABLED = False  # Also in streaming ingestion (dedup state grows with the corpus)
+DEDUP_THRESHOLD = 0.85  # Min estimated Jaccard similarity of shingles for a near duplicate
+DEDUP_NUM_PERM = 128  # MinHash signature length
+DEDUP_BANDS = 16  # LSH bands (DEDUP_NUM_PERM must be divisible by it)
+DEDUP_SHINGLE_SIZE = 5  # Characters per shingle
 
 # ----------------------------
 # Embedding Settings
 # ----------------------------
 EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+EMBEDDING_BACKEND = "sentence-transformers"  # 'sentence-transformers' (PyTorch) or 'onnx' (ONNX Runtime)
+EMBEDDING_ONNX_QUANTIZE = False  # Use the dynamically int8-quantized ONNX graph
+EMBEDDING_ONNX_THREADS = 0  # ONNX Runtime intra-op threads (0 = runtime default)
+EMBEDDING_BATCH_SIZE = 64  # Texts per encode batch (batches are formed from length-sorted texts)
+EMBEDDING_WORKERS = 1  # Encoder processes, each with its own model copy (1 = encode in-process)
+EMBEDDING_CACHE_ENABLED = True  # Reuse embeddings of chunk text already embedded with the same model
+EMBEDDING_CHECKPOINT_SIZE = 4096  # Texts embedded between cache commits (the resume granularity)
+EMBEDDING_STORE_DTYPE = "float32"  # Vectors in the chunk store: 'float32' or 'float16' (half the disk and page cache)
+STREAMING_BATCH_SIZE = 256  # Chunks embedded and appended per batch in streaming setup
+
+# ----------------------------
+# Vector Index Settings
+# ----------------------------
+INDEX_MMAP = True  # Memory-map the FAISS index on load instead of reading it into RAM
+FAISS_INDEX_TYPE = "flat"  # 'flat' (exact L2), 'hnsw', 'ivf_flat', 'ivf_pq', 'fp16', 'sq8', 'ivf_ondisk' (inner product)
+INDEX_TRAIN_SAMPLE_SIZE = 100_000  # Max vectors sampled to train IVF/PQ/SQ indexes
+INDEX_ADD_BATCH_SIZE = 50_000  # Vectors added to the index per batch
+HNSW_M = 32  # Graph neighbours per node
+HNSW_EF_CONSTRUCTION = 200  # Build-time search depth
+HNSW_EF_SEARCH = 64  # Query-time search depth (recall vs latency)
+IVF_NLIST = 1024  # Inverted lists (capped by training sample size)
+IVF_NPROBE = 16  # Lists probed per query (recall vs latency)
+PQ_M = 48  # PQ sub-quantizers (must divide the embedding dimension)
+PQ_NBITS = 8  # Bits per PQ sub-quantizer code
+SEARCH_ENGINE = "faiss"  # 'faiss' (float index), 'binary' (Hamming first stage + float rescoring) or 'sharded'
+NUM_SHARDS = 4  # Shards (by document hash) of the 'sharded' engine, each searched by its own worker process
+SHARD_WORKER_THREADS = 1  # FAISS threads per shard worker process
+BINARY_INDEX_TYPE = "binary_flat"  # 'binary_flat' (exhaustive Hamming) or 'binary_hnsw'
+BINARY_RESCORE_FACTOR = 10  # Binary candidates rescored per requested result (recall vs latency)
 
 # ----------------------------
 # Retrieval Settings
 # ----------------------------
 DEFAULT_TOP_K = 5  # Default number of results to retrieve
+MAX_CONTEXT_CANDIDATES = 10  # Chunks retrieved once per question for context packing
+CONTEXT_RESERVED_TOKENS = 100  # Tokens reserved for prompt structure around the context
+MIN_TRUNCATED_CHUNK_TOKENS = 32  # Smallest trimmed tail chunk worth adding to the context
+QUERY_CACHE_SIZE = 10_000  # Max cached query embeddings (0 disables the cache)
+RETRIEVAL_MODE = "dense"  # 'dense' (vector index), 'lexical' (BM25) or 'hybrid' (rank fusion of both)
+LEXICAL_INDEX_ENABLED = True  # Build the BM25 index alongside the vector index
+BM25_K1 = 1.2  # BM25 term frequency saturation
+BM25_B = 0.75  # BM25 document length normalization
+RRF_K = 60  # Reciprocal rank fusion constant: score = sum(1 / (RRF_K + rank))
+HYBRID_CANDIDATES = 50  # Results taken from each ranking before fusion (at least top_k)
+FILTER_EXACT_MAX_ROWS = 20_000  # Metadata filters matching at most this many chunks are scored exactly
+
+# ----------------------------
+# Reranking Settings
+# ----------------------------
+RERANK_ENABLED = False  # Rerank retrieved candidates with a cross-encoder
+RERANK_MODEL_NAME = "cross-encoder/ms-marco-MiniLM-L6-v2"  # Small CPU cross-encoder
+RERANK_CANDIDATES = 50  # Candidates over-fetched and scored per query
+RERANK_TOP_K = 5  # Chunks kept after reranking (context candidates when reranking)
+RERANK_LATENCY_BUDGET_MS = 200  # Max time scoring uncached pairs per query (0 = no limit)
+RERANK_BATCH_SIZE = 64  # Pairs per forward pass (>= RERANK_CANDIDATES scores a query in one batch)
+RERANK_MAX_LENGTH = 256  # Max tokens per (query, chunk) pair
+RERANK_CACHE_SIZE = 50_000  # Max cached (query, chunk) scores (0 disables the cache)
 
 # ----------------------------
 # LLM Settings
@@ -39,6 +110,28 @@ SUPPORTED_OPENAI_MODELS = [
 # Generation Settings
 # ----------------------------
 DEFAULT_MAX_TOKENS = 250  # Default max tokens for LLM generation
+LLM_BATCHING_ENABLED = True  # Batch concurrent local LLM generate calls into one padded call
+LLM_MAX_BATCH_SIZE = 8  # Max prompts per local LLM generate call
+LLM_BATCH_MAX_WAIT_MS = 10  # Max time a prompt waits for concurrent prompts to join its batch
+
+# ----------------------------
+# Answer Cache Settings
+# ----------------------------
+ANSWER_CACHE_ENABLED = True  # Reuse answers for near-duplicate questions
+ANSWER_CACHE_SIZE = 1000  # Max cached answers (LRU eviction)
+ANSWER_CACHE_THRESHOLD = 0.95  # Min cosine similarity between questions for a hit
+
+# ----------------------------
+# Server Settings
+# ----------------------------
+SERVER_HOST = "127.0.0.1"  # Interface the query server listens on
+SERVER_PORT = 8000  # Port the query server listens on
+SERVER_BATCH_WINDOW_MS = 5  # Max time a request waits for concurrent requests to join its batch
+SERVER_MAX_BATCH_SIZE = 32  # Max queries per embedding + search batch
+SERVER_QUERY_WORKERS = 4  # Threads generating /query answers concurrently
+SERVER_MAX_BODY_BYTES = 1_000_000  # Larger request bodies are rejected
+SERVER_KEEPALIVE_TIMEOUT = 30  # Seconds an idle keep-alive connection is kept open
+
 # ----------------------------
 # Storage Settings
 # ----------------------------
@@ -9,24 +9,66 @@ from pathlib import Path
 from rag import run_rag_pipeline
 from rag.pipeline import set_llm
 from components.llm import LLMFactory
-from components.data.pdf import process_all_pdfs
+from components.data.pdf import PDFDataSource, process_all_pdfs
+from components.data.directory import process_all_pickles
 from retrieval.embeddings import run_embedding_pipeline
-from retrieval.indexing import run_vector_store_pipeline
-from config.settings import DEFAULT_LLM_MODEL
+from retrieval.indexing import run_vector_store_pipeline, SUPPORTED_INDEX_TYPES
+from retrieval.incremental import run_incremental_pipeline, rebuild_manifest
+from retrieval.streaming import run_streaming_pipeline
+from retrieval.retriever import get_default_retriever
+from retrieval.store import ChunkStore
+from server import run_server
+from config.settings import (
+    DEFAULT_LLM_MODEL,
+    FAISS_INDEX_TYPE,
+    PDF_WORKERS,
+    SERVER_HOST,
+    SERVER_PORT,
+    SERVER_BATCH_WINDOW_MS,
+    SERVER_MAX_BATCH_SIZE,
+)
 
 
-def setup_pipeline(skip_ingestion=False, skip_embedding=False, skip_indexing=False):
+def setup_pipeline(
+    skip_ingestion=False,
+    skip_embedding=False,
+    skip_indexing=False,
+    index_type=None,
+    incremental=False,
+    streaming=False,
+    workers=PDF_WORKERS
+):
     """
     Set up the complete pipeline.
     
     Steps:
-    1. Ingest PDFs and extract text
+    1. Ingest PDFs, extract text and chunk it
     2. Generate embeddings
     3. Build FAISS index
+
+    With incremental=True, only PDFs added, changed or removed since the
+    last run go through the stages (the skip flags are ignored), and the
+    existing index keeps its type.
+    With streaming=True, all stages run in one bounded-memory pass over the
+    corpus (the skip flags are ignored).
     """
+    if streaming:
+        print("Running streaming pipeline...")
+        run_streaming_pipeline(PDFDataSource(workers=workers), index_type=index_type or FAISS_INDEX_TYPE)
+        _reload_retriever()
+        return
+
+    if incremental:
+        print("Updating pipeline incrementally...")
+        run_incremental_pipeline(PDFDataSource(workers=workers), index_type=index_type)
+        _reload_retriever()
+        return
+
+    failed = {}
     if not skip_ingestion:
         print("Step 1: Ingesting PDFs...")
-        process_all_pdfs(save_txt=True)
+        failed = process_all_pdfs(save_txt=True, workers=workers)
+        process_all_pickles()
         print("✓ PDF ingestion complete\n")
     
     if not skip_embedding:
@@ -36,28 +78,62 @@ def setup_pipeline(skip_ingestion=False, skip_embedding=False, skip_indexing=Fal
     
     if not skip_indexing:
         print("Step 3: Building FAISS index...")
-        idx, chunks = run_vector_store_pipeline()
-        print(f"✓ Index built with {len(chunks)} vectors\n")
+        idx, chunks = run_vector_store_pipeline(index_type=index_type or FAISS_INDEX_TYPE)
+        print(f"✓ Index built with {idx.ntotal} vectors\n")
+
+        # Record what was indexed so later runs can be incremental
+        if isinstance(chunks, ChunkStore):
+            rebuild_manifest(chunks, failed=failed)
+        _reload_retriever()
 
 
-def query_pipeline(query: str, top_k: int = 5, llm_model: str = None):
+def _reload_retriever():
+    """Pick up the new index if a retriever is already resident."""
+    retriever = get_default_retriever()
+    if retriever.is_loaded:
+        retriever.reload()
+
+
+def query_pipeline(query: str, top_k: int = None, llm_model: str = None):
     """
     Run a single query through the RAG pipeline.
     
     Args:
         query: The question to answer
-        top_k: Number of documents to retrieve
+        top_k: Maximum documents to consider for the context (None = auto)
         llm_model: LLM model to use
     """
     if llm_model:
         print(f"Using LLM: {llm_model}\n")
         set_llm(llm_model)
+
+    # Load embedding model, index and chunks once up front
+    get_default_retriever().load()
     
     print(f"Query: {query}\n")
     answer = run_rag_pipeline(query, top_k=top_k)
     print(f"Answer:\n{answer}\n")
 
 
+def serve(
+    host: str = SERVER_HOST,
+    port: int = SERVER_PORT,
+    batch_window_ms: float = SERVER_BATCH_WINDOW_MS,
+    max_batch_size: int = SERVER_MAX_BATCH_SIZE,
+    llm_model: str = None
+):
+    """
+    Run the HTTP query server until interrupted.
+
+    Models, index and chunks stay loaded between requests, and concurrent
+    requests are batched (see server.app).
+    """
+    if llm_model:
+        print(f"Using LLM: {llm_model}\n")
+        set_llm(llm_model)
+    run_server(host=host, port=port, batch_window_ms=batch_window_ms, max_batch_size=max_batch_size)
+
+
 def list_llms():
     """List all supported LLM models."""
     models = LLMFactory.list_models()
@@ -81,11 +157,38 @@ def main():
     setup_parser.add_argument("--skip-ingestion", action="store_true", help="Skip PDF ingestion")
     setup_parser.add_argument("--skip-embedding", action="store_true", help="Skip embedding generation")
     setup_parser.add_argument("--skip-indexing", action="store_true", help="Skip index building")
+    setup_parser.add_argument(
+        "--index-type",
+        choices=SUPPORTED_INDEX_TYPES,
+        default=None,
+        help=f"FAISS index type (default: {FAISS_INDEX_TYPE}; --incremental keeps the existing type)"
+    )
+    setup_parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only process PDFs added, changed or removed since the last run"
+    )
+    setup_parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Parse, embed and index in one pass with bounded memory"
+    )
+    setup_parser.add_argument(
+        "--workers",
+        type=int,
+        default=PDF_WORKERS,
+        help=f"Processes used to parse PDFs (default: {PDF_WORKERS})"
+    )
     
     # Query command
     query_parser = subparsers.add_parser("query", help="Query the RAG pipeline")
     query_parser.add_argument("query", type=str, help="Question to answer")
-    query_parser.add_argument("--top-k", type=int, default=5, help="Number of documents to retrieve")
+    query_parser.add_argument(
+        "--top-k",
+        type=int,
+        default=None,
+        help="Maximum documents to consider for the context (default: auto)"
+    )
     query_parser.add_argument(
         "--llm",
         type=str,
@@ -93,6 +196,29 @@ def main():
         help=f"LLM model to use (default: {DEFAULT_LLM_MODEL})"
     )
     
+    # Serve command
+    serve_parser = subparsers.add_parser("serve", help="Run the HTTP query server")
+    serve_parser.add_argument("--host", type=str, default=SERVER_HOST, help=f"Interface (default: {SERVER_HOST})")
+    serve_parser.add_argument("--port", type=int, default=SERVER_PORT, help=f"Port (default: {SERVER_PORT})")
+    serve_parser.add_argument(
+        "--batch-window-ms",
+        type=float,
+        default=SERVER_BATCH_WINDOW_MS,
+        help=f"Max wait for concurrent requests to join a batch (default: {SERVER_BATCH_WINDOW_MS})"
+    )
+    serve_parser.add_argument(
+        "--max-batch-size",
+        type=int,
+        default=SERVER_MAX_BATCH_SIZE,
+        help=f"Max queries per embedding + search batch (default: {SERVER_MAX_BATCH_SIZE})"
+    )
+    serve_parser.add_argument(
+        "--llm",
+        type=str,
+        default=None,
+        help=f"LLM model for /query (default: {DEFAULT_LLM_MODEL})"
+    )
+
     # List models command
     list_parser = subparsers.add_parser("list-llms", help="List all supported LLM models")
     
@@ -102,10 +228,22 @@ def main():
         setup_pipeline(
             skip_ingestion=args.skip_ingestion,
             skip_embedding=args.skip_embedding,
-            skip_indexing=args.skip_indexing
+            skip_indexing=args.skip_indexing,
+            index_type=args.index_type,
+            incremental=args.incremental,
+            streaming=args.streaming,
+            workers=args.workers
         )
     elif args.command == "query":
         query_pipeline(args.query, top_k=args.top_k, llm_model=args.llm)
+    elif args.command == "serve":
+        serve(
+            host=args.host,
+            port=args.port,
+            batch_window_ms=args.batch_window_ms,
+            max_batch_size=args.max_batch_size,
+            llm_model=args.llm
+        )
     elif args.command == "list-llms":
         list_llms()
     else:
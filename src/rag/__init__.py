@@ -1,10 +1,13 @@
 # RAG package
 from .pipeline import run_rag_pipeline
-from .formatting import format_context
+from .formatting import format_context, pack_context
 from .prompts import create_prompt
+from .answer_cache import SemanticAnswerCache
 
 __all__ = [
     "run_rag_pipeline",
     "format_context",
+    "pack_context",
     "create_prompt",
+    "SemanticAnswerCache",
 ]
@@ -0,0 +1,153 @@
+"""
+Semantic answer cache for near-duplicate questions.
+
+Past questions are kept in a small FAISS inner-product index over their
+(normalized) query embeddings. A new question reuses a stored answer when
+its cosine similarity to a past question passes the threshold and the
+answer came from the same LLM.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import faiss
+import numpy as np
+
+from config.settings import ANSWER_CACHE_SIZE, ANSWER_CACHE_THRESHOLD
+
+
+class SemanticAnswerCache:
+    """
+    Size-bounded LRU cache of answers, looked up by query-embedding similarity.
+
+    All entries belong to one document index version; when a lookup or store
+    sees a different version (the index was rebuilt), the cache is cleared.
+
+    Args:
+        max_entries: Maximum cached answers before LRU eviction
+        threshold: Minimum cosine similarity for a cache hit
+        search_k: Nearest past questions inspected per lookup
+    """
+
+    def __init__(
+        self,
+        max_entries: int = ANSWER_CACHE_SIZE,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        search_k: int = 8,
+    ):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.search_k = search_k
+        self.hits = 0
+        self.misses = 0
+
+        self._index: Optional[faiss.IndexIDMap] = None
+        self._entries: OrderedDict[int, Dict] = OrderedDict()
+        self._index_version: Optional[str] = None
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def lookup(
+        self,
+        query_vector: np.ndarray,
+        llm_model: str,
+        index_version: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Return a cached answer for a similar past question, or None.
+
+        Args:
+            query_vector: Normalized query embedding
+            llm_model: Name of the LLM that would answer
+            index_version: Version of the document index being queried
+        """
+        with self._lock:
+            self._check_version(index_version)
+
+            if self._index is None or self._index.ntotal == 0:
+                self.misses += 1
+                return None
+
+            k = min(self.search_k, self._index.ntotal)
+            scores, ids = self._index.search(_as_row(query_vector), k)
+
+            for score, entry_id in zip(scores[0], ids[0]):
+                if entry_id < 0 or score < self.threshold:
+                    break  # Results are sorted by similarity
+                entry = self._entries[int(entry_id)]
+                if entry["llm_model"] == llm_model:
+                    self._entries.move_to_end(int(entry_id))
+                    self.hits += 1
+                    return entry["answer"]
+
+            self.misses += 1
+            return None
+
+    def store(
+        self,
+        query: str,
+        query_vector: np.ndarray,
+        answer: str,
+        llm_model: str,
+        index_version: Optional[str] = None,
+    ) -> None:
+        """Cache an answer, evicting the least recently used entries if full."""
+        if self.max_entries <= 0:
+            return
+
+        with self._lock:
+            self._check_version(index_version)
+
+            vector = _as_row(query_vector)
+            if self._index is None:
+                self._index = faiss.IndexIDMap(faiss.IndexFlatIP(vector.shape[1]))
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(vector, np.array([entry_id], dtype=np.int64))
+            self._entries[entry_id] = {
+                "query": query,
+                "answer": answer,
+                "llm_model": llm_model,
+            }
+
+            while len(self._entries) > self.max_entries:
+                evicted_id, _ = self._entries.popitem(last=False)
+                self._index.remove_ids(np.array([evicted_id], dtype=np.int64))
+
+    def invalidate(self) -> None:
+        """Drop every cached answer (e.g. after the document index is rebuilt)."""
+        with self._lock:
+            self._clear()
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters and occupancy."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ----------------------------
+    # Internals
+    # ----------------------------
+
+    def _check_version(self, index_version: Optional[str]) -> None:
+        if index_version != self._index_version:
+            self._clear()
+            self._index_version = index_version
+
+    def _clear(self) -> None:
+        self._entries.clear()
+        if self._index is not None:
+            self._index.reset()
+
+
+def _as_row(vector: np.ndarray) -> np.ndarray:
+    return np.ascontiguousarray(np.asarray(vector, dtype=np.float32).reshape(1, -1))
@@ -1,4 +1,26 @@
-from typing import List, Dict
+from typing import Callable, List, Dict, Tuple
+
+from config.settings import MIN_TRUNCATED_CHUNK_TOKENS
+from utils import estimate_tokens
+
+
+CHUNK_SEPARATOR = "\n\n"
+
+
+def format_chunk(chunk: Dict) -> str:
+    """
+    Render a single chunk with its filename/page citation.
+
+    Locations of duplicate copies dropped at ingestion are cited too.
+    """
+    meta = chunk["metadata"]
+    citation = f"{meta['filename']} - Page {meta['page_number']}"
+    duplicates = meta.get("duplicates")
+    if duplicates:
+        citation += "; also " + ", ".join(
+            f"{dup['filename']} - Page {dup['page_number']}" for dup in duplicates
+        )
+    return f"[{citation}] {chunk['text']}"
 
 
 def format_context(chunks: List[Dict]) -> str:
@@ -7,10 +29,90 @@ def format_context(chunks: List[Dict]) -> str:
     - Concatenate text from multiple chunks
     - Include metadata like filename/page
     """
-    context_parts = []
+    return CHUNK_SEPARATOR.join(format_chunk(chunk) for chunk in chunks)
+
+
+def pack_context(
+    chunks: List[Dict],
+    token_budget: int,
+    count_tokens: Callable[[str], int] = estimate_tokens,
+    truncate_last: bool = True,
+    min_truncated_tokens: int = MIN_TRUNCATED_CHUNK_TOKENS,
+) -> Tuple[str, List[Dict], int]:
+    """
+    Greedily pack ranked chunks into a context that fits a token budget.
+
+    Chunks are added in rank order until the next one would overflow the
+    budget. If truncate_last is set, that chunk is trimmed to the remaining
+    budget instead of being dropped (as long as at least
+    min_truncated_tokens are left for it).
+
+    Args:
+        chunks: Retrieved chunks, best first
+        token_budget: Maximum tokens the context may use
+        count_tokens: Token counter for a piece of text
+        truncate_last: Trim the first overflowing chunk to fit
+        min_truncated_tokens: Smallest trimmed chunk worth including
+
+    Returns:
+        (context, packed_chunks, tokens_used)
+    """
+    parts: List[str] = []
+    packed: List[Dict] = []
+    separator_tokens = count_tokens(CHUNK_SEPARATOR)
+    used = 0
+
     for chunk in chunks:
-        meta = chunk["metadata"]
-        context_parts.append(
-            f"[{meta['filename']} - Page {meta['page_number']}] {chunk['text']}"
-        )
-    return "\n\n".join(context_parts)
+        overhead = separator_tokens if parts else 0
+        part = format_chunk(chunk)
+        cost = count_tokens(part) + overhead
+
+        if used + cost <= token_budget:
+            parts.append(part)
+            packed.append(chunk)
+            used += cost
+            continue
+
+        remaining = token_budget - used - overhead
+        if truncate_last and remaining >= min_truncated_tokens:
+            trimmed = _truncate_chunk(chunk, remaining, count_tokens)
+            if trimmed is not None:
+                part = format_chunk(trimmed)
+                parts.append(part)
+                packed.append(trimmed)
+                used += count_tokens(part) + overhead
+        break
+
+    return CHUNK_SEPARATOR.join(parts), packed, used
+
+
+def _truncate_chunk(
+    chunk: Dict,
+    token_budget: int,
+    count_tokens: Callable[[str], int],
+) -> Dict | None:
+    """
+    Return a copy of chunk with its text cut to the longest prefix whose
+    formatted form fits token_budget, or None if not even the citation fits.
+    """
+    text = chunk["text"]
+    low, high = 0, len(text)
+
+    # Binary search on prefix length; works for any monotone token counter
+    while low < high:
+        mid = (low + high + 1) // 2
+        candidate = {**chunk, "text": text[:mid]}
+        if count_tokens(format_chunk(candidate)) <= token_budget:
+            low = mid
+        else:
+            high = mid - 1
+
+    if low == 0:
+        return None
+
+    # Prefer ending on a word boundary when one is close by
+    cut = text.rfind(" ", 0, low)
+    if cut > low * 0.8:
+        low = cut
+
+    return {**chunk, "text": text[:low], "truncated": True}
@@ -1,11 +1,23 @@
-from typing import List, Dict, Optional
-
-from retrieval import retrieve
-from components.llm import LLMFactory
-from config.settings import DEFAULT_LLM_MODEL, DEFAULT_MAX_TOKENS
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+
+from retrieval import get_default_retriever
+from components.llm import BatchedLLM, LLMFactory, LocalLLM
+from config.settings import (
+    DEFAULT_LLM_MODEL,
+    DEFAULT_MAX_TOKENS,
+    MAX_CONTEXT_CANDIDATES,
+    RERANK_TOP_K,
+    CONTEXT_RESERVED_TOKENS,
+    ANSWER_CACHE_ENABLED,
+    LLM_BATCHING_ENABLED,
+)
 from config.llm_config import get_max_output_tokens, get_max_input_tokens
-from .formatting import format_context
+from utils import estimate_tokens
+from .formatting import pack_context
 from .prompts import create_prompt
+from .answer_cache import SemanticAnswerCache
 
 
 # ----------------------------
@@ -26,7 +38,13 @@ def set_llm(model_name: str = DEFAULT_LLM_MODEL, **kwargs):
     """
     global _llm
     print(f"Loading LLM: {model_name}...")
-    _llm = LLMFactory.create(model_name, **kwargs)
+    llm = LLMFactory.create(model_name, **kwargs)
+    # Concurrent questions (e.g. server threads) share padded generate calls
+    if LLM_BATCHING_ENABLED and isinstance(llm, LocalLLM):
+        llm = BatchedLLM(llm)
+    if isinstance(_llm, BatchedLLM):
+        _llm.close()
+    _llm = llm
     print(f"✓ LLM loaded: {model_name}")
 
 
@@ -39,54 +57,96 @@ def get_llm():
 
 
 # ----------------------------
-# Token Management Utilities
+# Global Answer Cache
 # ----------------------------
 
-def estimate_tokens(text: str) -> int:
+_answer_cache = None
+
+
+def get_answer_cache() -> SemanticAnswerCache:
+    """Get the process-wide semantic answer cache, creating it on first use."""
+    global _answer_cache
+    if _answer_cache is None:
+        _answer_cache = SemanticAnswerCache()
+    return _answer_cache
+
+
+def cached_answer(query: str) -> Optional[str]:
     """
-    Rough estimate of token count (1 token ≈ 4 characters).
-    For accurate count, use tokenizer from llm.tokenizer.
+    Look up the cached answer of a near-duplicate past question.
+
+    The cache key does not cover filters, retrieval mode or reranking, so
+    only questions answered from the default retrieval may use it.
+
+    Returns:
+        The cached answer, or None on a miss
     """
-    return len(text) // 4
+    answer = get_answer_cache().lookup(*_answer_cache_key(query))
+    if answer is not None:
+        print("⚡ Answer served from cache")
+    return answer
 
 
-def calculate_optimal_top_k(query: str, max_attempts: int = 10) -> int:
+def _answer_cache_key(query: str) -> Tuple[np.ndarray, str, Optional[str]]:
+    """(query vector, model name, index version) a question is cached under."""
+    retriever = get_default_retriever()
+    return retriever.embed(query), get_llm().model_name, retriever.index_version
+
+
+# ----------------------------
+# Context Building
+# ----------------------------
+
+def context_top_k(top_k: Optional[int] = None) -> int:
     """
-    Dynamically calculate the optimal top_k that fits within token limit.
-    
+    Candidate chunks retrieved for a question's context.
+
+    Returns:
+        top_k if given, else RERANK_TOP_K when the retriever reranks and
+        MAX_CONTEXT_CANDIDATES otherwise
+    """
+    if top_k:
+        return top_k
+    # Reranked chunks are precise enough that a few of them make the context
+    return RERANK_TOP_K if get_default_retriever().rerank else MAX_CONTEXT_CANDIDATES
+
+
+def build_context(
+    query: str,
+    top_k: Optional[int] = None,
+    candidates: Optional[List[Dict]] = None
+) -> Tuple[str, List[Dict], int]:
+    """
+    Retrieve once and pack as many ranked chunks as fit the LLM's input budget.
+
     Args:
         query: The user's question
-        max_attempts: Maximum documents to try (starts high, reduces if needed)
-    
+        top_k: Maximum candidate chunks to consider (see context_top_k)
+        candidates: Already retrieved chunks, ranked best first (skips
+            retrieval, e.g. when a server batches it)
+
     Returns:
-        Optimal top_k value that won't exceed token limit
+        (context, packed_chunks, context_tokens)
     """
     llm = get_llm()
     max_input_tokens = get_max_input_tokens(llm.model_name)
-    
-    # Reserve tokens for query + prompt structure + output
-    reserved_tokens = estimate_tokens(query) + 100  
-    available_for_context = max_input_tokens - reserved_tokens
-    
-    # Try progressively smaller top_k values
-    for top_k in range(max_attempts, 0, -1):
-        retrieved_chunks = retrieve(query=query, top_k=top_k)
-        
-        if not retrieved_chunks:
-            continue
-        
-        context = format_context(retrieved_chunks)
-        context_tokens = estimate_tokens(context)
-        
-        # Check if this top_k fits
-        total_tokens = reserved_tokens + context_tokens
-        
-        if total_tokens <= max_input_tokens:
-            print(f"📊 Optimal top_k: {top_k} (total tokens: {total_tokens}/{max_input_tokens})")
-            return top_k
-    
-    # If nothing fits, return 1
-    return 1
+
+    # Reserve tokens for query + prompt structure
+    reserved_tokens = estimate_tokens(query) + CONTEXT_RESERVED_TOKENS
+    available_for_context = max(max_input_tokens - reserved_tokens, 0)
+
+    if candidates is None:
+        candidates = get_default_retriever().search(query, top_k=context_top_k(top_k))
+    elif top_k:
+        candidates = candidates[:top_k]
+    context, packed, context_tokens = pack_context(candidates, available_for_context)
+
+    total_tokens = reserved_tokens + context_tokens
+    print(
+        f"📊 Packed {len(packed)}/{len(candidates)} chunks "
+        f"(total tokens: {total_tokens}/{max_input_tokens})"
+    )
+    return context, packed, context_tokens
 
 
 # ----------------------------
@@ -97,16 +157,20 @@ def run_rag_pipeline(
     query: str,
     top_k: int = None,
     max_tokens: int = None,
-    llm_model: Optional[str] = None
+    llm_model: Optional[str] = None,
+    use_cache: bool = ANSWER_CACHE_ENABLED,
+    candidates: Optional[List[Dict]] = None
 ) -> str:
     """
     End-to-end RAG pipeline with dynamic token optimization and LLM switching.
 
     Args:
         query: The question
-        top_k: Number of documents to retrieve (None = auto-calculate)
+        top_k: Maximum documents to consider for the context (None = auto)
         max_tokens: Max output tokens (None = use model default)
         llm_model: Optional LLM model to use (switches LLM if provided)
+        use_cache: Reuse the answer of a near-duplicate past question
+        candidates: Already retrieved context candidates (see build_context)
         
     Returns:
         Generated answer as string
@@ -121,16 +185,24 @@ def run_rag_pipeline(
     if max_tokens is None:
         max_tokens = get_max_output_tokens(llm.model_name)
     
-    # Dynamically calculate top_k if not specified
-    top_k = calculate_optimal_top_k(query)
+    # Serve rephrasings of past questions from the answer cache
+    if use_cache:
+        query_vector, model_name, index_version = _answer_cache_key(query)
+        cached = get_answer_cache().lookup(query_vector, model_name, index_version)
+        if cached is not None:
+            print("⚡ Answer served from cache")
+            return cached
     
-    retrieved_chunks = retrieve(query=query, top_k=top_k)
-    if not retrieved_chunks:
+    # Single retrieval, greedily packed to the model's input budget
+    context, packed_chunks, _ = build_context(query, top_k=top_k, candidates=candidates)
+    if not packed_chunks:
         return "No relevant documents found."
     
-    context = format_context(retrieved_chunks)
     prompt = create_prompt(query, context)
     answer = llm.generate(prompt=prompt, max_length=max_tokens)
+
+    if use_cache:
+        get_answer_cache().store(query, query_vector, answer, model_name, index_version)
     return answer
 
 
@@ -1,13 +1,23 @@
 # Retrieval package
-from .retrieve import retrieve
-from .search import search_index, embed_query
+from .retrieve import retrieve, retrieve_many
+from .retriever import Retriever, get_default_retriever, set_default_retriever
+from .search import search_index, embed_query, embed_queries, QueryEmbeddingCache
 from .embeddings import generate_embeddings, save_embeddings, load_chunks
+from .store import ChunkStore, ChunkStoreWriter
 
 __all__ = [
     "retrieve",
+    "retrieve_many",
+    "Retriever",
+    "get_default_retriever",
+    "set_default_retriever",
     "search_index",
     "embed_query",
+    "embed_queries",
+    "QueryEmbeddingCache",
     "generate_embeddings",
     "save_embeddings",
     "load_chunks",
+    "ChunkStore",
+    "ChunkStoreWriter",
 ]
@@ -0,0 +1,195 @@
+"""
+Two-stage search over binary-quantized embeddings.
+
+Stage one keeps only the sign bit of every embedding component (384 dims ->
+48 bytes, 1/32 of float32) in a FAISS binary index and finds the closest
+codes by Hamming distance, over-fetching top_k * rescore_factor candidates.
+Stage two rescores just those candidates exactly against the float vectors
+of the memory-mapped chunk store, so only their rows are read from disk.
+
+rescore_factor trades recall for latency; scripts/bench_binary.py measures
+both against the exact float index.
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import faiss
+import numpy as np
+
+from config import (
+    BINARY_INDEX_PATH,
+    BINARY_INDEX_TYPE,
+    BINARY_RESCORE_FACTOR,
+    FILTER_EXACT_MAX_ROWS,
+    HNSW_M,
+    HNSW_EF_CONSTRUCTION,
+    HNSW_EF_SEARCH,
+    INDEX_ADD_BATCH_SIZE,
+    INDEX_MMAP,
+)
+from .filters import exact_search, filtered_search
+from .store import ChunkStore
+
+
+SUPPORTED_BINARY_INDEX_TYPES = ["binary_flat", "binary_hnsw"]
+
+
+def binarize(vectors: np.ndarray) -> np.ndarray:
+    """Pack the sign bits of (n, dim) vectors into (n, dim / 8) uint8 codes."""
+    return np.packbits(np.asarray(vectors) > 0, axis=-1)
+
+
+def create_binary_index(dimension: int, index_type: str = BINARY_INDEX_TYPE) -> faiss.IndexBinary:
+    """
+    Create an empty binary index over dimension-bit codes, accepting explicit ids.
+
+    Args:
+        dimension: Embedding dimension (a multiple of 8)
+        index_type: One of SUPPORTED_BINARY_INDEX_TYPES
+    """
+    if dimension % 8 != 0:
+        raise ValueError(f"Binary codes need an embedding dimension divisible by 8, got {dimension}")
+
+    if index_type == "binary_flat":
+        index = faiss.IndexBinaryFlat(dimension)
+    elif index_type == "binary_hnsw":
+        index = faiss.IndexBinaryHNSW(dimension, HNSW_M)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    else:
+        raise ValueError(
+            f"Unknown binary index type: {index_type}. "
+            f"Supported binary index types: {SUPPORTED_BINARY_INDEX_TYPES}"
+        )
+    return faiss.IndexBinaryIDMap(index)
+
+
+def configure_binary_search_params(index: faiss.IndexBinary, ef_search: int = HNSW_EF_SEARCH) -> faiss.IndexBinary:
+    """Apply the query-time efSearch to a binary HNSW index."""
+    base = index.index if isinstance(index, faiss.IndexBinaryIDMap) else index
+    base = faiss.downcast_IndexBinary(base)
+    if isinstance(base, faiss.IndexBinaryHNSW):
+        base.hnsw.efSearch = ef_search
+    return index
+
+
+def build_binary_index(
+    store: ChunkStore,
+    index_type: str = BINARY_INDEX_TYPE,
+    batch_size: int = INDEX_ADD_BATCH_SIZE
+) -> faiss.IndexBinary:
+    """
+    Binarize the live rows of a chunk store into a new binary index.
+
+    Codes are computed batch by batch from the memory-mapped matrix, and
+    FAISS ids are store row ids, as in the float index.
+    """
+    index = create_binary_index(store.dimension, index_type)
+    ids = store.live_ids()
+    for start in range(0, len(ids), batch_size):
+        batch_ids = np.ascontiguousarray(ids[start:start + batch_size])
+        index.add_with_ids(binarize(store.embeddings[batch_ids]), batch_ids)
+    return configure_binary_search_params(index)
+
+
+def save_binary_index(index: faiss.IndexBinary, path: Path = BINARY_INDEX_PATH) -> None:
+    """Persist a binary index atomically (see save_index)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    faiss.write_index_binary(index, str(tmp_path))
+    os.replace(tmp_path, path)
+
+
+def load_binary_index(path: Path = BINARY_INDEX_PATH, mmap: bool = INDEX_MMAP) -> faiss.IndexBinary:
+    """
+    Load a binary index from disk, with search parameters from config.
+
+    Args:
+        path: Index file
+        mmap: Memory-map the index read-only instead of reading it into RAM
+    """
+    if not path.exists():
+        raise FileNotFoundError(f"Binary index not found at {path}")
+    flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0
+    return configure_binary_search_params(faiss.read_index_binary(str(path), flags))
+
+
+def run_binary_index_pipeline(
+    store: ChunkStore,
+    index_type: str = BINARY_INDEX_TYPE,
+    path: Path = BINARY_INDEX_PATH
+) -> faiss.IndexBinary:
+    """Build the binary index from the chunk store and save it."""
+    index = build_binary_index(store, index_type)
+    save_binary_index(index, path)
+    print(f"✓ Binary index built with {index.ntotal} codes")
+    return index
+
+
+def search_binary_index(
+    query_vectors: np.ndarray,
+    index: faiss.IndexBinary,
+    store: ChunkStore,
+    top_k: int = 5,
+    rescore_factor: Optional[int] = BINARY_RESCORE_FACTOR,
+    ids: Optional[np.ndarray] = None
+) -> List[List[Dict]]:
+    """
+    Hamming search over binary codes, then exact rescoring of the candidates.
+
+    Takes and returns the same shapes as search_index. similarity_score is
+    the inner product of the float vectors (cosine similarity on our
+    normalized embeddings; higher is better).
+
+    Args:
+        query_vectors: 1D (single query) or 2D float query embeddings
+        index: Binary index whose ids are store row ids
+        store: Chunk store holding the float vectors
+        top_k: Results per query
+        rescore_factor: Candidates fetched per result; None or 0 skips
+            rescoring and ranks by Hamming distance alone
+        ids: Only search these rows (e.g. from a metadata filter)
+    """
+    query_vectors = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+    if ids is not None and len(ids) <= FILTER_EXACT_MAX_ROWS:
+        # Few rows selected: score them all exactly and skip the binary stage
+        scores, labels = exact_search(query_vectors, store.embeddings, ids, top_k)
+        return [
+            _results(store, row_labels[row_labels >= 0], row_scores[row_labels >= 0])
+            for row_labels, row_scores in zip(labels, scores)
+        ]
+
+    num_candidates = top_k * rescore_factor if rescore_factor else top_k
+    if ids is None:
+        distances, candidates = index.search(binarize(query_vectors), num_candidates)
+    else:
+        distances, candidates = filtered_search(index, binarize(query_vectors), num_candidates, ids)
+
+    all_results = []
+    for query_vector, row_distances, row_candidates in zip(query_vectors, distances, candidates):
+        found = row_candidates >= 0  # FAISS pads with -1 when fewer hits exist
+        row_candidates = row_candidates[found]
+        if rescore_factor:
+            # Sorted ids keep the memory-mapped reads sequential
+            row_candidates = np.sort(row_candidates)
+            scores = np.asarray(store.embeddings[row_candidates], dtype=np.float32) @ query_vector
+            order = np.argsort(-scores, kind="stable")[:top_k]
+            row_candidates, scores = row_candidates[order], scores[order]
+        else:
+            # Fraction of matching sign bits
+            scores = 1.0 - row_distances[found] / store.dimension
+
+        all_results.append(_results(store, row_candidates, scores))
+    return all_results
+
+
+def _results(store: ChunkStore, ids: np.ndarray, scores: np.ndarray) -> List[Dict]:
+    return [
+        {
+            "text": store.text(idx),
+            "metadata": store.metadata(idx),
+            "similarity_score": float(score)
+        }
+        for idx, score in zip(ids, scores)
+    ]
@@ -1,10 +1,19 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
-from config import CHUNKS_DIR, EMBEDDINGS_DIR, EMBEDDING_MODEL_NAME
-from utils import load_pickle, save_pickle
+from config import (
+    CHUNKS_DIR,
+    CHUNK_STORE_DIR,
+    DUPLICATES_PATH,
+    EMBEDDING_MODEL_NAME,
+    EMBEDDING_CACHE_ENABLED,
+    EMBEDDING_CHECKPOINT_SIZE,
+)
+from components.data.dedup import DuplicateMap
+from components.embeddings import BaseEmbedder, EmbeddingCache, EmbeddingPool
+from utils import load_pickle
+from .store import ChunkStore
 
 
 def load_chunks() -> List[Dict]:
@@ -12,21 +21,73 @@ def load_chunks() -> List[Dict]:
     return load_pickle(CHUNKS_DIR, "chunks.pkl")
 
 
-def generate_embeddings(
-    chunks: List[Dict],
-    model: SentenceTransformer
-) -> List[Dict]:
+def embed_texts(
+    texts: List[str],
+    model: BaseEmbedder,
+    show_progress_bar: bool = True,
+    cache: Optional[EmbeddingCache] = None,
+    checkpoint_size: int = EMBEDDING_CHECKPOINT_SIZE
+) -> np.ndarray:
     """
-    Generate embeddings for each chunk.
+    Embed texts into a (len(texts), dim) float32 matrix of normalized vectors.
+
+    With a cache, texts already embedded by the same model are read from it,
+    and the rest are embedded checkpoint_size texts at a time, each group
+    committed to the cache before the next starts. An interrupted run
+    therefore resumes from its last checkpoint.
+
+    Args:
+        texts: Texts to embed
+        model: Embedding backend
+        show_progress_bar: Display encoding progress
+        cache: Content-addressed embedding cache (None = no caching)
+        checkpoint_size: Texts embedded between cache commits
     """
-    texts = [chunk["text"] for chunk in chunks]
+    if cache is None:
+        return _encode(texts, model, show_progress_bar)
+
+    keys = [EmbeddingCache.key(model.backend_name, text) for text in texts]
+    cached = cache.get_many(keys)
+    missing = [i for i, key in enumerate(keys) if key not in cached]
+    if cached and show_progress_bar:
+        print(f"✓ {len(texts) - len(missing)}/{len(texts)} embeddings found in cache")
+
+    embeddings = np.empty((len(texts), model.get_sentence_embedding_dimension()), dtype=np.float32)
+    for i, key in enumerate(keys):
+        if key in cached:
+            embeddings[i] = cached[key]
+
+    for start in range(0, len(missing), checkpoint_size):
+        ids = missing[start:start + checkpoint_size]
+        batch = _encode([texts[i] for i in ids], model, show_progress_bar)
+        cache.put_many([keys[i] for i in ids], batch)
+        embeddings[ids] = batch
+    return embeddings
+
 
+def _encode(texts: List[str], model: BaseEmbedder, show_progress_bar: bool) -> np.ndarray:
     embeddings = model.encode(
         texts,
-        show_progress_bar=True,
+        show_progress_bar=show_progress_bar,
         convert_to_numpy=True,
         normalize_embeddings=True
     )
+    return np.asarray(embeddings, dtype=np.float32).reshape(len(texts), -1)
+
+
+def open_embedding_cache() -> Optional[EmbeddingCache]:
+    """The on-disk embedding cache, or None if EMBEDDING_CACHE_ENABLED is off."""
+    return EmbeddingCache() if EMBEDDING_CACHE_ENABLED else None
+
+
+def generate_embeddings(
+    chunks: List[Dict],
+    model: BaseEmbedder
+) -> List[Dict]:
+    """
+    Generate embeddings for each chunk.
+    """
+    embeddings = embed_texts([chunk["text"] for chunk in chunks], model)
 
     return [
         {
@@ -38,17 +99,20 @@ def generate_embeddings(
     ]
 
 
-def save_embeddings(embedded_chunks: List[Dict]) -> None:
-    """Persist embeddings to disk."""
-    save_pickle(EMBEDDINGS_DIR, embedded_chunks, "embeddings.pkl")
+def save_embeddings(embedded_chunks: List[Dict]) -> ChunkStore:
+    """Persist embeddings to disk as a columnar chunk store."""
+    embeddings = np.stack([chunk["embedding"] for chunk in embedded_chunks])
+    return ChunkStore.write(embeddings, embedded_chunks, CHUNK_STORE_DIR)
 
 
 def run_embedding_pipeline() -> None:
     """End-to-end embedding generation pipeline."""
     chunks = load_chunks()
-    model = SentenceTransformer(EMBEDDING_MODEL_NAME)
-    embedded_chunks = generate_embeddings(chunks, model)
-    save_embeddings(embedded_chunks)
+    # Length-sorted batches, spread over EMBEDDING_WORKERS processes
+    with EmbeddingPool(model_name=EMBEDDING_MODEL_NAME) as model:
+        # Write the matrix straight to the store instead of per-chunk dicts
+        embeddings = embed_texts([chunk["text"] for chunk in chunks], model, cache=open_embedding_cache())
+    ChunkStore.write(embeddings, chunks, CHUNK_STORE_DIR, duplicates=DuplicateMap.load(DUPLICATES_PATH))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,234 @@
+"""
+Metadata filters applied inside the vector search.
+
+A filter such as {"filename": "report", "page_number": (3, 10)} is
+resolved to the store row ids it matches with a column index (each
+metadata column argsorted once), then handed to FAISS as an IDSelector,
+so the index only ever considers matching rows.
+
+When a filter matches few rows, the selected vectors are scored exactly
+instead: graph (HNSW) and inverted-list (IVF) searches can miss or
+under-fill the top-k when most of the rows they visit are filtered out.
+"""
+
+from typing import Dict, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+
+from config import FILTER_EXACT_MAX_ROWS
+from .store import ChunkStore
+
+SUPPORTED_FILTER_FIELDS = ["filename", "page_number", "chunk_id"]
+
+
+class MetadataIndex:
+    """
+    Sorted column index over the metadata of a chunk store.
+
+    Each column is argsorted on first use, so a filter is a binary search
+    per value (or range) instead of a scan of the column.
+
+    Args:
+        store: Chunk store to index
+    """
+
+    def __init__(self, store: ChunkStore):
+        self.store = store
+        self._columns: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def select(self, filters: Dict) -> np.ndarray:
+        """
+        Row ids of the live chunks matching every filter.
+
+        Args:
+            filters: {field: value}, where value is a single value, a list
+                or set of values, or an inclusive (low, high) tuple range
+                (page_number and chunk_id)
+
+        Returns:
+            Sorted int64 row ids
+        """
+        selected = None
+        for field, value in filters.items():
+            rows = self._select_field(field, value)
+            selected = rows if selected is None else np.intersect1d(selected, rows, assume_unique=True)
+        if selected is None:
+            return self.store.live_ids()
+        if len(self.store.deleted):
+            selected = np.setdiff1d(selected, self.store.deleted, assume_unique=True)
+        return selected
+
+    def _select_field(self, field: str, value) -> np.ndarray:
+        if field not in SUPPORTED_FILTER_FIELDS:
+            raise ValueError(
+                f"Unsupported filter field '{field}'. "
+                f"Supported filter fields: {SUPPORTED_FILTER_FIELDS}"
+            )
+        values, order = self._column(field)
+
+        if isinstance(value, tuple):
+            if field == "filename" or len(value) != 2:
+                raise ValueError(f"Range filters take (low, high) on numeric fields, got {field}={value!r}")
+            low, high = value
+            start = np.searchsorted(values, low, side="left")
+            end = np.searchsorted(values, high, side="right")
+            return np.sort(order[start:end])
+
+        wanted = value if isinstance(value, (list, set, frozenset)) else [value]
+        if field == "filename":
+            # Compare on filename ids; unknown names match nothing
+            wanted = [self.store.filenames.index(name) for name in wanted if name in self.store.filenames]
+        parts = [
+            order[np.searchsorted(values, v, side="left"):np.searchsorted(values, v, side="right")]
+            for v in wanted
+        ]
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+    def _column(self, field: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(sorted values, row ids in that order) of one metadata column."""
+        if field not in self._columns:
+            column = {
+                "filename": self.store.filename_ids,
+                "page_number": self.store.page_numbers,
+                "chunk_id": self.store.chunk_ids,
+            }[field]
+            order = np.argsort(column, kind="stable").astype(np.int64)
+            self._columns[field] = (np.asarray(column)[order], order)
+        return self._columns[field]
+
+
+def select_ids(embedded_chunks: Sequence[Dict], filters: Dict) -> np.ndarray:
+    """
+    Row ids of the chunks matching filters, for a store or a list of chunks.
+
+    A ChunkStore is resolved through a (throwaway) MetadataIndex; callers
+    filtering repeatedly should keep a MetadataIndex instead.
+    """
+    if isinstance(embedded_chunks, ChunkStore):
+        return MetadataIndex(embedded_chunks).select(filters)
+    return np.array(
+        [i for i, chunk in enumerate(embedded_chunks) if _matches(chunk["metadata"], filters)],
+        dtype=np.int64,
+    )
+
+
+def _matches(metadata: Dict, filters: Dict) -> bool:
+    for field, value in filters.items():
+        if field not in SUPPORTED_FILTER_FIELDS:
+            raise ValueError(
+                f"Unsupported filter field '{field}'. "
+                f"Supported filter fields: {SUPPORTED_FILTER_FIELDS}"
+            )
+        actual = metadata.get(field)
+        if isinstance(value, tuple):
+            if not value[0] <= actual <= value[1]:
+                return False
+        elif isinstance(value, (list, set, frozenset)):
+            if actual not in value:
+                return False
+        elif actual != value:
+            return False
+    return True
+
+
+def id_selector(ids: np.ndarray) -> Tuple[faiss.IDSelector, np.ndarray]:
+    """
+    FAISS selector accepting exactly the given row ids.
+
+    Returns:
+        (selector, bitmap); the bitmap backs the selector and must be kept
+        alive for as long as the selector is used
+    """
+    mask = np.zeros(int(ids.max()) + 1 if len(ids) else 0, dtype=bool)
+    mask[ids] = True
+    bitmap = np.packbits(mask, bitorder="little")
+    return faiss.IDSelectorBitmap(bitmap), bitmap
+
+
+def search_parameters(index, selector: faiss.IDSelector):
+    """
+    Search parameters carrying a selector for any index type.
+
+    Parameters passed to search() replace those set on the index, so the
+    configured nprobe / efSearch are copied over.
+    """
+    base = index
+    while isinstance(base, (faiss.IndexIDMap, faiss.IndexIDMap2, faiss.IndexBinaryIDMap)):
+        base = base.index
+    base = faiss.downcast_IndexBinary(base) if isinstance(base, faiss.IndexBinary) else faiss.downcast_index(base)
+
+    if isinstance(base, (faiss.IndexHNSW, faiss.IndexBinaryHNSW)):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=base.hnsw.efSearch)
+    ivf = faiss.try_extract_index_ivf(base) if isinstance(base, faiss.Index) else None
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    return faiss.SearchParameters(sel=selector)
+
+
+def exact_search(
+    query_vectors: np.ndarray,
+    vectors: np.ndarray,
+    ids: np.ndarray,
+    top_k: int,
+    metric: int = faiss.METRIC_INNER_PRODUCT
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exhaustively score the rows ids of vectors, like index.search().
+
+    Returns:
+        (scores, ids) of shape (num_queries, top_k), padded with -1 ids;
+        squared L2 distances (ascending) for METRIC_L2, inner products
+        (descending) otherwise
+    """
+    num_queries = len(query_vectors)
+    distances = np.full((num_queries, top_k), np.nan, dtype=np.float32)
+    labels = np.full((num_queries, top_k), -1, dtype=np.int64)
+    if not len(ids):
+        return distances, labels
+
+    candidates = np.asarray(vectors[ids], dtype=np.float32)
+    scores = query_vectors @ candidates.T
+    if metric == faiss.METRIC_L2:
+        scores = (
+            np.sum(query_vectors ** 2, axis=1, keepdims=True)
+            - 2 * scores
+            + np.sum(candidates ** 2, axis=1)
+        )
+    else:
+        scores = -scores  # Rank ascending either way
+
+    k = min(top_k, len(ids))
+    for row, row_scores in enumerate(scores):
+        top = np.argpartition(row_scores, k - 1)[:k] if len(ids) > k else np.arange(len(ids))
+        top = top[np.argsort(row_scores[top], kind="stable")]
+        labels[row, :k] = ids[top]
+        distances[row, :k] = row_scores[top] if metric == faiss.METRIC_L2 else -row_scores[top]
+    return distances, labels
+
+
+def filtered_search(
+    index,
+    query_vectors: np.ndarray,
+    top_k: int,
+    ids: np.ndarray,
+    vectors: Optional[np.ndarray] = None,
+    metric: int = faiss.METRIC_INNER_PRODUCT,
+    exact_max_rows: int = FILTER_EXACT_MAX_ROWS
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    index.search() restricted to the rows ids.
+
+    Selections of at most exact_max_rows rows are scored exactly against
+    vectors (when given); larger ones are searched with an IDSelector.
+
+    Returns:
+        (distances, labels) as from index.search()
+    """
+    if vectors is not None and len(ids) <= exact_max_rows:
+        return exact_search(query_vectors, vectors, ids, top_k, metric)
+
+    # Rows past the end of the bitmap are rejected, so it only spans the selection
+    selector, _bitmap = id_selector(ids)
+    return index.search(query_vectors, top_k, params=search_parameters(index, selector))
+
@@ -0,0 +1,270 @@
+"""
+Incremental ingestion: re-process only the PDFs that changed since the last run.
+
+The manifest records each PDF's content hash and the chunk ids it produced.
+On each run, added and changed PDFs are parsed, chunked, embedded and
+appended to the chunk store. Chunks of changed and removed PDFs are
+tombstoned in the store and removed from the FAISS index with remove_ids().
+With the sharded search engine, only the shards of touched documents are rebuilt.
+
+New chunks are deduplicated against the live chunks in the store. The
+store keeps every chunk's dedup fingerprint, so a run only hashes the new
+chunks and compares them with the stored chunks sharing a digest or LSH
+band (a store written by a full build is fingerprinted once, on the first
+incremental run). When a canonical chunk goes away with its document, the
+duplicates it stood for (in unchanged documents) are re-chunked from their
+page pickles and ingested in its place.
+"""
+
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from config import (
+    PDF_DIR,
+    CHUNK_STORE_DIR,
+    INDEX_PATH,
+    MANIFEST_PATH,
+    EMBEDDING_MODEL_NAME,
+    FAISS_INDEX_TYPE,
+    SEARCH_ENGINE,
+    NUM_SHARDS,
+    LEXICAL_INDEX_ENABLED,
+    DEDUP_ENABLED,
+)
+from components.data.dedup import ChunkDeduplicator, DuplicateMap, Fingerprints
+from components.data.directory import chunk_pdf_page_data
+from components.data.manifest import Manifest, file_hash
+from components.data.pdf import PDFDataSource
+from components.embeddings import EmbeddingPool
+from utils import load_pickle
+from .binary import run_binary_index_pipeline
+from .embeddings import embed_texts, open_embedding_cache
+from .lexical import run_lexical_index_pipeline
+from .indexing import (
+    build_faiss_index,
+    build_shards,
+    check_index_type,
+    index_type_of,
+    load_faiss_index,
+    save_index,
+    shard_of,
+    update_faiss_index,
+)
+from .store import ChunkStore, ChunkStoreWriter, write_fingerprints
+
+
+def hash_pdfs(pdf_dir: Path = PDF_DIR) -> Dict[str, str]:
+    """Return {pdf stem: content hash} for every PDF in a directory."""
+    return {path.stem: file_hash(path) for path in sorted(Path(pdf_dir).glob("*.pdf"))}
+
+
+def rebuild_manifest(store: ChunkStore, pdf_dir: Path = PDF_DIR, failed: Iterable[str] = ()) -> Manifest:
+    """
+    Write a manifest describing a store produced by a full (non-incremental) build.
+
+    Args:
+        store: The newly built chunk store
+        pdf_dir: Directory of the PDFs it was built from
+        failed: File names of PDFs that failed to parse (e.g. source.failed);
+            they are left out, so the next incremental run retries them
+
+    Returns:
+        The saved manifest
+    """
+    failed = {Path(filename).stem for filename in failed}
+    manifest = Manifest()
+    for name, digest in hash_pdfs(pdf_dir).items():
+        if name not in failed:
+            manifest.update(name, digest, store.filename_rows(name).tolist())
+    manifest.save(MANIFEST_PATH)
+    return manifest
+
+
+def run_incremental_pipeline(
+    source: Optional[PDFDataSource] = None,
+    index_type: Optional[str] = None,
+    save_txt: bool = True,
+    sync: bool = True,
+    dedup: bool = DEDUP_ENABLED,
+) -> Dict[str, List[str]]:
+    """
+    Bring the chunk store and FAISS index up to date with the PDF directory.
+
+    Starts from scratch if the store, index or manifest is missing.
+
+    Args:
+        source: PDF data source (default: PDFDataSource())
+        index_type: Index type of a new index (default: FAISS_INDEX_TYPE);
+            an existing index keeps its type, and a different type here
+            raises ValueError
+        save_txt: Also write human-readable .txt files for parsed PDFs
+        sync: Download the latest PDFs from cloud storage first
+        dedup: Drop new chunks that duplicate live chunks (or each other)
+
+    Returns:
+        {"added": [...], "changed": [...], "removed": [...], "failed": [...]}
+        document names
+    """
+    source = source or PDFDataSource()
+    if sync:
+        source.sync()
+
+    manifest = Manifest.load(MANIFEST_PATH)
+    fresh = not (
+        MANIFEST_PATH.exists()
+        and INDEX_PATH.exists()
+        and (CHUNK_STORE_DIR / "embeddings.npy").exists()
+    )
+    if fresh:
+        manifest = Manifest()
+    elif index_type is not None:
+        # Fail before touching the store
+        check_index_type(load_faiss_index(INDEX_PATH), index_type)
+
+    pdf_files = {path.stem: path for path in sorted(source.pdf_dir.glob("*.pdf"))}
+    hashes = hash_pdfs(source.pdf_dir)
+    added, changed, removed = manifest.diff(hashes)
+    summary = {"added": added, "changed": changed, "removed": removed}
+
+    print(f"Documents: {len(added)} added, {len(changed)} changed, {len(removed)} removed")
+    if not fresh and not (added or changed or removed):
+        print("✓ Index is up to date")
+        summary["failed"] = []
+        return summary
+
+    # Stages 1-2: parse (in parallel if configured) and chunk only the touched documents
+    parsed = source.process_files([pdf_files[name] for name in added + changed], save_txt=save_txt)
+    new_chunks: List[Dict] = []
+    for name, pages in parsed.items():
+        new_chunks.extend(chunk_pdf_page_data(pages, name))
+    for name in removed:
+        source.remove_outputs(name)
+    summary["failed"] = sorted(source.failed)
+
+    # Chunks of re-parsed and removed documents, plus any rows the manifest
+    # does not know about (left behind by an interrupted run). A changed PDF
+    # that failed to parse keeps its previous chunks.
+    stale_names = removed + [n for n in changed if n in parsed]
+    stale_ids = {i for name in stale_names for i in manifest.ids(name)}
+    old_store = None if fresh else ChunkStore(CHUNK_STORE_DIR)
+    if old_store is not None:
+        known = set(manifest.live_ids())
+        stale_ids.update(i for i in old_store.live_ids().tolist() if i not in known)
+    stale_ids = np.array(sorted(stale_ids), dtype=np.int64)
+
+    # Duplicates whose canonical chunk goes away are ingested in its place
+    duplicates = DuplicateMap() if old_store is None else old_store.duplicates
+    promoted = _load_chunks(duplicates.remove_files(stale_names), source)
+    new_chunks = promoted + new_chunks
+    deduplicator = ChunkDeduplicator(duplicates=duplicates) if dedup else None
+    fingerprints = None
+    if deduplicator is not None:
+        if old_store is not None and old_store.fingerprints(deduplicator.params) is None:
+            print(f"Fingerprinting {len(old_store)} stored chunks for deduplication (once)...")
+            old_store = write_fingerprints(old_store, deduplicator)
+        fingerprints = deduplicator.fingerprints(new_chunks)
+        if old_store is not None:
+            _seed_deduplicator(deduplicator, old_store, fingerprints, stale_ids)
+        keep = deduplicator.deduplicate_fingerprinted(new_chunks, fingerprints)
+        new_chunks = [chunk for chunk, kept in zip(new_chunks, keep) if kept]
+        fingerprints = tuple(column[keep] for column in fingerprints)
+        stats = deduplicator.stats()
+        print(
+            f"Dropped {stats['exact_duplicates']} exact and "
+            f"{stats['near_duplicates']} near-duplicate chunks"
+        )
+
+    # Stage 3: embed only the new chunks
+    with EmbeddingPool(model_name=EMBEDDING_MODEL_NAME) as model:
+        dimension = model.get_sentence_embedding_dimension()
+        embeddings = (
+            embed_texts([chunk["text"] for chunk in new_chunks], model, cache=open_embedding_cache())
+            if new_chunks else np.empty((0, dimension), dtype=np.float32)
+        )
+
+    # Stage 4: append to the store, tombstoning stale rows
+    with ChunkStoreWriter(
+        CHUNK_STORE_DIR, dimension, append=not fresh, duplicates=duplicates,
+        fingerprint_params=deduplicator.params if deduplicator is not None else None,
+    ) as writer:
+        new_ids = writer.append(embeddings, new_chunks, fingerprints)
+        writer.delete(stale_ids.tolist())
+    store = ChunkStore(CHUNK_STORE_DIR)
+
+    # Stage 5: update the index in place (or build it the first time)
+    if fresh:
+        index_type = index_type or FAISS_INDEX_TYPE
+        index = build_faiss_index(store, index_type)
+    else:
+        index = load_faiss_index(INDEX_PATH, mmap=False)
+        index = update_faiss_index(index, store, new_ids, stale_ids, index_type)
+        index_type = index_type_of(index)
+    save_index(index, INDEX_PATH)
+    if SEARCH_ENGINE == "binary":
+        # No training and one pass over the mmap'd store: cheaper to rebuild than to patch
+        run_binary_index_pipeline(store)
+    if SEARCH_ENGINE == "sharded":
+        touched_names = added + changed + removed + [chunk["metadata"]["filename"] for chunk in promoted]
+        touched = None if fresh else {shard_of(name, NUM_SHARDS) for name in touched_names}
+        build_shards(store, index_type=index_type, shards=touched)
+    if LEXICAL_INDEX_ENABLED:
+        # Only the appended rows are tokenized; tombstoned rows are dropped
+        run_lexical_index_pipeline(store, rebuild=fresh)
+
+    # The manifest is written last: until then a rerun redoes the same work
+    new_doc_ids = defaultdict(list)
+    for chunk, i in zip(new_chunks, new_ids.tolist()):
+        new_doc_ids[chunk["metadata"]["filename"]].append(i)
+    for name in removed:
+        manifest.remove(name)
+    for name in parsed:
+        manifest.update(name, hashes[name], new_doc_ids.pop(name, []))
+    # Promoted duplicates join the chunks of their unchanged documents
+    for name, ids in new_doc_ids.items():
+        manifest.update(name, manifest.documents[name]["hash"], manifest.ids(name) + ids)
+    manifest.save(MANIFEST_PATH)
+
+    print(f"✓ Index updated: +{len(new_ids)} / -{len(stale_ids)} chunks ({index.ntotal} total)")
+    return summary
+
+
+def _seed_deduplicator(
+    deduplicator: ChunkDeduplicator,
+    store: ChunkStore,
+    fingerprints: Fingerprints,
+    stale_ids: np.ndarray
+) -> None:
+    """Register the live stored chunks that new chunks may duplicate, from their stored fingerprints."""
+    stored = store.fingerprints(deduplicator.params)
+    rows = deduplicator.matching_rows(fingerprints, stored)
+    rows = rows[~np.isin(rows, store.deleted) & ~np.isin(rows, stale_ids)]
+    digests, signatures, band_keys = stored
+    for i in rows.tolist():
+        deduplicator.add_fingerprint(store.metadata(i), digests[i], signatures[i], band_keys[i])
+
+
+def _load_chunks(locations: List[Dict], source: PDFDataSource) -> List[Dict]:
+    """Re-chunk the chunks at the given locations from their documents' page pickles."""
+    wanted = defaultdict(set)
+    for location in locations:
+        wanted[location["filename"]].add((location["page_number"], location["chunk_id"]))
+
+    chunks = []
+    for name in sorted(wanted):
+        try:
+            pages = load_pickle(directory=source.pickle_dir, filename=f"{name}.pkl")
+        except FileNotFoundError:
+            print(f"⚠️  No page pickle for {name}; {len(wanted[name])} duplicate chunk(s) not restored")
+            continue
+        chunks.extend(
+            chunk for chunk in chunk_pdf_page_data(pages, name)
+            if (chunk["metadata"]["page_number"], chunk["metadata"]["chunk_id"]) in wanted[name]
+        )
+    return chunks
+
+
+if __name__ == "__main__":
+    run_incremental_pipeline()
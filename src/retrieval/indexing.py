@@ -1,49 +1,578 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
 from pathlib import Path
-from typing import List, Dict
+from typing import Dict, Iterable, Optional, Sequence
 
 import faiss
 import numpy as np
 
-from config import EMBEDDINGS_DIR, INDEX_PATH
+from config import (
+    EMBEDDINGS_DIR,
+    CHUNK_STORE_DIR,
+    INDEX_PATH,
+    INDEX_MMAP,
+    SHARDS_DIR,
+    NUM_SHARDS,
+    FAISS_INDEX_TYPE,
+    INDEX_TRAIN_SAMPLE_SIZE,
+    INDEX_ADD_BATCH_SIZE,
+    HNSW_M,
+    HNSW_EF_CONSTRUCTION,
+    HNSW_EF_SEARCH,
+    IVF_NLIST,
+    IVF_NPROBE,
+    PQ_M,
+    PQ_NBITS,
+    SEARCH_ENGINE,
+    LEXICAL_INDEX_ENABLED,
+)
 from utils import load_pickle
+from .binary import run_binary_index_pipeline
+from .lexical import run_lexical_index_pipeline
+from .store import ChunkStore, ChunkStoreWriter
 
 
-def load_embeddings() -> List[Dict]:
-    """Load embedded chunks from disk."""
-    return load_pickle(EMBEDDINGS_DIR, "embeddings.pkl")
+SUPPORTED_INDEX_TYPES = ["flat", "hnsw", "ivf_flat", "ivf_pq", "fp16", "sq8", "ivf_ondisk"]
 
+# Scalar quantizers: every vector component stored in 2 bytes (fp16) or as
+# one byte on a per-dimension [min, max] range learned in training (sq8)
+_SCALAR_QUANTIZERS = {
+    "fp16": faiss.ScalarQuantizer.QT_fp16,
+    "sq8": faiss.ScalarQuantizer.QT_8bit,
+}
 
-def build_faiss_index(embedded_chunks: List[Dict]) -> faiss.IndexFlatL2:
+# Minimum training points per IVF centroid before FAISS warns
+_MIN_POINTS_PER_CENTROID = 39
+
+# Layout of SHARDS_DIR: shards.json, then shard_000/{store/, vector_index.index}, ...
+SHARD_MANIFEST_FILE = "shards.json"
+SHARD_STORE_DIR = "store"
+SHARD_INDEX_FILE = "vector_index.index"
+
+
+def load_embeddings(store_dir: Path = CHUNK_STORE_DIR) -> Sequence[Dict]:
     """
-    Create a FAISS index from embeddings.
+    Open the embedded chunks on disk.
+
+    Returns the memory-mapped ChunkStore; falls back to a legacy
+    embeddings.pkl if no store has been written yet.
+    """
+    store_dir = Path(store_dir)
+    if not store_dir.exists() and (EMBEDDINGS_DIR / "embeddings.pkl").exists():
+        return load_pickle(EMBEDDINGS_DIR, "embeddings.pkl")
+    return ChunkStore(store_dir)
+
+
+def create_index(dimension: int, index_type: str = FAISS_INDEX_TYPE, num_vectors: int = 0) -> faiss.Index:
     """
-    dimension = embedded_chunks[0]["embedding"].shape[0]
-    index = faiss.IndexFlatL2(dimension)  # L2 distance
-    vectors = np.array([chunk["embedding"] for chunk in embedded_chunks])
-    index.add(vectors)
+    Create an empty (untrained) FAISS index of the given type.
+
+    'flat' keeps the exact L2 index. The approximate types use inner product,
+    which equals cosine similarity on our normalized embeddings. 'fp16' and
+    'sq8' are exhaustive like 'flat' but store vectors at 1/2 and 1/4 of
+    the float32 size. 'ivf_ondisk' is created as 'ivf_flat'; build_faiss_index
+    moves its inverted lists to disk.
+
+    Args:
+        dimension: Embedding dimension
+        index_type: One of SUPPORTED_INDEX_TYPES
+        num_vectors: Expected corpus size, used to size IVF/PQ codebooks
+    """
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dimension)
+
+    metric = faiss.METRIC_INNER_PRODUCT
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, HNSW_M, metric)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        return index
+
+    if index_type in ("ivf_flat", "ivf_pq", "ivf_ondisk"):
+        num_train = min(num_vectors, INDEX_TRAIN_SAMPLE_SIZE) or INDEX_TRAIN_SAMPLE_SIZE
+        nlist = max(1, min(IVF_NLIST, num_train // _MIN_POINTS_PER_CENTROID))
+        quantizer = faiss.IndexFlatIP(dimension)
+
+        if index_type != "ivf_pq":
+            return faiss.IndexIVFFlat(quantizer, dimension, nlist, metric)
+
+        if dimension % PQ_M != 0:
+            raise ValueError(f"PQ_M={PQ_M} must divide the embedding dimension {dimension}")
+        # Each sub-quantizer codebook has 2**nbits centroids to train
+        nbits = max(1, min(PQ_NBITS, int(np.log2(max(num_train // _MIN_POINTS_PER_CENTROID, 2)))))
+        return faiss.IndexIVFPQ(quantizer, dimension, nlist, PQ_M, nbits, metric)
+
+    if index_type in _SCALAR_QUANTIZERS:
+        return faiss.IndexScalarQuantizer(dimension, _SCALAR_QUANTIZERS[index_type], metric)
+
+    raise ValueError(
+        f"Unknown index type: {index_type}. "
+        f"Supported index types: {SUPPORTED_INDEX_TYPES}"
+    )
+
+
+def configure_search_params(
+    index: faiss.Index,
+    nprobe: int = IVF_NPROBE,
+    ef_search: int = HNSW_EF_SEARCH
+) -> faiss.Index:
+    """Apply query-time parameters (nprobe / efSearch) to any index type."""
+    base = unwrap_index(index)
+    ivf = faiss.try_extract_index_ivf(base)
+    if ivf is not None:
+        ivf.nprobe = nprobe
+    if isinstance(base, faiss.IndexHNSW):
+        base.hnsw.efSearch = ef_search
     return index
 
 
-def save_index(index: faiss.IndexFlatL2, path: Path = INDEX_PATH) -> None:
-    """Persist FAISS index to disk."""
+def ondisk_invlists(index: faiss.Index) -> Optional[faiss.OnDiskInvertedLists]:
+    """The inverted lists of an index, if they live in an on-disk lists file."""
+    ivf = faiss.try_extract_index_ivf(unwrap_index(index))
+    if ivf is None:
+        return None
+    invlists = faiss.downcast_InvertedLists(ivf.invlists)
+    return invlists if isinstance(invlists, faiss.OnDiskInvertedLists) else None
+
+
+def supports_remove_ids(index: faiss.Index) -> bool:
+    """Whether vectors can be deleted from the index in place (HNSW cannot)."""
+    base = unwrap_index(index)
+    return not isinstance(base, faiss.IndexHNSW)
+
+
+def index_type_of(index: faiss.Index) -> str:
+    """The SUPPORTED_INDEX_TYPES name of the type an index was created as."""
+    base = unwrap_index(index)
+    if isinstance(base, faiss.IndexFlat) and base.metric_type == faiss.METRIC_L2:
+        return "flat"
+    if isinstance(base, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(base, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(base, faiss.IndexIVFFlat):
+        return "ivf_ondisk" if ondisk_invlists(base) is not None else "ivf_flat"
+    if isinstance(base, faiss.IndexScalarQuantizer):
+        for name, qtype in _SCALAR_QUANTIZERS.items():
+            if base.sq.qtype == qtype:
+                return name
+    raise ValueError(f"Unknown index type: {type(base).__name__}. Supported index types: {SUPPORTED_INDEX_TYPES}")
+
+
+def check_index_type(index: faiss.Index, index_type: Optional[str] = None) -> str:
+    """
+    Return the index's type, checking it against an expected type.
+
+    Raises:
+        ValueError: If index_type is given and differs; changing the type
+            of an index takes a full rebuild
+    """
+    current_type = index_type_of(index)
+    if index_type is not None and index_type != current_type:
+        raise ValueError(
+            f"The index is '{current_type}', not '{index_type}'. "
+            f"Run a full (non-incremental) setup to change the index type"
+        )
+    return current_type
+
+
+def unwrap_index(index: faiss.Index) -> faiss.Index:
+    """The underlying index inside any IndexIDMap / IndexPreTransform wrappers."""
+    while isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2, faiss.IndexPreTransform)):
+        index = faiss.downcast_index(index.index)
+    return index
+
+
+def with_id_map(index: faiss.Index) -> faiss.Index:
+    """Make an index accept explicit ids (IVF indexes store ids natively)."""
+    if faiss.try_extract_index_ivf(index) is not None:
+        return index
+    return faiss.IndexIDMap(index)
+
+
+def stack_embeddings(embedded_chunks: Sequence[Dict]) -> np.ndarray:
+    """
+    The chunks' embeddings as one float32 matrix, row i for chunk i.
+
+    A ChunkStore's (memory-mapped) matrix is returned as is; a legacy list
+    of chunk dicts is copied into a new matrix on every call.
+    """
+    if isinstance(embedded_chunks, ChunkStore):
+        return embedded_chunks.embeddings
+    return np.ascontiguousarray(
+        np.array([chunk["embedding"] for chunk in embedded_chunks]), dtype=np.float32
+    )
+
+
+def _default_ids(embedded_chunks: Sequence[Dict]) -> np.ndarray:
+    # Tombstoned store rows are left out of the index
+    if isinstance(embedded_chunks, ChunkStore):
+        return embedded_chunks.live_ids()
+    return np.arange(len(embedded_chunks), dtype=np.int64)
+
+
+def train_index(
+    index: faiss.Index,
+    vectors: np.ndarray,
+    ids: Optional[np.ndarray] = None,
+    seed: int = 0
+) -> None:
+    """Train an index on a random sample of at most INDEX_TRAIN_SAMPLE_SIZE vectors."""
+    if index.is_trained:
+        return
+    if ids is None:
+        ids = np.arange(len(vectors), dtype=np.int64)
+    if len(ids) > INDEX_TRAIN_SAMPLE_SIZE:
+        rng = np.random.default_rng(seed)
+        ids = np.sort(rng.choice(ids, INDEX_TRAIN_SAMPLE_SIZE, replace=False))
+    index.train(np.ascontiguousarray(vectors[ids], dtype=np.float32))
+
+
+def add_in_batches(
+    index: faiss.Index,
+    vectors: np.ndarray,
+    ids: Optional[np.ndarray] = None,
+    batch_size: int = INDEX_ADD_BATCH_SIZE
+) -> None:
+    """
+    Add vectors to an index in fixed-size batches to bound peak memory.
+
+    If ids is given, only those rows of vectors are added, under those ids.
+    """
+    if ids is None:
+        for start in range(0, len(vectors), batch_size):
+            index.add(np.ascontiguousarray(vectors[start:start + batch_size], dtype=np.float32))
+        return
+
+    for start in range(0, len(ids), batch_size):
+        batch_ids = np.ascontiguousarray(ids[start:start + batch_size], dtype=np.int64)
+        batch = np.ascontiguousarray(vectors[batch_ids], dtype=np.float32)
+        index.add_with_ids(batch, batch_ids)
+
+
+def build_faiss_index(
+    embedded_chunks: Sequence[Dict],
+    index_type: str = FAISS_INDEX_TYPE,
+    ids: Optional[np.ndarray] = None,
+    lists_path: Optional[Path] = None
+) -> faiss.Index:
+    """
+    Create a FAISS index from embeddings.
+
+    FAISS ids are chunk positions (store row ids), so an index can later be
+    updated in place with update_faiss_index().
+
+    Args:
+        embedded_chunks: ChunkStore, or chunks with an 'embedding' vector each
+        index_type: One of SUPPORTED_INDEX_TYPES
+        ids: Positions to index (default: all live chunks)
+        lists_path: Inverted lists file of an 'ivf_ondisk' index (default:
+            a new file next to INDEX_PATH)
+    """
+    vectors = stack_embeddings(embedded_chunks)
+    if ids is None:
+        ids = _default_ids(embedded_chunks)
+    index = with_id_map(create_index(vectors.shape[1], index_type, num_vectors=len(ids)))
+    train_index(index, vectors, ids)
+    if index_type == "ivf_ondisk":
+        build_ondisk_lists(index, vectors, ids, lists_path or _new_lists_path(INDEX_PATH))
+    else:
+        add_in_batches(index, vectors, ids)
+    return configure_search_params(index)
+
+
+def build_ondisk_lists(
+    index: faiss.Index,
+    vectors: np.ndarray,
+    ids: np.ndarray,
+    lists_path: Path,
+    batch_size: int = INDEX_ADD_BATCH_SIZE
+) -> None:
+    """
+    Fill a trained IVF index with inverted lists stored in a file on disk.
+
+    Each batch is added to a copy of the empty index and written out as a
+    partial index; the partials are then merged, list by list, into one
+    OnDiskInvertedLists file. Only one batch is ever held in memory, and
+    query nodes memory-map the lists file and page in just the probed lists.
+    """
+    lists_path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=lists_path.parent) as tmp_dir:
+        part_paths = []
+        for start in range(0, len(ids), batch_size):
+            part = faiss.clone_index(index)
+            add_in_batches(part, vectors, ids[start:start + batch_size])
+            part_paths.append(Path(tmp_dir) / f"part_{len(part_paths)}.index")
+            faiss.write_index(part, str(part_paths[-1]))
+            del part
+
+        parts = [faiss.read_index(str(path), faiss.IO_FLAG_MMAP) for path in part_paths]
+        part_lists = faiss.InvertedListsPtrVector()
+        for part in parts:
+            part_lists.push_back(faiss.extract_index_ivf(part).invlists)
+        invlists = faiss.OnDiskInvertedLists(index.nlist, index.code_size, str(lists_path))
+        ntotal = invlists.merge_from_multiple(part_lists.data(), part_lists.size())
+
+    # The index takes ownership of the lists
+    index.replace_invlists(invlists, True)
+    invlists.this.disown()
+    index.ntotal = ntotal
+
+
+def update_faiss_index(
+    index: faiss.Index,
+    embedded_chunks: Sequence[Dict],
+    new_ids: np.ndarray,
+    stale_ids: np.ndarray,
+    index_type: Optional[str] = None
+) -> faiss.Index:
+    """
+    Apply an incremental change set to a (writable) index.
+
+    Stale ids are removed with remove_ids() and new chunks are added under
+    their ids. Index types that cannot delete (HNSW) are rebuilt from the
+    live chunks instead, which still avoids any re-embedding. So are
+    on-disk IVF indexes: their lists file may be mapped by query nodes.
+    Rebuilds keep the type of the existing index.
+
+    Args:
+        index_type: Expected type of the index (default: whatever it is);
+            changing the type takes a full rebuild
+
+    Returns:
+        The updated (or rebuilt) index
+
+    Raises:
+        ValueError: If index_type is not the type of the existing index
+    """
+    current_type = check_index_type(index, index_type)
+    stale_ids = np.asarray(stale_ids, dtype=np.int64)
+    if len(stale_ids) and not supports_remove_ids(index):
+        return build_faiss_index(embedded_chunks, current_type)
+    invlists = ondisk_invlists(index)
+    if invlists is not None:
+        # Lists file names are '<index file name>.<build>.ivfdata'
+        lists_path = Path(invlists.filename)
+        index_path = lists_path.with_name(lists_path.name.rsplit(".", 2)[0])
+        return build_faiss_index(embedded_chunks, "ivf_ondisk", lists_path=_new_lists_path(index_path))
+
+    if len(stale_ids):
+        index.remove_ids(stale_ids)
+    add_in_batches(index, stack_embeddings(embedded_chunks), np.asarray(new_ids, dtype=np.int64))
+    return configure_search_params(index)
+
+
+def save_index(index: faiss.Index, path: Path = INDEX_PATH) -> None:
+    """
+    Persist FAISS index to disk.
+
+    Written to a temporary file and renamed into place: processes that
+    memory-map the old index would crash if it were truncated under them.
+
+    An on-disk IVF index refers to its lists file by name, so the lists
+    file is kept next to the index under a name unique to the build;
+    lists files of previous builds are removed once the index is replaced
+    (processes still mapping them keep their copy until they reload).
+    """
     path.parent.mkdir(parents=True, exist_ok=True)
-    faiss.write_index(index, str(path))
+    invlists = ondisk_invlists(index)
+    if invlists is not None:
+        lists_path = Path(invlists.filename)
+        if lists_path.parent.resolve() != path.parent.resolve() or not _is_lists_path(path, lists_path):
+            new_path = _new_lists_path(path)
+            shutil.move(str(lists_path), str(new_path))
+            invlists.filename = str(new_path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    faiss.write_index(index, str(tmp_path))
+    os.replace(tmp_path, path)
+
+    current = Path(invlists.filename).name if invlists is not None else None
+    for stale_path in _lists_paths(path):
+        if stale_path.name != current:
+            stale_path.unlink(missing_ok=True)
+
+
+def load_faiss_index(path: Path = INDEX_PATH, mmap: bool = INDEX_MMAP) -> faiss.Index:
+    """
+    Load FAISS index from disk, with search parameters from config.
 
+    The lists file of an on-disk IVF index is always memory-mapped (read
+    -only if mmap); only the small coarse quantizer is read into RAM.
 
-def load_faiss_index(path: Path = INDEX_PATH) -> faiss.IndexFlatL2:
-    """Load FAISS index from disk."""
+    Args:
+        path: Index file
+        mmap: Memory-map the index read-only instead of reading it into RAM
+    """
     if not path.exists():
         raise FileNotFoundError(f"FAISS index not found at {path}")
-    return faiss.read_index(str(path))
+    if _lists_paths(path):
+        # FAISS cannot map the index file itself when it has on-disk lists
+        flags = faiss.IO_FLAG_ONDISK_SAME_DIR | (faiss.IO_FLAG_READ_ONLY if mmap else 0)
+    else:
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0
+    return configure_search_params(faiss.read_index(str(path), flags))
+
+
+def _lists_paths(index_path: Path) -> list[Path]:
+    """On-disk inverted lists files belonging to an index file."""
+    return sorted(index_path.parent.glob(f"{glob.escape(index_path.name)}.*.ivfdata"))
+
+
+def _is_lists_path(index_path: Path, lists_path: Path) -> bool:
+    return lists_path.name.startswith(index_path.name + ".") and lists_path.suffix == ".ivfdata"
+
+
+def _new_lists_path(index_path: Path) -> Path:
+    return index_path.with_name(f"{index_path.name}.{time.time_ns():x}.ivfdata")
+
+
+# ----------------------------
+# Sharding
+# ----------------------------
+
+def shard_of(filename: str, num_shards: int) -> int:
+    """Shard of a document: a stable hash of its filename, so all its chunks land together."""
+    digest = hashlib.blake2b(filename.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % num_shards
+
+
+def shard_dir(shard: int, shards_dir: Path = SHARDS_DIR) -> Path:
+    return shards_dir / f"shard_{shard:03d}"
+
+
+def shard_rows(store: ChunkStore, shard: int, num_shards: int) -> np.ndarray:
+    """Live row ids of a chunk store that belong to one shard."""
+    ids = store.live_ids()
+    if not len(ids):
+        return ids
+    file_shards = np.array([shard_of(name, num_shards) for name in store.filenames], dtype=np.int64)
+    return ids[file_shards[store.filename_ids[ids]] == shard]
+
+
+def load_shard_manifest(shards_dir: Path = SHARDS_DIR) -> Dict:
+    """Return {"num_shards", "index_type"} of a sharded build."""
+    path = shards_dir / SHARD_MANIFEST_FILE
+    if not path.exists():
+        raise FileNotFoundError(f"Shard manifest not found at {path}")
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def build_shard(
+    store: ChunkStore,
+    shard: int,
+    num_shards: int,
+    index_type: str = FAISS_INDEX_TYPE,
+    shards_dir: Path = SHARDS_DIR,
+    batch_size: int = INDEX_ADD_BATCH_SIZE
+) -> int:
+    """
+    (Re)build one shard from the chunk store.
+
+    The shard's rows are copied into its own chunk store (shard-local row
+    ids) and indexed on their own. Other shards are not touched, and the
+    store and index are swapped in atomically, so a shard can be rebuilt
+    while workers serve the old one.
+
+    Returns:
+        Number of chunks in the shard
+    """
+    directory = shard_dir(shard, shards_dir)
+    rows = shard_rows(store, shard, num_shards)
+    with ChunkStoreWriter(
+        directory / SHARD_STORE_DIR, store.dimension,
+        duplicates=store.duplicates, dtype=store.embeddings.dtype.name
+    ) as writer:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            writer.append(
+                store.embeddings[batch],
+                ({"text": store.text(i), "metadata": store.metadata(i)} for i in batch)
+            )
+
+    index_path = directory / SHARD_INDEX_FILE
+    if len(rows):
+        shard_store = ChunkStore(directory / SHARD_STORE_DIR)
+        index = build_faiss_index(shard_store, index_type, lists_path=_new_lists_path(index_path))
+        save_index(index, index_path)
+    else:
+        # Nothing to train on; workers answer for an empty shard without an index
+        index_path.unlink(missing_ok=True)
+        for lists_path in _lists_paths(index_path):
+            lists_path.unlink()
+    return len(rows)
+
+
+def build_shards(
+    store: ChunkStore,
+    num_shards: int = NUM_SHARDS,
+    index_type: str = FAISS_INDEX_TYPE,
+    shards_dir: Path = SHARDS_DIR,
+    shards: Optional[Iterable[int]] = None
+) -> Dict:
+    """
+    Split the chunk store and index into num_shards shards by document hash.
+
+    Args:
+        store: Chunk store holding every chunk
+        num_shards: Number of shards
+        index_type: Index type of every shard
+        shards_dir: Directory of the shards
+        shards: Only rebuild these shards (e.g. those of changed documents);
+            everything is rebuilt if the existing shards were built with a
+            different shard count or index type
+
+    Returns:
+        The shard manifest
+    """
+    manifest = {"num_shards": num_shards, "index_type": index_type}
+    try:
+        if load_shard_manifest(shards_dir) != manifest:
+            shards = None
+    except FileNotFoundError:
+        shards = None
+
+    rebuild = range(num_shards) if shards is None else sorted(set(shards))
+    for shard in rebuild:
+        size = build_shard(store, shard, num_shards, index_type, shards_dir)
+        print(f"  Shard {shard}: {size} chunks")
+
+    if shards is None:
+        # Shards left over from a build with a larger shard count
+        for stale in shards_dir.glob("shard_*"):
+            number = stale.name[len("shard_"):]
+            if number.isdigit() and int(number) >= num_shards:
+                shutil.rmtree(stale)
+    _atomic_write_json(shards_dir / SHARD_MANIFEST_FILE, manifest)
+    print(f"✓ Built {len(rebuild)} of {num_shards} shards")
+    return manifest
+
+
+def _atomic_write_json(path: Path, data: Dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(data), encoding="utf-8")
+    os.replace(tmp_path, path)
 
 
-def run_vector_store_pipeline() -> tuple[faiss.IndexFlatL2, List[Dict]]:
+def run_vector_store_pipeline(index_type: str = FAISS_INDEX_TYPE) -> tuple[faiss.Index, Sequence[Dict]]:
     """
     Build index and return it along with the loaded embeddings.
     """
     embedded_chunks = load_embeddings()
-    index = build_faiss_index(embedded_chunks)
+    index = build_faiss_index(embedded_chunks, index_type=index_type)
     save_index(index)
+    if isinstance(embedded_chunks, ChunkStore):
+        if SEARCH_ENGINE == "binary":
+            run_binary_index_pipeline(embedded_chunks)
+        if SEARCH_ENGINE == "sharded":
+            build_shards(embedded_chunks, index_type=index_type)
+        if LEXICAL_INDEX_ENABLED:
+            run_lexical_index_pipeline(embedded_chunks, rebuild=True)
     return index, embedded_chunks
 
 
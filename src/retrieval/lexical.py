@@ -0,0 +1,301 @@
+"""
+In-process BM25 inverted index over the chunk store.
+
+Exact identifiers (part numbers, clause ids) are matched lexically, since
+dense embeddings blur them. The index is columnar like the chunk store:
+one file per array, memory-mapped on load, so opening it reads nothing
+and a query only touches the postings of its own terms:
+
+    terms.bin             UTF-8 vocabulary, sorted, concatenated
+    term_offsets.npy      int64 (V + 1,) byte offsets into terms.bin
+    postings_offsets.npy  int64 (V + 1,) start of each term's postings
+    doc_ids.npy           int32 (P,) store row ids, ascending per term
+    term_freqs.npy        uint16 (P,) term frequency in that row
+    doc_lengths.npy       int32 (n,) tokens per store row (0 if deleted)
+    meta.json             rows covered, live document count, total length
+
+Document ids are store row ids, shared with the FAISS index. Updates only
+tokenize rows appended to the store since the last build. Tombstoned rows
+are dropped from the postings, and the arrays are rewritten to a staging
+directory that is swapped into place.
+"""
+
+import bisect
+import json
+import re
+import shutil
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import LEXICAL_INDEX_DIR, BM25_K1, BM25_B
+from .store import ChunkStore, _mmap_file, _atomic_write_text
+
+TERMS_FILE = "terms.bin"
+TERM_OFFSETS_FILE = "term_offsets.npy"
+POSTINGS_OFFSETS_FILE = "postings_offsets.npy"
+DOC_IDS_FILE = "doc_ids.npy"
+TERM_FREQS_FILE = "term_freqs.npy"
+DOC_LENGTHS_FILE = "doc_lengths.npy"
+META_FILE = "meta.json"
+
+# Words, and identifiers joined by - _ . / : (e.g. 'XJ-4410', '4.2.1')
+_TOKEN_RE = re.compile(r"[^\W_]+(?:[-_./:][^\W_]+)*")
+_PART_RE = re.compile(r"[^\W_]+")
+_MAX_TERM_FREQ = np.iinfo(np.uint16).max
+# Postings per row above which scores are summed in a dense array instead of by sorting
+_DENSE_ACCUMULATOR_RATIO = 16
+
+
+def tokenize(text: str, split_compounds: bool = True) -> List[str]:
+    """
+    Lowercased word tokens of a text.
+
+    A compound identifier is kept whole and, with split_compounds, also
+    split into its parts. Documents are indexed with both, so 'XJ-4410'
+    matches the queries 'xj-4410' and '4410'; queries keep compounds whole,
+    which avoids scoring the long postings of parts like 'xj'.
+    """
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        tokens.append(token)
+        if split_compounds and not token.isalnum():
+            tokens.extend(_PART_RE.findall(token))
+    return tokens
+
+
+class _Vocabulary:
+    """Sorted terms in a memory-mapped blob, looked up by binary search."""
+
+    def __init__(self, blob, offsets: np.ndarray):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self._blob[int(self._offsets[i]):int(self._offsets[i + 1])].decode("utf-8")
+
+    def lookup(self, term: str) -> Optional[int]:
+        """Term id of a term, or None if it is not in the vocabulary."""
+        i = bisect.bisect_left(self, term)
+        return i if i < len(self) and self[i] == term else None
+
+
+class BM25Index:
+    """
+    Read-only, memory-mapped BM25 index.
+
+    Args:
+        directory: Directory holding the index files
+        k1: Term frequency saturation
+        b: Document length normalization
+    """
+
+    def __init__(self, directory: Path = LEXICAL_INDEX_DIR, k1: float = BM25_K1, b: float = BM25_B):
+        self.directory = Path(directory)
+        if not (self.directory / META_FILE).exists():
+            raise FileNotFoundError(f"Lexical index not found at {self.directory}")
+        self.k1 = k1
+        self.b = b
+
+        meta = json.loads((self.directory / META_FILE).read_text(encoding="utf-8"))
+        self.num_rows = meta["num_rows"]
+        self.num_docs = meta["num_docs"]
+        self.avg_doc_length = meta["total_length"] / max(self.num_docs, 1)
+
+        self.vocabulary = _Vocabulary(
+            _mmap_file(self.directory / TERMS_FILE),
+            np.load(self.directory / TERM_OFFSETS_FILE, mmap_mode="r"),
+        )
+        self.postings_offsets = np.load(self.directory / POSTINGS_OFFSETS_FILE, mmap_mode="r")
+        self.doc_ids = np.load(self.directory / DOC_IDS_FILE, mmap_mode="r")
+        self.term_freqs = np.load(self.directory / TERM_FREQS_FILE, mmap_mode="r")
+        self.doc_lengths = np.load(self.directory / DOC_LENGTHS_FILE, mmap_mode="r")
+
+    def __len__(self) -> int:
+        return self.num_docs
+
+    def postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(doc ids, term frequencies) of a term; empty if unknown."""
+        term_id = self.vocabulary.lookup(term)
+        if term_id is None:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.uint16)
+        start, end = int(self.postings_offsets[term_id]), int(self.postings_offsets[term_id + 1])
+        return self.doc_ids[start:end], self.term_freqs[start:end]
+
+    def search(self, query: str, top_k: int = 10, ids: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score documents containing any query term with BM25.
+
+        Args:
+            query: Query text
+            top_k: Number of results
+            ids: Only rank these sorted row ids (e.g. from a metadata filter)
+
+        Returns:
+            (store row ids, BM25 scores), best first, at most top_k
+        """
+        doc_parts, score_parts = [], []
+        for term in set(tokenize(query, split_compounds=False)):
+            docs, freqs = self.postings(term)
+            if not len(docs):
+                continue
+            idf = np.log1p((self.num_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            freqs = freqs.astype(np.float32)
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[docs] / self.avg_doc_length)
+            doc_parts.append(docs)
+            score_parts.append(idf * freqs * (self.k1 + 1) / (freqs + norm))
+
+        if not doc_parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        num_postings = sum(len(docs) for docs in doc_parts)
+        if num_postings * _DENSE_ACCUMULATOR_RATIO >= self.num_rows:
+            # Many postings: scatter into one score per row (ids are unique per term)
+            accumulator = np.zeros(self.num_rows, dtype=np.float32)
+            for docs, scores in zip(doc_parts, score_parts):
+                accumulator[docs] += scores
+            docs = np.flatnonzero(accumulator)
+            scores = accumulator[docs]
+        else:
+            docs, inverse = np.unique(np.concatenate(doc_parts), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(score_parts)).astype(np.float32)
+        if ids is not None:
+            keep = np.isin(docs, ids, assume_unique=True)
+            docs, scores = docs[keep], scores[keep]
+        if len(scores) > top_k:
+            top = np.argpartition(-scores, top_k - 1)[:top_k]
+            docs, scores = docs[top], scores[top]
+        order = np.lexsort((docs, -scores))  # Ties broken by row id, for stable rankings
+        return docs[order].astype(np.int64), scores[order]
+
+
+def build_lexical_index(
+    store: ChunkStore,
+    directory: Path = LEXICAL_INDEX_DIR,
+    rebuild: bool = False
+) -> BM25Index:
+    """
+    Bring the lexical index up to date with a chunk store.
+
+    Only rows appended since the last build are tokenized; rows tombstoned
+    in the store are dropped. Use rebuild=True after the store has been
+    rewritten from scratch (row ids restarted).
+
+    Args:
+        store: Chunk store to index
+        directory: Index directory
+        rebuild: Ignore any existing index
+    """
+    directory = Path(directory)
+    previous = None
+    if not rebuild and (directory / META_FILE).exists():
+        previous = BM25Index(directory)
+        if previous.num_rows > len(store):
+            raise ValueError(
+                f"Lexical index covers {previous.num_rows} rows but the store has {len(store)}; "
+                "rebuild it"
+            )
+
+    start_row = previous.num_rows if previous is not None else 0
+    deleted = np.asarray(store.deleted, dtype=np.int64)
+
+    # Postings of the new rows, as (term, doc, tf) triples
+    new_terms, new_docs, new_freqs = [], [], []
+    doc_lengths = np.zeros(len(store), dtype=np.int32)
+    if previous is not None:
+        doc_lengths[:start_row] = previous.doc_lengths
+    for row in range(start_row, len(store)):
+        counts = Counter(tokenize(store.text(row)))
+        doc_lengths[row] = sum(counts.values())
+        new_terms.extend(counts)
+        new_docs.extend([row] * len(counts))
+        new_freqs.extend(counts.values())
+    doc_lengths[deleted[deleted < len(store)]] = 0
+
+    # Merged vocabulary; old term ids are remapped into it
+    old_vocabulary = [previous.vocabulary[i] for i in range(len(previous.vocabulary))] if previous else []
+    vocabulary = sorted(set(old_vocabulary).union(new_terms))
+    term_ids: Dict[str, int] = {term: i for i, term in enumerate(vocabulary)}
+
+    if previous is not None:
+        old_map = np.array([term_ids[term] for term in old_vocabulary], dtype=np.int64)
+        terms = [np.repeat(old_map, np.diff(previous.postings_offsets))]
+        docs = [np.asarray(previous.doc_ids, dtype=np.int64)]
+        freqs = [np.asarray(previous.term_freqs)]
+    else:
+        terms, docs, freqs = [], [], []
+    terms.append(np.array([term_ids[term] for term in new_terms], dtype=np.int64))
+    docs.append(np.array(new_docs, dtype=np.int64))
+    freqs.append(np.minimum(np.array(new_freqs, dtype=np.int64), _MAX_TERM_FREQ).astype(np.uint16))
+    terms, docs, freqs = np.concatenate(terms), np.concatenate(docs), np.concatenate(freqs)
+
+    live = ~np.isin(docs, deleted)
+    terms, docs, freqs = terms[live], docs[live], freqs[live]
+
+    # Terms that only occurred in deleted rows are pruned
+    counts = np.bincount(terms, minlength=len(vocabulary))
+    kept = np.flatnonzero(counts)
+    remap = np.cumsum(counts > 0) - 1
+    order = np.lexsort((docs, terms))
+    terms, docs, freqs = remap[terms[order]], docs[order], freqs[order]
+
+    live_docs = len(store) - int(np.count_nonzero(deleted < len(store)))
+    _write_index(
+        directory,
+        vocabulary=[vocabulary[i] for i in kept],
+        postings_offsets=np.concatenate([[0], np.cumsum(counts[kept])]).astype(np.int64),
+        doc_ids=docs.astype(np.int32),
+        term_freqs=freqs,
+        doc_lengths=doc_lengths,
+        meta={"num_rows": len(store), "num_docs": live_docs, "total_length": int(doc_lengths.sum())},
+    )
+    return BM25Index(directory)
+
+
+def run_lexical_index_pipeline(
+    store: ChunkStore,
+    directory: Path = LEXICAL_INDEX_DIR,
+    rebuild: bool = False
+) -> BM25Index:
+    """Build or update the lexical index and report its size."""
+    index = build_lexical_index(store, directory, rebuild=rebuild)
+    print(f"✓ Lexical index: {len(index.vocabulary)} terms over {len(index)} chunks")
+    return index
+
+
+def _write_index(directory: Path, vocabulary: List[str], meta: Dict, **arrays: np.ndarray) -> None:
+    """Write the index files to a staging directory and swap it into place."""
+    staging = directory.with_name(directory.name + ".partial")
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir(parents=True)
+
+    encoded = [term.encode("utf-8") for term in vocabulary]
+    (staging / TERMS_FILE).write_bytes(b"".join(encoded))
+    term_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(term) for term in encoded], out=term_offsets[1:])
+    np.save(staging / TERM_OFFSETS_FILE, term_offsets)
+    files = {
+        "postings_offsets": POSTINGS_OFFSETS_FILE,
+        "doc_ids": DOC_IDS_FILE,
+        "term_freqs": TERM_FREQS_FILE,
+        "doc_lengths": DOC_LENGTHS_FILE,
+    }
+    for name, array in arrays.items():
+        np.save(staging / files[name], array)
+    _atomic_write_text(staging / META_FILE, json.dumps(meta))
+
+    # Readers holding mmaps of the old files keep working after the swap
+    retired = directory.with_name(directory.name + ".old")
+    if retired.exists():
+        shutil.rmtree(retired)
+    if directory.exists():
+        directory.rename(retired)
+    staging.rename(directory)
+    if retired.exists():
+        shutil.rmtree(retired)
@@ -0,0 +1,232 @@
+"""
+Cross-encoder reranking of retrieved candidates.
+
+The bi-encoder ranks chunks by comparing independently computed vectors;
+a cross-encoder reads the query and a chunk together and scores their
+relevance much more precisely, at the cost of one model pass per pair.
+The retriever over-fetches RERANK_CANDIDATES chunks, and the reranker
+scores the (query, chunk) pairs in one batch and keeps the best top_k.
+
+Pair scores are cached, and a latency budget caps how many uncached
+pairs are scored per query, based on the measured cost per pair.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from config import (
+    RERANK_MODEL_NAME,
+    RERANK_CANDIDATES,
+    RERANK_LATENCY_BUDGET_MS,
+    RERANK_BATCH_SIZE,
+    RERANK_MAX_LENGTH,
+    RERANK_CACHE_SIZE,
+)
+from .search import normalize_query
+
+try:
+    from sentence_transformers import CrossEncoder
+except ImportError:
+    CrossEncoder = None
+
+# Smallest batch whose timing updates the cost-per-pair estimate
+_MIN_TIMED_PAIRS = 8
+
+
+class PairScoreCache:
+    """
+    Bounded, thread-safe LRU cache of cross-encoder scores.
+
+    Entries are keyed on (model name, normalized query, chunk text hash),
+    so an edited chunk at the same location is never served a stale score.
+
+    Args:
+        max_size: Maximum number of cached scores
+    """
+
+    def __init__(self, max_size: int = RERANK_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model_name: str, query: str, text: str) -> tuple:
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        return (model_name, normalize_query(query), digest)
+
+    def get(self, key: tuple) -> Optional[float]:
+        """Return the cached score, or None on a miss."""
+        with self._lock:
+            score = self._entries.get(key)
+            if score is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return score
+
+    def put(self, key: tuple, score: float) -> None:
+        """Insert a score, evicting the least recently used entry if full."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = score
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters and occupancy."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class CrossEncoderReranker:
+    """
+    Rerank retrieved chunks with a CPU cross-encoder.
+
+    Args:
+        model_name: Sentence-transformers cross-encoder name or local path
+        candidates: Chunks to over-fetch and rerank per query
+        latency_budget_ms: Max time spent scoring uncached pairs per query
+            (0 = no limit)
+        batch_size: Pairs per model forward pass
+        max_length: Max tokens per (query, chunk) pair
+        cache_size: Max cached pair scores (0 disables the cache)
+        device: 'cpu' or 'cuda'
+        model: Preloaded model with a predict(pairs) method (skips loading)
+    """
+
+    def __init__(
+        self,
+        model_name: str = RERANK_MODEL_NAME,
+        candidates: int = RERANK_CANDIDATES,
+        latency_budget_ms: float = RERANK_LATENCY_BUDGET_MS,
+        batch_size: int = RERANK_BATCH_SIZE,
+        max_length: int = RERANK_MAX_LENGTH,
+        cache_size: int = RERANK_CACHE_SIZE,
+        device: str = "cpu",
+        model=None,
+    ):
+        self.model_name = model_name
+        self.candidates = candidates
+        self.latency_budget_ms = latency_budget_ms
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.device = device
+        self.cache = PairScoreCache(cache_size)
+
+        self._model = model
+        self._model_lock = threading.Lock()
+        # Measured seconds per scored pair (moving average); None until first batch
+        self.seconds_per_pair: Optional[float] = None
+
+    def rerank(self, query: str, candidates: List[Dict], top_k: int) -> List[Dict]:
+        """Rerank one query's candidates; see rerank_many."""
+        return self.rerank_many([query], [candidates], top_k)[0]
+
+    def rerank_many(self, queries: List[str], candidate_lists: List[List[Dict]], top_k: int) -> List[List[Dict]]:
+        """
+        Score every (query, candidate) pair and keep the best top_k per query.
+
+        The uncached pairs of all queries are scored in one batch. Within the
+        latency budget, candidates are scored in their retrieval order; any
+        left unscored keep that order after the scored ones.
+
+        Returns:
+            One list per query of candidate dicts with a 'rerank_score'
+            (None if unscored), best first
+        """
+        max_pairs = self._max_pairs()
+        keys = []
+        scores: Dict[tuple, Optional[float]] = {}
+        pending = []  # (query, text, key) of the pairs to score
+        for query, candidates in zip(queries, candidate_lists):
+            query_keys = []
+            budget = max_pairs
+            for candidate in candidates:
+                key = self.cache.key(self.model_name, query, candidate["text"])
+                query_keys.append(key)
+                if key in scores:
+                    continue
+                score = self.cache.get(key)
+                if score is not None:
+                    scores[key] = score
+                elif budget is None or budget > 0:
+                    scores[key] = None  # Claimed, so duplicates are scored once
+                    pending.append((query, candidate["text"], key))
+                    budget = None if budget is None else budget - 1
+            keys.append(query_keys)
+
+        if pending:
+            predicted = self._predict([(query, text) for query, text, _ in pending])
+            for (_, _, key), score in zip(pending, predicted):
+                scores[key] = float(score)
+                self.cache.put(key, float(score))
+
+        reranked = []
+        for query_keys, candidates in zip(keys, candidate_lists):
+            results = [
+                {**candidate, "rerank_score": scores.get(key)}
+                for key, candidate in zip(query_keys, candidates)
+            ]
+            ranked = sorted(
+                (r for r in results if r["rerank_score"] is not None),
+                key=lambda r: r["rerank_score"],
+                reverse=True,
+            )
+            ranked.extend(r for r in results if r["rerank_score"] is None)
+            reranked.append(ranked[:top_k])
+        return reranked
+
+    def warm_up(self) -> None:
+        """Load the model and measure the cost per pair with a dummy batch."""
+        self._predict([("warm up", "warm up")] * min(self.batch_size, self.candidates))
+
+    # ----------------------------
+    # Internals
+    # ----------------------------
+
+    def _max_pairs(self) -> Optional[int]:
+        """Uncached pairs that fit the latency budget per query (None = no cap)."""
+        if not self.latency_budget_ms or self.seconds_per_pair is None:
+            return None
+        return int(self.latency_budget_ms / 1000 / self.seconds_per_pair)
+
+    def _predict(self, pairs: List[tuple]) -> List[float]:
+        model = self._load()
+        start = time.perf_counter()
+        scores = model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+        per_pair = (time.perf_counter() - start) / len(pairs)
+        # Tiny batches are dominated by fixed overhead and would shrink the cap further
+        if len(pairs) >= _MIN_TIMED_PAIRS or self.seconds_per_pair is None:
+            self.seconds_per_pair = (
+                per_pair if self.seconds_per_pair is None else 0.7 * self.seconds_per_pair + 0.3 * per_pair
+            )
+        return list(scores)
+
+    def _load(self):
+        with self._model_lock:
+            if self._model is None:
+                if CrossEncoder is None:
+                    raise ImportError(
+                        "sentence-transformers is not installed. "
+                        "Install it with: pip install sentence-transformers"
+                    )
+                self._model = CrossEncoder(self.model_name, device=self.device, max_length=self.max_length)
+            return self._model
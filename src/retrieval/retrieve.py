@@ -1,32 +1,50 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 
-import numpy as np
-from sentence_transformers import SentenceTransformer
-
-from config import EMBEDDING_MODEL_NAME, EMBEDDINGS_DIR
-from utils import load_pickle
-from .search import search_index, embed_query
-from .indexing import load_faiss_index
+from config import DEFAULT_TOP_K
+from .retriever import get_default_retriever
 
 
 def retrieve(
     query: str,
-    top_k: int = 5
+    top_k: int = DEFAULT_TOP_K,
+    mode: Optional[str] = None,
+    filters: Optional[Dict] = None,
+    rerank: Optional[bool] = None
 ) -> List[Dict]:
     """
-    High-level retrieval function:
-    - Load embeddings
-    - Load FAISS index
-    - Embed query
-    - Search index
-    - Return ranked results
+    High-level retrieval function.
+
+    Thin wrapper over the process-wide Retriever, which keeps the
+    embedding model, FAISS index and chunks loaded between calls.
+
+    Args:
+        query: Query text
+        top_k: Number of results
+        mode: 'dense', 'lexical' (BM25) or 'hybrid' (reciprocal rank
+            fusion of both); default RETRIEVAL_MODE
+        filters: Restrict the search to matching chunks, e.g.
+            {"filename": "report", "page_number": (3, 10)}: a value, a
+            list of values, or an inclusive (low, high) range per field
+        rerank: Rerank the candidates with a cross-encoder; default
+            RERANK_ENABLED
+    """
+    return get_default_retriever().search(query, top_k=top_k, mode=mode, filters=filters, rerank=rerank)
+
+
+def retrieve_many(
+    queries: List[str],
+    top_k: int = DEFAULT_TOP_K,
+    mode: Optional[str] = None,
+    filters: Optional[Dict] = None,
+    rerank: Optional[bool] = None
+) -> List[List[Dict]]:
+    """
+    Batched retrieval: one encode batch and one FAISS search for all queries.
+
+    Returns:
+        One result list per query, in input order
     """
-    embedded_chunks = load_pickle(EMBEDDINGS_DIR, "embeddings.pkl")
-    index = load_faiss_index()
-    model = SentenceTransformer(EMBEDDING_MODEL_NAME)
-    query_vector = embed_query(query, model)
-    results = search_index(query_vector, index, embedded_chunks, top_k)
-    return results
+    return get_default_retriever().search_many(queries, top_k=top_k, mode=mode, filters=filters, rerank=rerank)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,395 @@
+import threading
+from pathlib import Path
+from typing import List, Dict, Optional, Sequence
+
+import faiss
+import numpy as np
+
+from config import (
+    EMBEDDING_MODEL_NAME,
+    CHUNK_STORE_DIR,
+    INDEX_PATH,
+    BINARY_INDEX_PATH,
+    SHARDS_DIR,
+    SEARCH_ENGINE,
+    LEXICAL_INDEX_DIR,
+    RETRIEVAL_MODE,
+    HYBRID_CANDIDATES,
+    DEFAULT_TOP_K,
+    QUERY_CACHE_SIZE,
+    QUERY_WARMUP_PATH,
+    RERANK_ENABLED,
+)
+from components.embeddings import BaseEmbedder, create_embedder
+from .search import search_index, embed_query, embed_queries, QueryEmbeddingCache, reciprocal_rank_fusion
+from .indexing import load_faiss_index, load_embeddings, stack_embeddings
+from .binary import load_binary_index, search_binary_index
+from .lexical import BM25Index
+from .filters import MetadataIndex, select_ids
+from .rerank import CrossEncoderReranker
+from .sharding import ShardCoordinator
+from .store import ChunkStore
+
+SUPPORTED_SEARCH_ENGINES = ["faiss", "binary", "sharded"]
+SUPPORTED_RETRIEVAL_MODES = ["dense", "lexical", "hybrid"]
+
+
+class Retriever:
+    """
+    Long-lived retriever that keeps the embedding model, FAISS index and
+    chunks resident between queries.
+
+    Artifacts are loaded once (lazily on first search, or eagerly via load())
+    and shared by all callers. search() is safe to call from many threads;
+    reload() builds the new artifacts off to the side and swaps them in
+    atomically, so in-flight searches finish against the old snapshot.
+
+    Query embeddings are kept in an LRU cache; if warmup_path exists, the
+    cache is pre-filled from it when the model is first loaded.
+
+    With engine='binary', the index is the binary sign-bit index and every
+    search is a Hamming first stage rescored from the chunk store. With
+    engine='sharded', the index is a ShardCoordinator whose worker processes
+    search the shards in parallel (the full chunk store still serves BM25).
+
+    The BM25 index is opened (memory-mapped) alongside, if one was built.
+    mode selects dense, lexical or hybrid (reciprocal rank fusion) search.
+
+    With rerank, each query over-fetches reranker.candidates chunks and a
+    cross-encoder reorders them before the top_k are returned.
+
+    Args:
+        index_path: Path to the FAISS index (default: INDEX_PATH,
+            BINARY_INDEX_PATH for the binary engine, SHARDS_DIR for the
+            sharded engine)
+        model_name: Sentence-transformer model used to embed queries
+        cache_size: Max cached query embeddings (0 disables the cache)
+        warmup_path: File of common queries, one per line
+        engine: 'faiss' (float index), 'binary' or 'sharded'
+        mode: Default retrieval mode, 'dense', 'lexical' or 'hybrid'
+        lexical_dir: Directory of the BM25 index
+        rerank: Rerank results with a cross-encoder by default
+        reranker: Reranker to use (default: created on first rerank)
+        store_dir: Directory of the chunk store
+        embedder: Query embedder to use (default: created from model_name
+            on load)
+    """
+
+    def __init__(
+        self,
+        index_path: Optional[Path] = None,
+        model_name: str = EMBEDDING_MODEL_NAME,
+        cache_size: int = QUERY_CACHE_SIZE,
+        warmup_path: Optional[Path] = QUERY_WARMUP_PATH,
+        engine: str = SEARCH_ENGINE,
+        mode: str = RETRIEVAL_MODE,
+        lexical_dir: Path = LEXICAL_INDEX_DIR,
+        rerank: bool = RERANK_ENABLED,
+        reranker: Optional[CrossEncoderReranker] = None,
+        store_dir: Path = CHUNK_STORE_DIR,
+        embedder: Optional[BaseEmbedder] = None,
+    ):
+        if engine not in SUPPORTED_SEARCH_ENGINES:
+            raise ValueError(
+                f"Unknown search engine: {engine}. "
+                f"Supported search engines: {SUPPORTED_SEARCH_ENGINES}"
+            )
+        self.engine = engine
+        self.mode = _check_mode(mode)
+        self.lexical_dir = Path(lexical_dir)
+        self.rerank = rerank
+        self._reranker = reranker
+        self.store_dir = Path(store_dir)
+        self._embedder = embedder
+        if index_path is None:
+            index_path = {"binary": BINARY_INDEX_PATH, "sharded": SHARDS_DIR}.get(engine, INDEX_PATH)
+        self.index_path = Path(index_path)
+        self.model_name = model_name
+        self.warmup_path = Path(warmup_path) if warmup_path else None
+        self.query_cache = QueryEmbeddingCache(cache_size) if cache_size > 0 else None
+
+        self._model: Optional[BaseEmbedder] = None
+        self._index: Optional[faiss.Index] = None
+        self._chunks: Optional[Sequence[Dict]] = None
+        self._lexical: Optional[BM25Index] = None
+        self._metadata_index: Optional[MetadataIndex] = None
+        self._stacked: Optional[tuple[Sequence[Dict], np.ndarray]] = None  # (list-backed chunks, their matrix)
+        self._index_version: Optional[str] = None
+        self._lock = threading.RLock()
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the model, index and chunks are resident."""
+        return self._index is not None
+
+    @property
+    def index_version(self) -> Optional[str]:
+        """Fingerprint of the loaded index file; changes when it is rebuilt."""
+        return self._index_version
+
+    def load(self) -> "Retriever":
+        """Load model, index and chunks if they are not loaded yet."""
+        with self._lock:
+            if not self.is_loaded:
+                self._swap_in(*self._load_artifacts(), model=self._load_model())
+        return self
+
+    def reload(self, reload_model: bool = False) -> "Retriever":
+        """
+        Re-read the index and chunks from disk, e.g. after a rebuild.
+
+        Args:
+            reload_model: Also re-create the embedding model
+        """
+        index, chunks, lexical = self._load_artifacts()
+        model = self._load_model() if reload_model or self._model is None else self._model
+        with self._lock:
+            self._swap_in(index, chunks, lexical, model=model)
+        return self
+
+    def embed(self, query: str) -> np.ndarray:
+        """Return the (cached) normalized embedding for a query."""
+        model, _, _, _ = self._snapshot()
+        return embed_query(query, model, self.query_cache, self.model_name)
+
+    def embed_many(self, queries: List[str]) -> np.ndarray:
+        """Return (cached) normalized embeddings for a batch of queries, in one encode call."""
+        model, _, _, _ = self._snapshot()
+        return embed_queries(queries, model, self.query_cache, self.model_name)
+
+    def search(
+        self,
+        query: str,
+        top_k: int = DEFAULT_TOP_K,
+        mode: Optional[str] = None,
+        filters: Optional[Dict] = None,
+        rerank: Optional[bool] = None
+    ) -> List[Dict]:
+        """
+        Return the top_k matching chunks for a query.
+
+        Args:
+            query: Query text
+            top_k: Number of results
+            mode: 'dense', 'lexical' or 'hybrid' (default: self.mode)
+            filters: Metadata filters, e.g. {"filename": "report",
+                "page_number": (3, 10)}; see MetadataIndex.select
+            rerank: Rerank with the cross-encoder (default: self.rerank)
+
+        Returns:
+            List of dicts with text, metadata and similarity score (and
+            rerank_score when reranked)
+        """
+        return self.search_many([query], top_k=top_k, mode=mode, filters=filters, rerank=rerank)[0]
+
+    def search_many(
+        self,
+        queries: List[str],
+        top_k: int = DEFAULT_TOP_K,
+        mode: Optional[str] = None,
+        filters: Optional[Dict] = None,
+        rerank: Optional[bool] = None
+    ) -> List[List[Dict]]:
+        """
+        Embed a batch of queries in one encode call and run one FAISS search.
+
+        In lexical and hybrid mode, each query is also scored with BM25;
+        hybrid mode fuses the two rankings with reciprocal rank fusion.
+        Filters restrict every ranking to the matching chunks during search.
+        With rerank, the candidates of all queries are reranked in one batch.
+
+        Returns:
+            One result list per query, in the same order as queries
+        """
+        if not queries:
+            return []
+        mode = _check_mode(mode or self.mode)
+        if not (self.rerank if rerank is None else rerank):
+            return self._retrieve(queries, top_k, mode, filters)
+
+        reranker = self.get_reranker()
+        candidates = self._retrieve(queries, max(top_k, reranker.candidates), mode, filters)
+        return reranker.rerank_many(queries, candidates, top_k)
+
+    def get_reranker(self) -> CrossEncoderReranker:
+        """Return the cross-encoder reranker, creating it on first use."""
+        with self._lock:
+            if self._reranker is None:
+                self._reranker = CrossEncoderReranker()
+            return self._reranker
+
+    def warm_up(self, path: Optional[Path] = None) -> int:
+        """
+        Pre-fill the query embedding cache from a file of common queries.
+
+        Returns:
+            Number of queries added
+        """
+        if self.query_cache is None:
+            return 0
+        model, _, _, _ = self._snapshot()
+        return self.query_cache.warm_up(path or self.warmup_path, model, self.model_name)
+
+    # ----------------------------
+    # Internals
+    # ----------------------------
+
+    def _retrieve(
+        self,
+        queries: List[str],
+        top_k: int,
+        mode: str,
+        filters: Optional[Dict]
+    ) -> List[List[Dict]]:
+        """First-stage (dense, lexical or hybrid) results for a batch of queries."""
+        model, index, chunks, lexical = self._snapshot()
+        if mode != "dense" and lexical is None:
+            raise FileNotFoundError(f"Lexical index not found at {self.lexical_dir}")
+        ids = self._select(chunks, filters) if filters else None
+
+        if mode == "lexical":
+            return [_lexical_search(query, lexical, chunks, top_k, ids) for query in queries]
+
+        num_candidates = max(top_k, HYBRID_CANDIDATES) if mode == "hybrid" else top_k
+        query_vectors = embed_queries(queries, model, self.query_cache, self.model_name)
+        dense = self._search(query_vectors, index, chunks, num_candidates, ids, filters)
+        if mode == "dense":
+            return dense
+        return [
+            reciprocal_rank_fusion([dense_results, _lexical_search(query, lexical, chunks, num_candidates, ids)], top_k)
+            for query, dense_results in zip(queries, dense)
+        ]
+
+    def _load_model(self) -> BaseEmbedder:
+        model = self._embedder or create_embedder(model_name=self.model_name)
+        if self.query_cache is not None:
+            # A new model instance may embed differently; start cold
+            self.query_cache.clear()
+            if self.warmup_path is not None and self.warmup_path.exists():
+                self.query_cache.warm_up(self.warmup_path, model, self.model_name)
+        return model
+
+    def _load_artifacts(self) -> tuple[faiss.Index, Sequence[Dict], Optional[BM25Index]]:
+        if self.engine == "binary":
+            index = load_binary_index(self.index_path)
+        elif self.engine == "sharded":
+            # Running workers re-open their shards; a new coordinator would respawn them
+            index = self._index.reload() if self._index is not None else ShardCoordinator(self.index_path).start()
+        else:
+            index = load_faiss_index(self.index_path)
+        chunks = load_embeddings(self.store_dir)
+        try:
+            lexical = BM25Index(self.lexical_dir)
+        except FileNotFoundError:
+            lexical = None  # Dense-only until a lexical index is built
+        return index, chunks, lexical
+
+    def _search(
+        self,
+        query_vectors: np.ndarray,
+        index,
+        chunks: Sequence[Dict],
+        top_k: int,
+        ids: Optional[np.ndarray] = None,
+        filters: Optional[Dict] = None
+    ) -> List[List[Dict]]:
+        if self.engine == "binary":
+            return search_binary_index(query_vectors, index, chunks, top_k, ids=ids)
+        if self.engine == "sharded":
+            # Shards have their own row ids; each worker applies the filters itself
+            return index.search(query_vectors, top_k, filters)
+        vectors = self._vectors(chunks) if ids is not None else None
+        return search_index(query_vectors, index, chunks, top_k, ids=ids, vectors=vectors)
+
+    def _vectors(self, chunks: Sequence[Dict]) -> Optional[np.ndarray]:
+        """Embedding matrix of legacy list-backed chunks, stacked once per loaded list."""
+        if isinstance(chunks, ChunkStore):
+            return None  # Its memory-mapped matrix is used directly
+        with self._lock:
+            if self._stacked is None or self._stacked[0] is not chunks:
+                self._stacked = (chunks, stack_embeddings(chunks))
+            return self._stacked[1]
+
+    def _select(self, chunks: Sequence[Dict], filters: Dict) -> np.ndarray:
+        """Row ids matching filters, through a column index kept per store."""
+        if not isinstance(chunks, ChunkStore):
+            return select_ids(chunks, filters)
+        with self._lock:
+            if self._metadata_index is None or self._metadata_index.store is not chunks:
+                self._metadata_index = MetadataIndex(chunks)
+            metadata_index = self._metadata_index
+        return metadata_index.select(filters)
+
+    def _swap_in(
+        self,
+        index: faiss.Index,
+        chunks: Sequence[Dict],
+        lexical: Optional[BM25Index],
+        model: BaseEmbedder
+    ) -> None:
+        stat = self.index_path.stat() if self.index_path.exists() else None
+        self._index_version = f"{stat.st_mtime_ns}-{stat.st_size}" if stat else None
+        self._model = model
+        self._index = index
+        self._chunks = chunks
+        self._lexical = lexical
+
+    def _snapshot(self) -> tuple[BaseEmbedder, faiss.Index, Sequence[Dict], Optional[BM25Index]]:
+        """Return a consistent (model, index, chunks, lexical) view, loading if needed."""
+        if not self.is_loaded:
+            self.load()
+        with self._lock:
+            return self._model, self._index, self._chunks, self._lexical
+
+
+def _check_mode(mode: str) -> str:
+    if mode not in SUPPORTED_RETRIEVAL_MODES:
+        raise ValueError(
+            f"Unknown retrieval mode: {mode}. "
+            f"Supported retrieval modes: {SUPPORTED_RETRIEVAL_MODES}"
+        )
+    return mode
+
+
+def _lexical_search(
+    query: str,
+    lexical: BM25Index,
+    chunks: Sequence[Dict],
+    top_k: int,
+    ids: Optional[np.ndarray] = None
+) -> List[Dict]:
+    """BM25 results in the same shape as search_index (score: higher is better)."""
+    row_ids, scores = lexical.search(query, top_k, ids=ids)
+    results = []
+    for idx, score in zip(row_ids, scores):
+        chunk = chunks[idx]
+        results.append({
+            "text": chunk["text"],
+            "metadata": chunk["metadata"],
+            "similarity_score": float(score)
+        })
+    return results
+
+
+# ----------------------------
+# Process-wide default instance
+# ----------------------------
+
+_default_retriever: Optional[Retriever] = None
+_default_lock = threading.Lock()
+
+
+def get_default_retriever() -> Retriever:
+    """Get the process-wide retriever, creating it on first use."""
+    global _default_retriever
+    with _default_lock:
+        if _default_retriever is None:
+            _default_retriever = Retriever()
+        return _default_retriever
+
+
+def set_default_retriever(retriever: Optional[Retriever]) -> None:
+    """Replace (or reset with None) the process-wide retriever."""
+    global _default_retriever
+    with _default_lock:
+        _default_retriever = retriever
@@ -1,35 +1,200 @@
-from typing import List, Dict
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Dict, Optional, Sequence
 
 import numpy as np
-from sentence_transformers import SentenceTransformer
 import faiss
 
+from config import EMBEDDING_MODEL_NAME, QUERY_CACHE_SIZE, RRF_K
+from components.data.dedup import chunk_key
+from components.embeddings import BaseEmbedder
+from .filters import filtered_search
+from .indexing import stack_embeddings, unwrap_index
 
-def embed_query(query: str, model: SentenceTransformer) -> np.ndarray:
+
+def normalize_query(query: str) -> str:
+    """Normalize query text for cache lookups (trim and collapse whitespace)."""
+    return " ".join(query.split())
+
+
+class QueryEmbeddingCache:
     """
-    Convert a user query into an embedding vector.
+    Bounded, thread-safe LRU cache of query embeddings.
+
+    Entries are keyed on (embedding model name, normalized query text), so
+    switching models never returns a vector from the wrong embedding space.
+
+    Args:
+        max_size: Maximum number of cached query vectors
     """
-    query_vector = model.encode(
-        query,
+
+    def __init__(self, max_size: int = QUERY_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, str], np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, query: str, model_name: str = EMBEDDING_MODEL_NAME) -> Optional[np.ndarray]:
+        """Return the cached vector for a query, or None on a miss."""
+        key = (model_name, normalize_query(query))
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, query: str, vector: np.ndarray, model_name: str = EMBEDDING_MODEL_NAME) -> None:
+        """Insert a query vector, evicting the least recently used entry if full."""
+        if self.max_size <= 0:
+            return
+        key = (model_name, normalize_query(query))
+        vector = np.array(vector, dtype=np.float32)
+        vector.setflags(write=False)  # Shared between callers
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def warm_up(
+        self,
+        path: Path,
+        model: BaseEmbedder,
+        model_name: str = EMBEDDING_MODEL_NAME,
+    ) -> int:
+        """
+        Pre-fill the cache from a file of common queries (one per line).
+
+        All queries are embedded in a single batch. Warm-up does not count
+        towards the hit/miss counters.
+
+        Returns:
+            Number of queries added
+        """
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f"Query warm-up file not found at {path}")
+
+        seen = set()
+        queries = []
+        for line in path.read_text(encoding="utf-8").splitlines():
+            query = normalize_query(line)
+            if query and query not in seen:
+                seen.add(query)
+                queries.append(query)
+
+        # Most common queries are expected first; keep the ones that fit
+        queries = queries[:self.max_size]
+        if not queries:
+            return 0
+
+        vectors = _encode(queries, model)
+        for query, vector in zip(reversed(queries), reversed(vectors)):
+            self.put(query, vector, model_name)
+        return len(queries)
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters and occupancy."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+            }
+
+    def clear(self) -> None:
+        """Drop all entries and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _encode(queries: List[str], model: BaseEmbedder) -> np.ndarray:
+    query_vectors = model.encode(
+        queries,
         convert_to_numpy=True,
         normalize_embeddings=True
     )
-    return query_vector
+    return np.asarray(query_vectors, dtype=np.float32).reshape(len(queries), -1)
+
+
+def embed_query(
+    query: str,
+    model: BaseEmbedder,
+    cache: Optional[QueryEmbeddingCache] = None,
+    model_name: str = EMBEDDING_MODEL_NAME,
+) -> np.ndarray:
+    """
+    Convert a user query into an embedding vector.
+
+    If a cache is given, repeated queries skip the encoder.
+    """
+    return embed_queries([query], model, cache=cache, model_name=model_name)[0]
+
+
+def embed_queries(
+    queries: List[str],
+    model: BaseEmbedder,
+    cache: Optional[QueryEmbeddingCache] = None,
+    model_name: str = EMBEDDING_MODEL_NAME,
+) -> np.ndarray:
+    """
+    Convert a batch of queries into a 2D embedding matrix in one encode call.
+
+    If a cache is given, only the cache misses are encoded.
+    """
+    if cache is None:
+        return _encode(queries, model)
+
+    cached = [cache.get(query, model_name) for query in queries]
+    missing = [i for i, vector in enumerate(cached) if vector is None]
+
+    if missing:
+        encoded = _encode([queries[i] for i in missing], model)
+        for i, vector in zip(missing, encoded):
+            cache.put(queries[i], vector, model_name)
+            cached[i] = vector
+
+    return np.vstack(cached).astype(np.float32, copy=False)
 
 
 def search_index(
     query_vectors: np.ndarray,          # Can be 1D (single query) or 2D (multiple queries)
     index: faiss.Index,
-    embedded_chunks: List[Dict],
-    top_k: int = 5
+    embedded_chunks: Sequence[Dict],
+    top_k: int = 5,
+    ids: Optional[np.ndarray] = None,
+    vectors: Optional[np.ndarray] = None
 ) -> List[List[Dict]]:
     """
     Search the FAISS index and return top_k matching chunks
     with text, metadata, and similarity score.
 
+    similarity_score is the raw FAISS score: L2 distance for the 'flat'
+    index (lower is better), inner product for the approximate index
+    types (higher is better). Results are always ranked best first.
+
+    If ids is given (e.g. from a metadata filter), only those rows are
+    searched; see filters.filtered_search. Small selections are scored
+    exactly against vectors, which defaults to stack_embeddings(embedded_chunks).
+    For a list of chunks that copies the whole corpus, so callers searching
+    one list repeatedly should stack it once and pass it in.
+
     Returns:
-        A list of lists of dictionaries:
-            - Outer list: one entry per query
+        A list of lists of dictionaries, also for a single 1D query:
+            - Outer list: one entry per query, in input order
             - Inner list: top_k results for that query
     """
     # Ensure query_vectors is 2D
@@ -38,13 +203,22 @@ def search_index(
     else:
         query_vectors = query_vectors.astype(np.float32)
 
-    distances, indices = index.search(query_vectors, top_k)
+    if ids is None:
+        distances, indices = index.search(query_vectors, top_k)
+    else:
+        distances, indices = filtered_search(
+            index, query_vectors, top_k, ids,
+            vectors=vectors if vectors is not None else stack_embeddings(embedded_chunks),
+            metric=unwrap_index(index).metric_type,
+        )
     all_results = []
 
     # Loop over each query row
     for row_indices, row_distances in zip(indices, distances):
         query_results = []
         for dist, idx in zip(row_distances, row_indices):
+            if idx < 0:  # FAISS pads with -1 when fewer than top_k hits exist
+                continue
             chunk = embedded_chunks[idx]
             query_results.append({
                 "text": chunk["text"],
@@ -53,7 +227,30 @@ def search_index(
             })
         all_results.append(query_results)
 
-    # If only 1 query, return just the inner list for convenience
-    if all_results and len(all_results) == 1:
-        return all_results[0]
     return all_results
+
+
+def reciprocal_rank_fusion(
+    rankings: List[List[Dict]],
+    top_k: int = 5,
+    k: int = RRF_K
+) -> List[Dict]:
+    """
+    Fuse several ranked result lists with reciprocal rank fusion.
+
+    Each result scores sum(1 / (k + rank)) over the lists it appears in, so
+    rankings on incomparable scales (L2 distance, BM25) can be combined.
+    Results are matched on their chunk location; similarity_score becomes
+    the fused score (higher is better).
+
+    Returns:
+        At most top_k results, best first
+    """
+    fused: Dict[str, list] = {}
+    for ranking in rankings:
+        for rank, result in enumerate(ranking, start=1):
+            entry = fused.setdefault(chunk_key(result["metadata"]), [result, 0.0])
+            entry[1] += 1.0 / (k + rank)
+
+    ranked = sorted(fused.values(), key=lambda entry: entry[1], reverse=True)[:top_k]
+    return [{**result, "similarity_score": score} for result, score in ranked]
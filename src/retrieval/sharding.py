@@ -0,0 +1,252 @@
+"""
+Scatter-gather search over index shards served by worker processes.
+
+build_shards() splits the chunk store and index into shards by document
+hash (see indexing.py). Each shard is opened by its own worker process, so
+shards are searched in parallel and no process has to hold the whole
+index. The coordinator sends every query batch to all workers and merges
+their ranked top-k lists into one.
+
+Every shard is searched for the full top_k, so for exact index types the
+merged results are the same as searching a single index over all chunks.
+"""
+
+import heapq
+import multiprocessing
+import threading
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import faiss
+import numpy as np
+
+from config import SHARDS_DIR, SHARD_WORKER_THREADS
+from .filters import MetadataIndex
+from .indexing import (
+    SHARD_INDEX_FILE,
+    SHARD_STORE_DIR,
+    load_faiss_index,
+    load_shard_manifest,
+    shard_dir,
+)
+from .search import search_index
+from .store import ChunkStore
+
+
+def merge_shard_results(rankings: List[List[Dict]], top_k: int, higher_is_better: bool = True) -> List[Dict]:
+    """
+    Merge per-shard result lists, each ranked best first, into the overall top_k.
+
+    Args:
+        rankings: One ranked result list per shard
+        top_k: Results to keep
+        higher_is_better: Whether similarity_score ranks descending (inner
+            product) or ascending (L2 distance)
+    """
+    if higher_is_better:
+        merged = heapq.merge(*rankings, key=lambda r: -r["similarity_score"])
+    else:
+        merged = heapq.merge(*rankings, key=lambda r: r["similarity_score"])
+    return list(islice(merged, top_k))
+
+
+class ShardCoordinator:
+    """
+    Fan queries out to one worker process per shard and merge the results.
+
+    Workers are started with start() (or on entering a with block) and
+    memory-map their shard's index and chunk store. Searches from several
+    threads are serialized: each one is a single round trip to all workers.
+
+    Args:
+        shards_dir: Directory written by build_shards()
+        threads_per_worker: FAISS threads in each worker process
+    """
+
+    def __init__(self, shards_dir: Path = SHARDS_DIR, threads_per_worker: int = SHARD_WORKER_THREADS):
+        self.shards_dir = Path(shards_dir)
+        self.threads_per_worker = threads_per_worker
+        self.num_shards = 0
+        self.higher_is_better = True
+        self.shard_sizes: List[int] = []
+
+        self._processes: List[multiprocessing.Process] = []
+        self._connections: List = []
+        self._lock = threading.Lock()
+
+    @property
+    def ntotal(self) -> int:
+        """Chunks across all shards."""
+        return sum(self.shard_sizes)
+
+    def start(self) -> "ShardCoordinator":
+        """Start one worker per shard and wait until every shard is loaded."""
+        manifest = load_shard_manifest(self.shards_dir)
+        # 'flat' is exact L2 (lower is better); the other types rank by inner product
+        self.higher_is_better = manifest["index_type"] != "flat"
+        self.num_shards = manifest["num_shards"]
+
+        # Spawned (not forked) workers do not inherit the parent's threads and locks
+        context = multiprocessing.get_context("spawn")
+        with self._lock:
+            for shard in range(self.num_shards):
+                parent, child = context.Pipe()
+                process = context.Process(
+                    target=_serve_shard,
+                    args=(shard_dir(shard, self.shards_dir), child, self.threads_per_worker),
+                    name=f"shard-{shard}",
+                    daemon=True,
+                )
+                process.start()
+                child.close()
+                self._processes.append(process)
+                self._connections.append(parent)
+            try:
+                self.shard_sizes = self._gather(range(self.num_shards))
+            except Exception:
+                self._stop()
+                raise
+        print(f"✓ Started {self.num_shards} shard workers ({self.ntotal} chunks)")
+        return self
+
+    def search(
+        self,
+        query_vectors: np.ndarray,
+        top_k: int = 5,
+        filters: Optional[Dict] = None
+    ) -> List[List[Dict]]:
+        """
+        Search every shard and merge their results.
+
+        Takes and returns the same shapes as search_index; filters are
+        resolved by each worker against its shard's metadata.
+        """
+        query_vectors = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+        with self._lock:
+            for connection in self._connections:
+                connection.send(("search", query_vectors, top_k, filters))
+            shard_results = self._gather(range(self.num_shards))
+        return [
+            merge_shard_results([results[row] for results in shard_results], top_k, self.higher_is_better)
+            for row in range(len(query_vectors))
+        ]
+
+    def reload(self, shards: Optional[Iterable[int]] = None) -> "ShardCoordinator":
+        """
+        Have workers re-open their shards, e.g. after build_shard().
+
+        Args:
+            shards: Shards to re-open (default: all). If the shard count
+                changed, all workers are restarted.
+        """
+        if load_shard_manifest(self.shards_dir)["num_shards"] != self.num_shards:
+            self.close()
+            return self.start()
+
+        shards = range(self.num_shards) if shards is None else sorted(set(shards))
+        with self._lock:
+            for shard in shards:
+                self._connections[shard].send(("reload",))
+            for shard, size in zip(shards, self._gather(shards)):
+                self.shard_sizes[shard] = size
+        return self
+
+    def close(self) -> None:
+        """Stop the workers."""
+        with self._lock:
+            self._stop()
+
+    def __enter__(self) -> "ShardCoordinator":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    # ----------------------------
+    # Internals
+    # ----------------------------
+
+    def _gather(self, shards: Iterable[int]) -> List:
+        """Collect one reply from each shard; raise if any worker failed."""
+        replies, errors = [], []
+        for shard in shards:
+            try:
+                status, payload = self._connections[shard].recv()
+            except EOFError:
+                status, payload = "error", "worker exited"
+            if status != "ok":
+                errors.append(f"shard {shard}: {payload}")
+            replies.append(payload)
+        if errors:
+            raise RuntimeError(f"Shard search failed: {'; '.join(errors)}")
+        return replies
+
+    def _stop(self) -> None:
+        for connection in self._connections:
+            try:
+                connection.send(("close",))
+            except (BrokenPipeError, OSError):
+                pass
+            connection.close()
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._processes, self._connections = [], []
+        self.shard_sizes = []
+
+
+# ----------------------------
+# Worker process
+# ----------------------------
+
+class _Shard:
+    """One shard's chunk store and index, as opened by a worker."""
+
+    def __init__(self, directory: Path):
+        self.store = ChunkStore(directory / SHARD_STORE_DIR)
+        index_path = directory / SHARD_INDEX_FILE
+        # Empty shards have no index
+        self.index = load_faiss_index(index_path) if index_path.exists() else None
+        self.metadata_index = MetadataIndex(self.store)
+
+    @property
+    def size(self) -> int:
+        return self.index.ntotal if self.index is not None else 0
+
+    def search(self, query_vectors: np.ndarray, top_k: int, filters: Optional[Dict]) -> List[List[Dict]]:
+        if self.index is None:
+            return [[] for _ in query_vectors]
+        ids = self.metadata_index.select(filters) if filters else None
+        return search_index(query_vectors, self.index, self.store, top_k, ids=ids)
+
+
+def _serve_shard(directory: Path, connection, threads: int) -> None:
+    """Worker loop: open a shard, then answer search / reload requests until closed."""
+    faiss.omp_set_num_threads(threads)
+    try:
+        shard = _Shard(directory)
+    except Exception as e:
+        connection.send(("error", f"{type(e).__name__}: {e}"))
+        return
+    connection.send(("ok", shard.size))
+
+    while True:
+        try:
+            command, *args = connection.recv()
+        except EOFError:
+            return
+        if command == "close":
+            return
+        try:
+            if command == "search":
+                reply = shard.search(*args)
+            elif command == "reload":
+                shard = _Shard(directory)
+                reply = shard.size
+            else:
+                raise ValueError(f"Unknown shard command: {command}")
+            connection.send(("ok", reply))
+        except Exception as e:
+            connection.send(("error", f"{type(e).__name__}: {e}"))
@@ -0,0 +1,544 @@
+"""
+Columnar, memory-mapped store for embedded chunks.
+
+Replaces the pickled list of {"embedding", "text", "metadata"} dicts with
+one file per column, so a query process can open the corpus without
+reading it and only touches the rows it returns:
+
+    embeddings.npy    float32 or float16 (n, dim) contiguous matrix
+    text.bin          UTF-8 chunk texts, concatenated
+    text_offsets.npy  int64 (n + 1,) byte offsets into text.bin
+    filename_ids.npy  int32 (n,) index into filenames.json
+    page_numbers.npy  int32 (n,)
+    chunk_ids.npy     int32 (n,)
+    filenames.json    distinct source filenames
+    deleted.npy       int64 tombstoned row ids (rows are never rewritten)
+    duplicates.json   locations of duplicate chunks dropped at ingestion
+
+Stores maintained by incremental runs also keep the chunks' dedup
+fingerprints (see dedup.ChunkDeduplicator.fingerprint), one row per chunk:
+
+    dedup_digests.npy     uint64 (n, 2) exact-match digests
+    dedup_signatures.npy  uint32 (n, num_perm) MinHash signatures
+    dedup_bands.npy       uint64 (n, bands) LSH band keys
+    dedup_params.json     deduplicator settings the fingerprints were made with
+
+Row ids are stable for the lifetime of the store and double as FAISS ids.
+"""
+
+import json
+import mmap
+import os
+import shutil
+import struct
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from config import CHUNK_STORE_DIR, EMBEDDING_STORE_DTYPE
+from components.data.dedup import ChunkDeduplicator, DuplicateMap, Fingerprints
+
+
+EMBEDDINGS_FILE = "embeddings.npy"
+TEXT_FILE = "text.bin"
+TEXT_OFFSETS_FILE = "text_offsets.npy"
+FILENAME_IDS_FILE = "filename_ids.npy"
+PAGE_NUMBERS_FILE = "page_numbers.npy"
+CHUNK_IDS_FILE = "chunk_ids.npy"
+FILENAMES_FILE = "filenames.json"
+DELETED_FILE = "deleted.npy"
+DUPLICATES_FILE = "duplicates.json"
+FINGERPRINT_FILES = ("dedup_digests.npy", "dedup_signatures.npy", "dedup_bands.npy")
+FINGERPRINT_PARAMS_FILE = "dedup_params.json"
+
+SUPPORTED_EMBEDDING_DTYPES = (np.dtype(np.float32), np.dtype(np.float16))
+
+# Fixed .npy header size, so the row count can be rewritten in place after appends
+_NPY_HEADER_LEN = 128
+
+
+# ----------------------------
+# Reader
+# ----------------------------
+
+class ChunkStore:
+    """
+    Read-only view over a columnar chunk store.
+
+    Behaves like the old list of embedded chunks: len(store) is the number
+    of chunks and store[i] returns {"embedding", "text", "metadata"}.
+    Embeddings are a memory-mapped matrix, and text is decoded lazily per row.
+
+    Args:
+        directory: Directory holding the store files
+    """
+
+    def __init__(self, directory: Path = CHUNK_STORE_DIR):
+        self.directory = Path(directory)
+        if not (self.directory / EMBEDDINGS_FILE).exists():
+            raise FileNotFoundError(f"Chunk store not found at {self.directory}")
+
+        self.embeddings = np.load(self.directory / EMBEDDINGS_FILE, mmap_mode="r")
+        self.text_offsets = np.load(self.directory / TEXT_OFFSETS_FILE, mmap_mode="r")
+        self.filename_ids = np.load(self.directory / FILENAME_IDS_FILE, mmap_mode="r")
+        self.page_numbers = np.load(self.directory / PAGE_NUMBERS_FILE, mmap_mode="r")
+        self.chunk_ids = np.load(self.directory / CHUNK_IDS_FILE, mmap_mode="r")
+        self.filenames: List[str] = json.loads(
+            (self.directory / FILENAMES_FILE).read_text(encoding="utf-8")
+        )
+        self.deleted = _load_deleted(self.directory)
+        self.duplicates = DuplicateMap.load(self.directory / DUPLICATES_FILE)
+        self._text = _mmap_file(self.directory / TEXT_FILE)
+
+    @property
+    def dimension(self) -> int:
+        return self.embeddings.shape[1]
+
+    def __len__(self) -> int:
+        return self.embeddings.shape[0]
+
+    def __getitem__(self, i: int) -> Dict:
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        return {
+            "embedding": self.embeddings[i],
+            "text": self.text(i),
+            "metadata": self.metadata(i),
+        }
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def live_ids(self) -> np.ndarray:
+        """Row ids that have not been tombstoned."""
+        ids = np.arange(len(self), dtype=np.int64)
+        if len(self.deleted) == 0:
+            return ids
+        return ids[~np.isin(ids, self.deleted)]
+
+    def filename_rows(self, filename: str) -> np.ndarray:
+        """Live row ids belonging to one source file."""
+        if filename not in self.filenames:
+            return np.empty(0, dtype=np.int64)
+        rows = np.flatnonzero(self.filename_ids == self.filenames.index(filename))
+        return rows[~np.isin(rows, self.deleted)].astype(np.int64)
+
+    def text(self, i: int) -> str:
+        """Decode the text of one chunk."""
+        start, end = int(self.text_offsets[i]), int(self.text_offsets[i + 1])
+        return self._text[start:end].decode("utf-8")
+
+    def metadata(self, i: int) -> Dict:
+        """
+        Rebuild the metadata dict of one chunk from its columns.
+
+        Chunks whose duplicates were dropped at ingestion also carry a
+        'duplicates' list with the locations of those copies.
+        """
+        metadata = {
+            "filename": self.filenames[int(self.filename_ids[i])],
+            "page_number": int(self.page_numbers[i]),
+            "chunk_id": int(self.chunk_ids[i]),
+        }
+        duplicates = self.duplicates.get(metadata)
+        if duplicates:
+            metadata["duplicates"] = duplicates
+        return metadata
+
+    def fingerprints(self, params: Dict) -> Optional[Fingerprints]:
+        """
+        Memory-mapped dedup fingerprints of every row.
+
+        Returns:
+            (digests, signatures, band keys), or None if the store has none
+            made with these deduplicator params or they do not cover every
+            row (e.g. rows appended with deduplication off)
+        """
+        if _load_fingerprint_params(self.directory) != params:
+            return None
+        columns = tuple(np.load(self.directory / name, mmap_mode="r") for name in FINGERPRINT_FILES)
+        if any(len(column) != len(self) for column in columns):
+            return None
+        return columns
+
+    @classmethod
+    def write(
+        cls,
+        embeddings: np.ndarray,
+        chunks: Iterable[Dict],
+        directory: Path = CHUNK_STORE_DIR,
+        duplicates: Optional[DuplicateMap] = None,
+        dtype: str = EMBEDDING_STORE_DTYPE,
+    ) -> "ChunkStore":
+        """Write embeddings and their chunks as a new store, replacing any old one."""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        with ChunkStoreWriter(directory, embeddings.shape[1], duplicates=duplicates, dtype=dtype) as writer:
+            writer.append(embeddings, chunks)
+        return cls(directory)
+
+
+# ----------------------------
+# Writer
+# ----------------------------
+
+class ChunkStoreWriter:
+    """
+    Append-only writer for a chunk store.
+
+    A new store is streamed to a sibling staging directory and swapped into
+    place on close(), so readers never see a half-written store. With
+    append=True an existing store is extended in place instead: row ids
+    stay stable, and headers are only bumped on close(), so an interrupted
+    append leaves the store at its previous row count. Rows are never
+    rewritten; delete() records tombstones instead.
+
+    Args:
+        directory: Final store directory
+        dimension: Embedding dimension
+        append: Extend an existing store (a new one is created if missing)
+        duplicates: Duplicate map saved with the store on close (it may
+            still be filled while rows are appended)
+        dtype: Embedding dtype of a new store, 'float32' or 'float16'
+            (an appended store keeps the dtype it was created with)
+        fingerprint_params: ChunkDeduplicator.params; if given, append()
+            takes the chunks' fingerprints and they are stored too. An
+            appended store must already have fingerprints for all its rows
+            (see write_fingerprints)
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        dimension: int,
+        append: bool = False,
+        duplicates: Optional[DuplicateMap] = None,
+        dtype: str = EMBEDDING_STORE_DTYPE,
+        fingerprint_params: Optional[Dict] = None,
+    ):
+        if np.dtype(dtype) not in SUPPORTED_EMBEDDING_DTYPES:
+            raise ValueError(
+                f"Unsupported embedding dtype '{dtype}'. "
+                f"Supported: {[d.name for d in SUPPORTED_EMBEDDING_DTYPES]}"
+            )
+        self.directory = Path(directory)
+        self.dimension = dimension
+        self.duplicates = duplicates
+        self.fingerprint_params = fingerprint_params
+        self.append_mode = append and (self.directory / EMBEDDINGS_FILE).exists()
+
+        if self.append_mode:
+            self._target = self.directory
+        else:
+            self._target = self.directory.with_name(self.directory.name + ".partial")
+            if self._target.exists():
+                shutil.rmtree(self._target)
+            self._target.mkdir(parents=True)
+
+        self._embeddings = _NpyAppender(
+            self._target / EMBEDDINGS_FILE, None if self.append_mode else dtype, (dimension,), self.append_mode
+        )
+        self._text_offsets = _NpyAppender(self._target / TEXT_OFFSETS_FILE, np.int64, (), self.append_mode)
+        self._filename_ids = _NpyAppender(self._target / FILENAME_IDS_FILE, np.int32, (), self.append_mode)
+        self._page_numbers = _NpyAppender(self._target / PAGE_NUMBERS_FILE, np.int32, (), self.append_mode)
+        self._chunk_ids = _NpyAppender(self._target / CHUNK_IDS_FILE, np.int32, (), self.append_mode)
+        self._fingerprints: List[_NpyAppender] = []
+        if fingerprint_params is not None:
+            if self.append_mode and _load_fingerprint_params(self._target) != fingerprint_params:
+                raise ValueError(f"Chunk store at {self.directory} has no fingerprints made with {fingerprint_params}")
+            # The row counts are checked against the committed size below
+            self._fingerprints = [
+                _NpyAppender(self._target / name, dtype, (width,), self.append_mode)
+                for name, dtype, width in zip(
+                    FINGERPRINT_FILES,
+                    (np.uint64, np.uint32, np.uint64),
+                    (2, fingerprint_params["num_perm"], fingerprint_params["bands"]),
+                )
+            ]
+
+        if self.append_mode:
+            # The embeddings header is written last on close, so its row count
+            # is the committed size; realign the other columns to it
+            self.num_rows = self._embeddings.num_rows
+            for column in (self._filename_ids, self._page_numbers, self._chunk_ids, *self._fingerprints):
+                column.truncate(min(column.num_rows, self.num_rows))
+            self._text_offsets.truncate(min(self._text_offsets.num_rows, self.num_rows + 1))
+            if any(
+                column.num_rows != self.num_rows
+                for column in (self._filename_ids, self._page_numbers, self._chunk_ids, *self._fingerprints)
+            ):
+                raise ValueError(f"Chunk store at {self.directory} has inconsistent columns")
+            filenames = json.loads((self._target / FILENAMES_FILE).read_text(encoding="utf-8"))
+            self._filenames: Dict[str, int] = {name: i for i, name in enumerate(filenames)}
+            self._deleted = set(_load_deleted(self._target).tolist())
+            # Drop any text written by an interrupted append
+            self._text_size = int(self._text_offsets.last())
+            self._text = open(self._target / TEXT_FILE, "r+b")
+            self._text.truncate(self._text_size)
+            self._text.seek(self._text_size)
+        else:
+            self.num_rows = 0
+            self._filenames = {}
+            self._deleted = set()
+            self._text_size = 0
+            self._text = open(self._target / TEXT_FILE, "wb")
+            self._text_offsets.append(np.zeros(1, dtype=np.int64))
+            if fingerprint_params is not None:
+                _save_fingerprint_params(self._target, fingerprint_params)
+
+    def append(
+        self,
+        embeddings: np.ndarray,
+        chunks: Iterable[Dict],
+        fingerprints: Optional[Fingerprints] = None
+    ) -> np.ndarray:
+        """
+        Append a batch of embeddings and the chunks they were computed from.
+
+        Args:
+            embeddings: (n, dim) embeddings
+            chunks: The n chunks
+            fingerprints: The chunks' ChunkDeduplicator.fingerprints();
+                required if the writer has fingerprint_params
+
+        Returns:
+            Row ids assigned to the new chunks
+        """
+        if self._fingerprints and fingerprints is None:
+            raise ValueError("This chunk store keeps fingerprints; pass the chunks' fingerprints to append()")
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dimension)
+
+        offsets, filename_ids, page_numbers, chunk_ids = [], [], [], []
+        for chunk in chunks:
+            encoded = chunk["text"].encode("utf-8")
+            self._text.write(encoded)
+            self._text_size += len(encoded)
+            offsets.append(self._text_size)
+
+            meta = chunk["metadata"]
+            filename_ids.append(self._filenames.setdefault(meta["filename"], len(self._filenames)))
+            page_numbers.append(meta["page_number"])
+            chunk_ids.append(meta["chunk_id"])
+
+        if len(offsets) != len(embeddings):
+            raise ValueError(
+                f"Got {len(embeddings)} embeddings for {len(offsets)} chunks"
+            )
+        if self._fingerprints and any(len(column) != len(offsets) for column in fingerprints):
+            raise ValueError(f"Got fingerprints for {len(fingerprints[0])} of {len(offsets)} chunks")
+
+        self._embeddings.append(embeddings)
+        self._text_offsets.append(np.array(offsets, dtype=np.int64))
+        self._filename_ids.append(np.array(filename_ids, dtype=np.int32))
+        self._page_numbers.append(np.array(page_numbers, dtype=np.int32))
+        self._chunk_ids.append(np.array(chunk_ids, dtype=np.int32))
+        for column, rows in zip(self._fingerprints, fingerprints or ()):
+            column.append(rows)
+
+        ids = np.arange(self.num_rows, self.num_rows + len(offsets), dtype=np.int64)
+        self.num_rows += len(offsets)
+        return ids
+
+    def delete(self, ids: Iterable[int]) -> None:
+        """Tombstone rows so they are excluded from live_ids() and index rebuilds."""
+        self._deleted.update(int(i) for i in ids)
+
+    def close(self) -> None:
+        """Finalize the column files; a new store atomically replaces the old one."""
+        self._text.flush()
+        self._text.close()
+        _atomic_write_text(
+            self._target / FILENAMES_FILE, json.dumps(list(self._filenames))
+        )
+        _save_deleted(self._target, self._deleted)
+        if self.duplicates is not None:
+            self.duplicates.save(self._target / DUPLICATES_FILE)
+
+        # The embeddings header is bumped last: it defines the committed row count
+        for column in (
+            self._text_offsets, self._filename_ids, self._page_numbers,
+            self._chunk_ids, *self._fingerprints, self._embeddings,
+        ):
+            column.close()
+
+        if self.append_mode:
+            return
+
+        # Readers holding mmaps of the old files keep working after the swap
+        retired = self.directory.with_name(self.directory.name + ".old")
+        if retired.exists():
+            shutil.rmtree(retired)
+        if self.directory.exists():
+            self.directory.rename(retired)
+        self._target.rename(self.directory)
+        if retired.exists():
+            shutil.rmtree(retired)
+
+    def __enter__(self) -> "ChunkStoreWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+            return
+        # Leave headers untouched so the partial batch is discarded on reopen
+        self._text.close()
+        for column in (
+            self._text_offsets, self._filename_ids, self._page_numbers,
+            self._chunk_ids, *self._fingerprints, self._embeddings,
+        ):
+            column.abort()
+        if not self.append_mode:
+            shutil.rmtree(self._target, ignore_errors=True)
+
+
+def write_fingerprints(store: ChunkStore, deduplicator: ChunkDeduplicator) -> ChunkStore:
+    """
+    Fingerprint every row of a store that has no (usable) fingerprints.
+
+    This hashes the whole corpus once, e.g. on the first incremental run
+    over a store written by a full build; appends keep them up to date
+    afterwards. Tombstoned rows get empty fingerprints, which never match.
+
+    Returns:
+        The store, reopened
+    """
+    params = deduplicator.params
+    (store.directory / FINGERPRINT_PARAMS_FILE).unlink(missing_ok=True)
+    columns = [
+        _NpyAppender(store.directory / name, dtype, (width,))
+        for name, dtype, width in zip(
+            FINGERPRINT_FILES, (np.uint64, np.uint32, np.uint64), (2, params["num_perm"], params["bands"])
+        )
+    ]
+    deleted = set(store.deleted.tolist())
+    empty = deduplicator.fingerprint("")
+    for start in range(0, len(store), 4096):
+        rows = [
+            empty if i in deleted else deduplicator.fingerprint(store.text(i))
+            for i in range(start, min(start + 4096, len(store)))
+        ]
+        for column, values in zip(columns, zip(*rows)):
+            column.append(np.stack(values))
+    for column in columns:
+        column.close()
+    # Written last: fingerprints only count once they cover every row
+    _save_fingerprint_params(store.directory, params)
+    return ChunkStore(store.directory)
+
+
+class _NpyAppender:
+    """
+    Streams rows into a .npy file whose header is patched on close.
+
+    When reopening an existing file, any rows past the count recorded in
+    its header (left by an interrupted append) are discarded; dtype=None
+    then keeps the file's dtype.
+    """
+
+    def __init__(self, path: Path, dtype, row_shape: tuple = (), append: bool = False):
+        self.path = path
+        self.row_shape = tuple(row_shape)
+
+        if append:
+            self._file = open(path, "r+b")
+            version = np.lib.format.read_magic(self._file)
+            if version != (1, 0):
+                raise ValueError(f"Unexpected .npy version {version} in {path}")
+            shape, _, file_dtype = np.lib.format.read_array_header_1_0(self._file)
+            if dtype is not None and np.dtype(dtype) != file_dtype:
+                raise ValueError(f"Cannot append {np.dtype(dtype)} rows to {file_dtype} {path}")
+            self.dtype = file_dtype
+            self._row_bytes = self.dtype.itemsize * int(np.prod(self.row_shape, dtype=np.int64))
+            self.truncate(shape[0])
+        else:
+            self.dtype = np.dtype(dtype)
+            self._row_bytes = self.dtype.itemsize * int(np.prod(self.row_shape, dtype=np.int64))
+            self.num_rows = 0
+            self._file = open(path, "wb")
+            self._file.write(_npy_header(self.dtype, (0,) + self.row_shape))
+
+    def append(self, rows: np.ndarray) -> None:
+        rows = np.ascontiguousarray(rows, dtype=self.dtype)
+        self._file.write(rows.tobytes())
+        self.num_rows += rows.shape[0]
+
+    def truncate(self, num_rows: int) -> None:
+        """Discard rows past num_rows and position for appending."""
+        self.num_rows = num_rows
+        self._file.truncate(_NPY_HEADER_LEN + num_rows * self._row_bytes)
+        self._file.seek(0, 2)
+
+    def last(self):
+        """Return the last committed row."""
+        self._file.flush()
+        self._file.seek(_NPY_HEADER_LEN + (self.num_rows - 1) * self._row_bytes)
+        value = np.frombuffer(self._file.read(self._row_bytes), dtype=self.dtype)
+        self._file.seek(0, 2)
+        return value[0]
+
+    def abort(self) -> None:
+        self._file.close()
+
+    def close(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.seek(0)
+        self._file.write(_npy_header(self.dtype, (self.num_rows,) + self.row_shape))
+        self._file.close()
+
+
+def _load_deleted(directory: Path) -> np.ndarray:
+    path = directory / DELETED_FILE
+    if not path.exists():
+        return np.empty(0, dtype=np.int64)
+    return np.load(path)
+
+
+def _save_deleted(directory: Path, deleted: set) -> None:
+    path = directory / DELETED_FILE
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, np.array(sorted(deleted), dtype=np.int64))
+    os.replace(tmp_path, path)
+
+
+def _load_fingerprint_params(directory: Path) -> Optional[Dict]:
+    path = directory / FINGERPRINT_PARAMS_FILE
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _save_fingerprint_params(directory: Path, params: Dict) -> None:
+    _atomic_write_text(directory / FINGERPRINT_PARAMS_FILE, json.dumps(params))
+
+
+def _atomic_write_text(path: Path, text: str) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(text, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def _npy_header(dtype: np.dtype, shape: tuple) -> bytes:
+    """Build a version 1.0 .npy header padded to a fixed length."""
+    header = repr({
+        "descr": np.lib.format.dtype_to_descr(dtype),
+        "fortran_order": False,
+        "shape": shape,
+    })
+    body_len = _NPY_HEADER_LEN - 10  # magic (6) + version (2) + length (2)
+    if len(header) + 1 > body_len:
+        raise ValueError(f"Shape {shape} does not fit in a fixed .npy header")
+    header = header.ljust(body_len - 1) + "\n"
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", body_len) + header.encode("latin1")
+
+
+def _mmap_file(path: Path) -> mmap.mmap | bytes:
+    """Memory-map a file read-only (empty files cannot be mapped)."""
+    if path.stat().st_size == 0:
+        return b""
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
@@ -0,0 +1,160 @@
+"""
+Streaming, bounded-memory ingestion.
+
+PDF pages -> chunks -> fixed-size embedding batches -> chunk store and index
+appends, all as generators. Only one document's pages and one batch of
+chunks and embeddings are held at a time, so peak memory depends on the
+batch size rather than the corpus size.
+
+Deduplication is the exception and is off by default
+(STREAMING_DEDUP_ENABLED): the deduplicator keeps a hash, a MinHash
+signature and LSH bucket entries for every kept chunk, plus the duplicate
+map, so its memory is O(corpus).
+"""
+
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from pathlib import Path
+
+import faiss
+
+from config import (
+    CHUNK_STORE_DIR,
+    INDEX_PATH,
+    EMBEDDING_MODEL_NAME,
+    FAISS_INDEX_TYPE,
+    STREAMING_BATCH_SIZE,
+    STREAMING_DEDUP_ENABLED,
+    SEARCH_ENGINE,
+    LEXICAL_INDEX_ENABLED,
+)
+from components.data.dedup import ChunkDeduplicator
+from components.data.directory import chunk_pdf_page_data
+from components.data.pdf import PDFDataSource
+from components.embeddings import EmbeddingPool
+from .embeddings import embed_texts, open_embedding_cache
+from .binary import run_binary_index_pipeline
+from .incremental import rebuild_manifest
+from .lexical import run_lexical_index_pipeline
+from .indexing import (
+    build_faiss_index,
+    build_shards,
+    configure_search_params,
+    create_index,
+    save_index,
+    with_id_map,
+)
+from .store import ChunkStore, ChunkStoreWriter
+
+
+def iter_chunks(documents: Iterable[Tuple[Path, List[Dict]]]) -> Iterator[Dict]:
+    """Lazily chunk (pdf_file, pages) documents."""
+    for pdf_file, pages in documents:
+        yield from chunk_pdf_page_data(pages, pdf_file.stem)
+
+
+def iter_batches(items: Iterable, batch_size: int) -> Iterator[List]:
+    """Group an iterable into lists of at most batch_size items."""
+    iterator = iter(items)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+def run_streaming_pipeline(
+    source: Optional[PDFDataSource] = None,
+    index_type: str = FAISS_INDEX_TYPE,
+    batch_size: int = STREAMING_BATCH_SIZE,
+    save_txt: bool = True,
+    sync: bool = True,
+    dedup: bool = STREAMING_DEDUP_ENABLED,
+) -> Tuple[faiss.Index, ChunkStore]:
+    """
+    Ingest, chunk, embed and index the whole corpus in one bounded-memory pass.
+
+    Index types that need no training (flat, HNSW) are filled batch by batch
+    as embeddings are produced. IVF/PQ indexes need a training sample first,
+    so they are built afterwards from the memory-mapped store.
+
+    Args:
+        source: PDF data source (default: PDFDataSource())
+        index_type: One of SUPPORTED_INDEX_TYPES
+        batch_size: Chunks embedded and appended per batch
+        save_txt: Also write human-readable .txt files for parsed PDFs
+        sync: Download the latest PDFs from cloud storage first
+        dedup: Drop exact and near-duplicate chunks before embedding them
+            (memory then grows with the corpus)
+
+    Returns:
+        (index, store)
+    """
+    source = source or PDFDataSource()
+    if sync:
+        source.sync()
+
+    pdf_files = sorted(source.pdf_dir.glob("*.pdf"))
+    source.pickle_dir.mkdir(parents=True, exist_ok=True)
+
+    # Length-sorted batches, spread over EMBEDDING_WORKERS processes
+    cache = open_embedding_cache()
+    with EmbeddingPool(model_name=EMBEDDING_MODEL_NAME) as model:
+        dimension = model.get_sentence_embedding_dimension()
+
+        index = create_index(dimension, index_type)
+        index = with_id_map(index) if index.is_trained else None
+
+        def documents():
+            for pdf_file, pages in source.extract_all(pdf_files):
+                source.save_outputs(pdf_file.stem, pages, save_txt=save_txt)
+                yield pdf_file, pages
+
+        chunks = iter_chunks(documents())
+        deduplicator = ChunkDeduplicator() if dedup else None
+        if deduplicator is not None:
+            chunks = deduplicator.iter_unique(chunks)
+
+        num_chunks = 0
+        duplicates = deduplicator.duplicates if deduplicator is not None else None
+        with ChunkStoreWriter(CHUNK_STORE_DIR, dimension, duplicates=duplicates) as writer:
+            for batch in iter_batches(chunks, batch_size):
+                embeddings = embed_texts(
+                    [chunk["text"] for chunk in batch], model, show_progress_bar=False, cache=cache
+                )
+                ids = writer.append(embeddings, batch)
+                if index is not None:
+                    index.add_with_ids(embeddings, ids)
+                num_chunks += len(batch)
+                print(f"  embedded {num_chunks} chunks", end="\r")
+    print()
+    if deduplicator is not None:
+        stats = deduplicator.stats()
+        print(
+            f"Dropped {stats['exact_duplicates']} exact and "
+            f"{stats['near_duplicates']} near-duplicate chunks"
+        )
+
+    if source.failed:
+        print(f"⚠️  {len(source.failed)} PDF(s) failed to parse and were skipped:")
+        for name, error in source.failed.items():
+            print(f"    - {name}: {error}")
+
+    store = ChunkStore(CHUNK_STORE_DIR)
+    if index is None:
+        index = build_faiss_index(store, index_type)
+    index = configure_search_params(index)
+    save_index(index, INDEX_PATH)
+    if SEARCH_ENGINE == "binary":
+        run_binary_index_pipeline(store)
+    if SEARCH_ENGINE == "sharded":
+        build_shards(store, index_type=index_type)
+    if LEXICAL_INDEX_ENABLED:
+        run_lexical_index_pipeline(store, rebuild=True)
+
+    # Record what was indexed so later runs can be incremental
+    rebuild_manifest(store, source.pdf_dir, failed=source.failed)
+
+    print(f"✓ Streamed {num_chunks} chunks into the store and index")
+    return index, store
+
+
+if __name__ == "__main__":
+    run_streaming_pipeline()
@@ -0,0 +1,9 @@
+# Query server package
+from .app import QueryServer, run_server
+from .batching import MicroBatcher
+
+__all__ = [
+    "QueryServer",
+    "run_server",
+    "MicroBatcher",
+]
@@ -0,0 +1,388 @@
+"""
+Long-running HTTP query server.
+
+Keeps the embedding model, index and chunks resident, and micro-batches
+concurrent requests: queries arriving within SERVER_BATCH_WINDOW_MS of
+each other are embedded in one encode call and searched together (see
+batching.py). Built on asyncio streams, so it needs no web framework.
+
+Endpoints:
+    GET  /health    200 while the process is up
+    GET  /ready     200 once models are loaded and warmed up, else 503
+    POST /retrieve  {"query", "top_k"?, "mode"?, "filters"?, "rerank"?}
+                    -> {"results": [{text, metadata, similarity_score}, ...]}
+    POST /query     {"query", "top_k"?, "mode"?, "filters"?, "rerank"?}
+                    -> {"answer": ...}
+
+Filters take the retrieve() form, with ranges written as
+{"page_number": {"min": 3, "max": 10}}; either bound may be left out.
+/query answers are cached only for questions without mode, filters or
+rerank, since the answer cache key does not cover them.
+"""
+
+import asyncio
+import json
+import math
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from config import (
+    ANSWER_CACHE_ENABLED,
+    DEFAULT_TOP_K,
+    SERVER_HOST,
+    SERVER_PORT,
+    SERVER_BATCH_WINDOW_MS,
+    SERVER_MAX_BATCH_SIZE,
+    SERVER_QUERY_WORKERS,
+    SERVER_MAX_BODY_BYTES,
+    SERVER_KEEPALIVE_TIMEOUT,
+)
+from rag.pipeline import cached_answer, context_top_k, get_llm, run_rag_pipeline
+from retrieval.retriever import Retriever, get_default_retriever
+from .batching import MicroBatcher
+
+
+class HTTPError(Exception):
+    """Request error answered with an HTTP status and a JSON error message."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class QueryServer:
+    """
+    HTTP server for retrieval and RAG queries over a resident retriever.
+
+    Args:
+        retriever: Retriever to serve (default: the process-wide one, which
+            the RAG pipeline also uses)
+        host: Interface to listen on
+        port: Port to listen on (0 picks a free port; see self.port)
+        batch_window_ms: Max time a request waits for others to join its batch
+        max_batch_size: Max queries per embedding + search batch
+        query_workers: Threads generating /query answers concurrently
+        warm_up_llm: Also load the LLM before reporting ready
+    """
+
+    def __init__(
+        self,
+        retriever: Optional[Retriever] = None,
+        host: str = SERVER_HOST,
+        port: int = SERVER_PORT,
+        batch_window_ms: float = SERVER_BATCH_WINDOW_MS,
+        max_batch_size: int = SERVER_MAX_BATCH_SIZE,
+        query_workers: int = SERVER_QUERY_WORKERS,
+        warm_up_llm: bool = True,
+    ):
+        self.retriever = retriever or get_default_retriever()
+        self.host = host
+        self.port = port
+        self.batch_window_ms = batch_window_ms
+        self.max_batch_size = max_batch_size
+        self.query_workers = query_workers
+        self.warm_up_llm = warm_up_llm
+        self.ready = False
+        self.warm_up_error: Optional[str] = None
+
+        self.batcher: Optional[MicroBatcher] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._batch_executor: Optional[ThreadPoolExecutor] = None
+        self._query_executor: Optional[ThreadPoolExecutor] = None
+        self._warm_up_task: Optional[asyncio.Task] = None
+        self._routes = {
+            "/health": ("GET", self._health),
+            "/ready": ("GET", self._ready),
+            "/retrieve": ("POST", self._retrieve),
+            "/query": ("POST", self._query),
+        }
+
+    async def start(self) -> None:
+        """Start listening, then warm up in the background (see /ready)."""
+        # Batches run one at a time on their own thread, so answer generation cannot starve them
+        self._batch_executor = ThreadPoolExecutor(1, thread_name_prefix="batch")
+        self._query_executor = ThreadPoolExecutor(self.query_workers, thread_name_prefix="query")
+        self.batcher = MicroBatcher(
+            self._retrieve_batch, self.max_batch_size, self.batch_window_ms, self._batch_executor
+        ).start()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._warm_up_task = asyncio.get_running_loop().create_task(self._warm_up())
+        print(f"✓ Serving on http://{self.host}:{self.port} (warming up...)")
+
+    async def serve_forever(self) -> None:
+        """Run until SIGINT / SIGTERM, then shut down cleanly."""
+        await self.start()
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        try:
+            await stop.wait()
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        """Stop accepting connections and release the worker threads."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._warm_up_task is not None:
+            self._warm_up_task.cancel()
+        if self.batcher is not None:
+            await self.batcher.close()
+        for executor in (self._batch_executor, self._query_executor):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        print("✓ Server stopped")
+
+    # ----------------------------
+    # Endpoints
+    # ----------------------------
+
+    async def _health(self, body: Dict) -> Tuple[int, Dict]:
+        return HTTPStatus.OK, {"status": "ok"}
+
+    async def _ready(self, body: Dict) -> Tuple[int, Dict]:
+        payload = {
+            "ready": self.ready,
+            "batches": self.batcher.batches,
+            "mean_batch_size": round(self.batcher.mean_batch_size, 2),
+        }
+        if self.warm_up_error:
+            payload["error"] = self.warm_up_error
+        return (HTTPStatus.OK if self.ready else HTTPStatus.SERVICE_UNAVAILABLE), payload
+
+    async def _retrieve(self, body: Dict) -> Tuple[int, Dict]:
+        query, params = _parse_retrieval_request(body)
+        results = await self._search(query, params)
+        return HTTPStatus.OK, {"results": results}
+
+    async def _query(self, body: Dict) -> Tuple[int, Dict]:
+        query, params = _parse_retrieval_request(body)
+        params["top_k"] = context_top_k(body.get("top_k"))
+        loop = asyncio.get_running_loop()
+
+        # Cached answers were built from the default retrieval's context
+        use_cache = ANSWER_CACHE_ENABLED and not (params["mode"] or params["filters"] or params["rerank"] is not None)
+        if use_cache:
+            if not self.ready:
+                raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, self.warm_up_error or "Server is warming up")
+            answer = await loop.run_in_executor(self._query_executor, cached_answer, query)
+            if answer is not None:
+                return HTTPStatus.OK, {"answer": answer}
+
+        candidates = await self._search(query, params)
+        answer = await loop.run_in_executor(
+            self._query_executor,
+            lambda: run_rag_pipeline(query, top_k=params["top_k"], use_cache=use_cache, candidates=candidates),
+        )
+        return HTTPStatus.OK, {"answer": answer}
+
+    async def _search(self, query: str, params: Dict) -> List[Dict]:
+        if not self.ready:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, self.warm_up_error or "Server is warming up")
+        try:
+            return await self.batcher.submit((query, params))
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(e))
+
+    # ----------------------------
+    # Batching and warm-up
+    # ----------------------------
+
+    def _retrieve_batch(self, requests: List[Tuple[str, Dict]]) -> List:
+        """
+        Search a batch of (query, params) requests.
+
+        Requests with the same parameters share one search_many() call. The
+        whole batch is embedded up front in one encode call; the searches
+        then find the vectors in the query cache.
+        """
+        groups: Dict[str, Tuple[Dict, List[int]]] = {}
+        for position, (_, params) in enumerate(requests):
+            key = json.dumps(params, sort_keys=True, default=repr)
+            groups.setdefault(key, (params, []))[1].append(position)
+        if len(groups) > 1 and self.retriever.query_cache is not None:
+            self.retriever.embed_many(list({query: None for query, _ in requests}))
+
+        results: List = [None] * len(requests)
+        for params, positions in groups.values():
+            try:
+                found = self.retriever.search_many([requests[p][0] for p in positions], **params)
+            except Exception as e:
+                found = [e] * len(positions)
+            for position, result in zip(positions, found):
+                results[position] = result
+        return results
+
+    async def _warm_up(self) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self._batch_executor, self._warm_up_models)
+        except Exception as e:
+            self.warm_up_error = f"Warm-up failed: {type(e).__name__}: {e}"
+            print(f"⚠️  {self.warm_up_error}")
+            return
+        self.ready = True
+        print("✓ Server ready")
+
+    def _warm_up_models(self) -> None:
+        """Load everything a request needs and run it once, so the first request is not slow."""
+        self.retriever.load()
+        self.retriever.search_many(["warm up"], top_k=DEFAULT_TOP_K)
+        if self.retriever.rerank:
+            self.retriever.get_reranker().warm_up()
+        if self.warm_up_llm:
+            get_llm()
+
+    # ----------------------------
+    # HTTP
+    # ----------------------------
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(_read_request(reader), SERVER_KEEPALIVE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                except HTTPError as e:
+                    await _write_response(writer, e.status, {"error": e.message}, keep_alive=False)
+                    break
+                except ValueError:
+                    # A line longer than the stream buffer limit
+                    error = {"error": "Request line or header too long"}
+                    await _write_response(writer, HTTPStatus.BAD_REQUEST, error, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, path, body, keep_alive = request
+                status, payload = await self._dispatch(method, path, body)
+                await _write_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, Dict]:
+        try:
+            if path not in self._routes:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown path: {path}")
+            allowed, handler = self._routes[path]
+            if method != allowed:
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{path} expects {allowed}")
+            return await handler(_parse_json(body) if allowed == "POST" else {})
+        except HTTPError as e:
+            return e.status, {"error": e.message}
+        except Exception as e:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(e).__name__}: {e}"}
+
+
+def _parse_json(body: bytes) -> Dict:
+    try:
+        data = json.loads(body or b"{}")
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid JSON body: {e}")
+    if not isinstance(data, dict):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "JSON body must be an object")
+    return data
+
+
+def _parse_retrieval_request(body: Dict) -> Tuple[str, Dict]:
+    """Validate a request body; return (query, search_many keyword arguments)."""
+    query = body.get("query")
+    if not isinstance(query, str) or not query.strip():
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "'query' must be a non-empty string")
+
+    top_k = body.get("top_k", DEFAULT_TOP_K)
+    if not isinstance(top_k, int) or isinstance(top_k, bool) or top_k < 1:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "'top_k' must be a positive integer")
+    mode = body.get("mode")
+    if mode is not None and not isinstance(mode, str):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "'mode' must be a string")
+    rerank = body.get("rerank")
+    if rerank is not None and not isinstance(rerank, bool):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "'rerank' must be a boolean")
+
+    filters = body.get("filters")
+    if filters is not None:
+        if not isinstance(filters, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "'filters' must be an object")
+        # JSON has no tuples: ranges are {"min": low, "max": high}
+        filters = {
+            field: _parse_range(field, value) if isinstance(value, dict) else value
+            for field, value in filters.items()
+        }
+    return query, {"top_k": top_k, "mode": mode, "filters": filters or None, "rerank": rerank}
+
+
+def _parse_range(field: str, value: Dict) -> Tuple[float, float]:
+    """Turn a {"min", "max"} range into an inclusive tuple; a missing bound is unbounded."""
+    if not value or set(value) - {"min", "max"}:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Range filter '{field}' takes only 'min' and 'max'")
+    bounds = []
+    for name, default in (("min", -math.inf), ("max", math.inf)):
+        bound = value.get(name, default)
+        if not isinstance(bound, (int, float)) or isinstance(bound, bool):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Range filter '{field}' bounds must be numbers")
+        bounds.append(bound)
+    return tuple(bounds)
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, bytes, bool]]:
+    """Read one HTTP/1.x request; return (method, path, body, keep_alive), or None at EOF."""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+    if length > SERVER_MAX_BODY_BYTES:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Body exceeds {SERVER_MAX_BODY_BYTES} bytes")
+    body = await reader.readexactly(length) if length else b""
+
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    return method.upper(), urlsplit(target).path, body, keep_alive
+
+
+async def _write_response(writer: asyncio.StreamWriter, status: int, payload: Dict, keep_alive: bool) -> None:
+    body = json.dumps(payload).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {int(status)} {HTTPStatus(status).phrase}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+
+def run_server(**kwargs) -> None:
+    """Run a QueryServer until interrupted; keyword arguments go to QueryServer."""
+    asyncio.run(QueryServer(**kwargs).serve_forever())
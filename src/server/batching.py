@@ -0,0 +1,128 @@
+"""
+Micro-batching of concurrent requests.
+
+Encoding one query at a time leaves most of the model's throughput unused;
+encoding a batch costs little more than encoding one query. The batcher
+holds each request for at most window_ms so that requests arriving
+concurrently share one blocking batch call, run on an executor thread.
+While a batch runs, new requests queue up and form the next batch, so
+batches grow with load instead of requests waiting in line one by one.
+"""
+
+import asyncio
+from collections import deque
+from concurrent.futures import Executor
+from typing import Any, Callable, List, Optional
+
+from config import SERVER_BATCH_WINDOW_MS, SERVER_MAX_BATCH_SIZE
+
+
+class MicroBatcher:
+    """
+    Gather concurrently submitted items into batches for one blocking call.
+
+    A batch is dispatched when it reaches max_batch_size, or window_ms
+    after its oldest item arrived. Batches run one at a time.
+
+    Args:
+        process_batch: Blocking function mapping a list of items to a list
+            of results in the same order; an exception instance as a result
+            fails only that item
+        max_batch_size: Max items per batch
+        window_ms: Max time an item waits for others to join its batch
+        executor: Executor the batches run on (default: the loop's)
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = SERVER_MAX_BATCH_SIZE,
+        window_ms: float = SERVER_BATCH_WINDOW_MS,
+        executor: Optional[Executor] = None,
+    ):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.window_ms = window_ms
+        self.executor = executor
+        self.batches = 0
+        self.items = 0
+
+        self._pending: deque = deque()  # (item, future, arrival time)
+        self._nonempty: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.items / self.batches if self.batches else 0.0
+
+    def start(self) -> "MicroBatcher":
+        """Start dispatching batches on the running event loop."""
+        self._nonempty = asyncio.Event()
+        self._full = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    async def submit(self, item: Any) -> Any:
+        """Queue an item and wait for its result."""
+        if self._task is None or self._task.done():
+            raise RuntimeError("MicroBatcher is not running")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future, loop.time()))
+        self._nonempty.set()
+        if len(self._pending) >= self.max_batch_size:
+            self._full.set()
+        return await future
+
+    async def close(self) -> None:
+        """Stop dispatching; queued items fail with RuntimeError."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._pending:
+            _, future, _ = self._pending.popleft()
+            if not future.done():
+                future.set_exception(RuntimeError("MicroBatcher closed"))
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._nonempty.wait()
+            # Items that queued up during the previous batch are already due
+            delay = self._pending[0][2] + self.window_ms / 1000 - loop.time()
+            if delay > 0 and len(self._pending) < self.max_batch_size:
+                self._full.clear()
+                try:
+                    await asyncio.wait_for(self._full.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+
+            batch = [self._pending.popleft() for _ in range(min(len(self._pending), self.max_batch_size))]
+            if not self._pending:
+                self._nonempty.clear()
+            # Skip requests whose client has gone away
+            batch = [(item, future) for item, future, _ in batch if not future.done()]
+            if not batch:
+                continue
+
+            try:
+                results = await loop.run_in_executor(
+                    self.executor, self.process_batch, [item for item, _ in batch]
+                )
+            except Exception as e:
+                results = [e] * len(batch)
+
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
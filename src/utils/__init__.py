@@ -1,10 +1,14 @@
 # Utils package
 from .io import load_pickle, save_pickle
-from .text import chunk_text, clean_text
+from .text import chunk_spans, chunk_text, chunk_texts_by_tokens, clean_text, estimate_tokens, split_sentences
 
 __all__ = [
     "load_pickle",
     "save_pickle",
+    "chunk_spans",
     "chunk_text",
+    "chunk_texts_by_tokens",
     "clean_text",
+    "estimate_tokens",
+    "split_sentences",
 ]
@@ -1,5 +1,21 @@
 import re
-from typing import List, Dict
+from typing import List, Dict, Tuple
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough estimate of token count (1 token ≈ 4 characters).
+    For accurate count, use tokenizer from llm.tokenizer.
+    """
+    return len(text) // 4
+
+
+# Precompiled once instead of on every page
+_PAGE_NUMBER_RE = re.compile(r"page \d+ of \d+", flags=re.IGNORECASE)
+
+
+# The only non-printable ASCII characters are the C0 controls and DEL
+_ASCII_NON_PRINTABLE = dict.fromkeys([*range(0x20), 0x7F])
 
 
 def clean_text(text: str) -> str:
@@ -11,12 +27,38 @@ def clean_text(text: str) -> str:
     - Flatten whitespace and line breaks
     - Remove non-printable characters
     """
-    text = re.sub(r"page \d+ of \d+", "", text, flags=re.IGNORECASE)
+    text = _PAGE_NUMBER_RE.sub("", text)
     text = " ".join(text.split())
-    text = "".join(c for c in text if c.isprintable())
+    # Most pages are fully printable after whitespace flattening
+    if not text.isprintable():
+        if text.isascii():
+            text = text.translate(_ASCII_NON_PRINTABLE)
+        else:
+            text = "".join(filter(str.isprintable, text))
     return text
 
 
+def chunk_spans(text_length: int, chunk_size: int = 500, overlap: int = 50) -> List[Tuple[int, int]]:
+    """
+    Compute (start, end) character offsets of overlapping chunks.
+
+    Same boundaries as chunk_text, without building the chunk strings.
+
+    Args:
+        text_length: Length of the text to chunk
+        chunk_size: Maximum characters per chunk
+        overlap: Number of overlapping characters between chunks
+
+    Returns:
+        List of (start, end) offsets
+    """
+    if overlap >= chunk_size:
+        raise ValueError("overlap must be smaller than chunk_size")
+
+    step = chunk_size - overlap
+    return [(start, min(start + chunk_size, text_length)) for start in range(0, text_length, step)]
+
+
 def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
     """
     Split text into overlapping chunks.
@@ -29,16 +71,130 @@ def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]
     Returns:
         List of text chunks
     """
-    if overlap >= chunk_size:
-        raise ValueError("overlap must be smaller than chunk_size")
+    return [text[start:end] for start, end in chunk_spans(len(text), chunk_size, overlap)]
 
-    chunks = []
+
+# Sentence end: terminal punctuation, optional closing quotes/brackets, then whitespace
+_SENTENCE_BOUNDARY_RE = re.compile(r"[.!?][\"')\]]*(\s+)")
+
+
+def split_sentences(text: str) -> List[Tuple[int, int]]:
+    """
+    Compute (start, end) character offsets of the sentences in text.
+
+    The whitespace between sentences belongs to neither sentence.
+    """
+    spans = []
     start = 0
-    text_length = len(text)
+    for match in _SENTENCE_BOUNDARY_RE.finditer(text):
+        spans.append((start, match.start(1)))
+        start = match.end(1)
+    if start < len(text):
+        spans.append((start, len(text)))
+    return spans
+
+
+def chunk_texts_by_tokens(
+    texts: List[str],
+    tokenizer,
+    max_tokens: int = 254,
+    overlap_tokens: int = 32
+) -> List[List[str]]:
+    """
+    Split texts into sentence-aligned chunks that fit a token budget.
+
+    The sentences of all texts are tokenized in a single batched call to a
+    fast Hugging Face tokenizer. Sentences are packed greedily into chunks;
+    a sentence longer than the budget is split at token boundaries,
+    preferring word starts. Each new chunk repeats whole trailing sentences
+    of the previous one, up to overlap_tokens.
+
+    Args:
+        texts: Texts to chunk (e.g. the pages of one document)
+        tokenizer: Fast tokenizer of the embedding model
+        max_tokens: Token budget per chunk, excluding special tokens
+        overlap_tokens: Max tokens of trailing sentences repeated in the next chunk
+
+    Returns:
+        List of text chunks for each input text
+    """
+    if overlap_tokens >= max_tokens:
+        raise ValueError("overlap_tokens must be smaller than max_tokens")
+
+    sentence_spans = [split_sentences(text) for text in texts]
+    sentences = [text[start:end] for text, spans in zip(texts, sentence_spans) for start, end in spans]
+    if not sentences:
+        return [[] for _ in texts]
+
+    encoded = tokenizer(
+        sentences,
+        add_special_tokens=False,
+        return_offsets_mapping=True,
+        return_attention_mask=False,
+        return_token_type_ids=False
+    )
+    offsets = iter(encoded["offset_mapping"])
+
+    return [
+        _pack_sentences(text, spans, [next(offsets) for _ in spans], max_tokens, overlap_tokens)
+        for text, spans in zip(texts, sentence_spans)
+    ]
+
+
+def _pack_sentences(
+    text: str,
+    spans: List[Tuple[int, int]],
+    token_offsets: List[List[Tuple[int, int]]],
+    max_tokens: int,
+    overlap_tokens: int
+) -> List[str]:
+    """Greedily pack one text's sentences into chunks of at most max_tokens tokens."""
+    # (start, end, num_tokens) units; oversized sentences become several units
+    units = []
+    for (start, end), offsets in zip(spans, token_offsets):
+        if len(offsets) <= max_tokens:
+            units.append((start, end, len(offsets)))
+        else:
+            units.extend(_split_long_sentence(text, start, offsets, max_tokens))
+
+    chunks = []
+    current, tokens = [], 0
+    for unit in units:
+        if current and tokens + unit[2] > max_tokens:
+            chunks.append(current)
+            # Carry over trailing sentences, leaving room for this one
+            carry, carried = [], 0
+            for previous in reversed(current):
+                if carried + previous[2] > min(overlap_tokens, max_tokens - unit[2]):
+                    break
+                carry.insert(0, previous)
+                carried += previous[2]
+            current, tokens = carry, carried
+        current.append(unit)
+        tokens += unit[2]
+    if current:
+        chunks.append(current)
+
+    return [text[chunk[0][0]:chunk[-1][1]] for chunk in chunks]
 
-    while start < text_length:
-        end = min(start + chunk_size, text_length)
-        chunks.append(text[start:end])
-        start += chunk_size - overlap
 
-    return chunks
+def _split_long_sentence(
+    text: str,
+    base: int,
+    offsets: List[Tuple[int, int]],
+    max_tokens: int
+) -> List[Tuple[int, int, int]]:
+    """Split a sentence into (start, end, num_tokens) pieces of at most max_tokens tokens."""
+    pieces = []
+    i = 0
+    while i < len(offsets):
+        cut = min(i + max_tokens, len(offsets))
+        if cut < len(offsets):
+            # Back off to the last token that starts a word, if any
+            for k in range(cut, i, -1):
+                if text[base + offsets[k][0] - 1].isspace():
+                    cut = k
+                    break
+        pieces.append((base + offsets[i][0], base + offsets[cut - 1][1], cut - i))
+        i = cut
+    return pieces
@@ -0,0 +1,220 @@
+# Test PDF ingestion
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import fitz
+import numpy as np
+
+import components.data.pdf as pdf
+import retrieval.incremental as incremental
+import retrieval.streaming as streaming
+from components.data.manifest import Manifest
+from components.data.pdf import PDFDataSource
+from components.embeddings import BaseEmbedder
+from retrieval.indexing import index_type_of, load_faiss_index
+from retrieval.store import ChunkStore
+
+TEST_DATA_DIR = Path(__file__).parent / "test_data"
+
+
+def _crash_on_bad_pdf(pdf_path, start=0, end=None):
+    """Worker stand-in whose process dies abruptly, as on a segfault in the PDF parser."""
+    if Path(pdf_path).stem == "bad":
+        os._exit(1)
+    return _extract_page_range(pdf_path, start, end)
+
+
+_extract_page_range = pdf.extract_page_range
+
+
+class _LocalPDFDataSource(PDFDataSource):
+    """PDFDataSource without the cloud storage client, which needs credentials."""
+
+    def __init__(self, pdf_dir: Path, workers: int = 1, processed_dir: Path = None):
+        self.pdf_dir = pdf_dir
+        self.workers = workers
+        self.failed = {}
+        if processed_dir is not None:
+            self.pickle_dir = processed_dir / "pickle"
+            self.txt_dir = processed_dir / "txt"
+
+
+class _StubPool(BaseEmbedder):
+    """EmbeddingPool stand-in: a bag-of-characters embedder that loads no model."""
+
+    model_name = "stub"
+
+    def __init__(self, **kwargs):
+        pass
+
+    def encode(self, sentences, **kwargs):
+        vectors = np.zeros((len(sentences), 16), dtype=np.float32)
+        for row, sentence in enumerate(sentences):
+            for char in sentence.lower():
+                vectors[row, ord(char) % 16] += 1
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+
+    def get_sentence_embedding_dimension(self):
+        return 16
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+@contextlib.contextmanager
+def _patched(module, **attributes):
+    """Temporarily replace module attributes (paths, settings, the embedding pool)."""
+    saved = {name: getattr(module, name) for name in attributes}
+    for name, value in attributes.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(module, name, value)
+
+
+def _pipeline_paths(root: Path) -> dict:
+    return dict(
+        CHUNK_STORE_DIR=root / "store",
+        INDEX_PATH=root / "vector_index.index",
+        MANIFEST_PATH=root / "manifest.json",
+        LEXICAL_INDEX_ENABLED=False,
+        SEARCH_ENGINE="faiss",
+        EmbeddingPool=_StubPool,
+        open_embedding_cache=lambda: None,
+    )
+
+
+def _write_pdf(path: Path, pages) -> None:
+    document = fitz.open()
+    for text in pages:
+        document.new_page().insert_text((72, 72), text, fontsize=9)
+    document.save(path)
+    document.close()
+
+
+def test_extract_all_survives_worker_crash():
+    """Test that a PDF that kills its worker is recorded as failed and the other PDFs still parse."""
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ("a", "bad", "c"):
+                shutil.copy(TEST_DATA_DIR / "Attention.pdf", Path(tmp) / f"{name}.pdf")
+            source = _LocalPDFDataSource(pdf_dir=Path(tmp), workers=2)
+            pdf.extract_page_range = _crash_on_bad_pdf
+            try:
+                pdf_files = sorted(Path(tmp).glob("*.pdf"))
+                parsed = [(path.stem, len(pages)) for path, pages in source.extract_all(pdf_files)]
+            finally:
+                pdf.extract_page_range = _extract_page_range
+
+        assert [name for name, _ in parsed] == ["a", "c"], parsed
+        assert all(num_pages > 0 for _, num_pages in parsed)
+        assert list(source.failed) == ["bad.pdf"], source.failed
+        print("✓ test_extract_all_survives_worker_crash passed")
+    except Exception as e:
+        print(f"✗ test_extract_all_survives_worker_crash failed: {e}")
+
+
+def test_incremental_pipeline():
+    """Test add / remove + change / no-op incremental runs keep the store, index and manifest consistent."""
+    try:
+        boilerplate = "This report is confidential and intended only for the named recipient."
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            pdf_dir = root / "pdfs"
+            pdf_dir.mkdir()
+            _write_pdf(pdf_dir / "a.pdf", ["Alpha covers payment schedules and invoices.", boilerplate])
+            _write_pdf(pdf_dir / "b.pdf", ["Bravo covers warranty and liability."])
+            _write_pdf(pdf_dir / "c.pdf", ["Charlie covers audits.", boilerplate])
+            (pdf_dir / "x.pdf").write_bytes(b"not a pdf")
+            source = _LocalPDFDataSource(pdf_dir, processed_dir=root / "processed")
+            paths = _pipeline_paths(root)
+
+            def state():
+                store = ChunkStore(paths["CHUNK_STORE_DIR"])
+                manifest = Manifest.load(paths["MANIFEST_PATH"])
+                live = store.live_ids()
+                assert load_faiss_index(paths["INDEX_PATH"]).ntotal == len(live)
+                assert sorted(manifest.live_ids()) == live.tolist()
+                for name in manifest.documents:
+                    assert sorted(manifest.ids(name)) == store.filename_rows(name).tolist(), name
+                return store, manifest
+
+            with _patched(incremental, **paths):
+                summary = incremental.run_incremental_pipeline(source, index_type="flat", save_txt=False, sync=False)
+                assert summary == {"added": ["a", "b", "c", "x"], "changed": [], "removed": [], "failed": ["x.pdf"]}
+                store, manifest = state()
+                assert sorted(manifest.documents) == ["a", "b", "c"]  # x is retried next time
+                assert len(store.live_ids()) == 4  # c's copy of the boilerplate was dropped
+
+                (pdf_dir / "a.pdf").unlink()
+                (pdf_dir / "x.pdf").unlink()
+                _write_pdf(pdf_dir / "b.pdf", ["Bravo now covers indemnities.", "And a second page."])
+                summary = incremental.run_incremental_pipeline(source, save_txt=False, sync=False)
+                assert summary == {"added": [], "changed": ["b"], "removed": ["a"], "failed": []}
+                store, manifest = state()
+                texts = {store.text(i) for i in store.live_ids()}
+                assert not any(text.startswith("Alpha") or "warranty" in text for text in texts)
+                # a held the kept copy of the boilerplate, so c's copy replaces it
+                holders = [store.metadata(i)["filename"] for i in store.live_ids() if boilerplate in store.text(i)]
+                assert holders == ["c"]
+                assert len(manifest.ids("c")) == 2
+
+                summary = incremental.run_incremental_pipeline(source, save_txt=False, sync=False)
+                assert summary == {"added": [], "changed": [], "removed": [], "failed": []}
+                assert Manifest.load(paths["MANIFEST_PATH"]).documents == manifest.documents
+        print("✓ test_incremental_pipeline passed")
+    except Exception as e:
+        print(f"✗ test_incremental_pipeline failed: {e}")
+
+
+def test_streaming_pipeline():
+    """Test that streamed batches fill the store and index row for row, for per-batch and trained index types."""
+    try:
+        topics = ["attention", "convolution", "recurrence", "tokenization"]
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            pdf_dir = root / "pdfs"
+            pdf_dir.mkdir()
+            for i, topic in enumerate(topics):
+                # Several 500-character chunks per page
+                pages = [f"Page {page} of a note on {topic}. " * 40 for page in range(1, 3 + i % 2)]
+                _write_pdf(pdf_dir / f"{topic}.pdf", pages)
+            (pdf_dir / "x.pdf").write_bytes(b"not a pdf")
+            source = _LocalPDFDataSource(pdf_dir, processed_dir=root / "processed")
+            paths = _pipeline_paths(root)
+            del paths["MANIFEST_PATH"]
+
+            # flat and hnsw are filled batch by batch; ivf_flat is trained and built from the store afterwards
+            for index_type in ("flat", "hnsw", "ivf_flat"):
+                with _patched(streaming, **paths), _patched(incremental, MANIFEST_PATH=root / "manifest.json"):
+                    index, store = streaming.run_streaming_pipeline(
+                        source, index_type=index_type, batch_size=3, save_txt=False, sync=False
+                    )
+                assert index_type_of(index) == index_type
+                assert len(store) > 3 * 3, len(store)  # Several batches, the last one partial
+                assert index.ntotal == len(store) == load_faiss_index(paths["INDEX_PATH"]).ntotal, index_type
+                assert sorted(store.filenames) == sorted(topics)
+                manifest = Manifest.load(root / "manifest.json")
+                assert sorted(manifest.documents) == sorted(topics)  # x.pdf failed and is retried next time
+                assert sorted(manifest.live_ids()) == list(range(len(store)))
+        print("✓ test_streaming_pipeline passed")
+    except Exception as e:
+        print(f"✗ test_streaming_pipeline failed: {e}")
+
+
+if __name__ == "__main__":
+    test_extract_all_survives_worker_crash()
+    test_incremental_pipeline()
+    test_streaming_pipeline()
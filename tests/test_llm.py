@@ -1,11 +1,13 @@
 # Test LLM components
 import sys
+import tempfile
+import threading
 from pathlib import Path
 
 # Add src to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-from components.llm import BaseLLM, LocalLLM, OpenAILLM
+from components.llm import BaseLLM, BatchedLLM, LocalLLM, OpenAILLM
 
 
 def test_local_llm_instantiation():
@@ -32,6 +34,81 @@ def test_base_llm_abstract():
         print("✓ test_base_llm_abstract passed")
 
 
+class FakeLocalLLM:
+    """Records every generate_batch call instead of running a model."""
+
+    model_name = "fake"
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+
+    def generate_batch(self, prompts, max_length=None, **generation_kwargs):
+        self.release.wait()
+        self.calls.append((list(prompts), max_length))
+        return [prompt.upper() for prompt in prompts]
+
+
+def test_batched_llm():
+    """Test that concurrent prompts share generate calls grouped by settings."""
+    try:
+        fake = FakeLocalLLM()
+        llm = BatchedLLM(fake, max_batch_size=4, max_wait_ms=50)
+        futures = [llm.submit(f"prompt {i}") for i in range(6)] + [llm.submit("short", max_length=8)]
+        fake.release.set()
+        assert [future.result(timeout=5) for future in futures] == [f"PROMPT {i}" for i in range(6)] + ["SHORT"]
+        assert [(len(prompts), max_length) for prompts, max_length in fake.calls] == [(4, None), (2, None), (1, 8)]
+        assert llm.generate("direct") == "DIRECT"
+        llm.close()
+        print("✓ test_batched_llm passed")
+    except Exception as e:
+        print(f"✗ test_batched_llm failed: {e}")
+
+
+def _save_tiny_causal_model(directory, n_positions):
+    """Save a randomly initialized GPT-2 and a word-level tokenizer, so no download is needed."""
+    import torch
+    from tokenizers import Tokenizer, models, pre_tokenizers
+    from transformers import GPT2Config, GPT2LMHeadModel, PreTrainedTokenizerFast
+
+    words = "the a contract clause payment warranty report audit policy safety question answer context".split()
+    vocab = {token: i for i, token in enumerate(["<unk>", "<eos>"] + words)}
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token="<unk>"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    PreTrainedTokenizerFast(tokenizer_object=tokenizer, unk_token="<unk>", eos_token="<eos>").save_pretrained(directory)
+
+    torch.manual_seed(0)
+    config = GPT2Config(
+        vocab_size=len(vocab), n_positions=n_positions, n_embd=32, n_layer=2, n_head=2,
+        bos_token_id=1, eos_token_id=1,
+    )
+    GPT2LMHeadModel(config).save_pretrained(directory)
+
+
+def test_causal_batch_matches_single_prompts():
+    """Test that batching causal prompts of different lengths keeps each prompt's own token budget."""
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            _save_tiny_causal_model(tmp, n_positions=32)
+            llm = LocalLLM(model_name=tmp, model_type="causal", max_length=32)
+            prompts = [
+                "question",
+                "the contract clause payment warranty report audit policy safety " * 2 + "question",
+                "the audit report",
+            ]
+
+            single = [llm.generate(prompt, do_sample=False) for prompt in prompts]
+            batched = llm.generate_batch(prompts, do_sample=False)
+            assert batched == single, (batched, single)
+            # The short prompt is not cut to the long prompt's budget
+            assert len(single[0].split()) > len(prompts[1].split())
+        print("✓ test_causal_batch_matches_single_prompts passed")
+    except Exception as e:
+        print(f"✗ test_causal_batch_matches_single_prompts failed: {e}")
+
+
 if __name__ == "__main__":
     test_local_llm_instantiation()
     test_base_llm_abstract()
+    test_batched_llm()
+    test_causal_batch_matches_single_prompts()
@@ -2,11 +2,14 @@
 import sys
 from pathlib import Path
 
+import numpy as np
+
 # Add src to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-from rag import run_rag_pipeline, format_context
+from rag import run_rag_pipeline, format_context, pack_context
 from rag.prompts import create_prompt
+from rag.answer_cache import SemanticAnswerCache
 
 
 def test_format_context():
@@ -41,6 +44,52 @@ def test_create_prompt():
         print(f"✗ test_create_prompt failed: {e}")
 
 
+def test_pack_context():
+    """Test greedy context packing within a token budget."""
+    try:
+        chunks = [
+            {
+                "text": "word " * 40,
+                "metadata": {"filename": "test.pdf", "page_number": i}
+            }
+            for i in range(1, 6)
+        ]
+        count_words = lambda text: len(text.split())
+        context, packed, used = pack_context(
+            chunks, token_budget=100, count_tokens=count_words, min_truncated_tokens=5
+        )
+        assert used <= 100
+        assert used == count_words(context)
+        assert len(packed) == 3  # two full chunks plus one trimmed
+        assert packed[-1].get("truncated")
+        assert packed[0] is chunks[0]
+        print("✓ test_pack_context passed")
+    except Exception as e:
+        print(f"✗ test_pack_context failed: {e}")
+
+
+def test_semantic_answer_cache():
+    """Test similarity hits, model matching and invalidation on index rebuild."""
+    try:
+        cache = SemanticAnswerCache(max_entries=2, threshold=0.9)
+        question = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+        rephrased = np.array([0.99, 0.1, 0.0], dtype=np.float32)
+        rephrased /= np.linalg.norm(rephrased)
+        unrelated = np.array([0.0, 1.0, 0.0], dtype=np.float32)
+
+        cache.store("What is AI?", question, "AI answer", "flan-t5", "v1")
+        assert cache.lookup(rephrased, "flan-t5", "v1") == "AI answer"
+        assert cache.lookup(rephrased, "gpt-4", "v1") is None
+        assert cache.lookup(unrelated, "flan-t5", "v1") is None
+        assert cache.lookup(rephrased, "flan-t5", "v2") is None  # index rebuilt
+        assert len(cache) == 0
+        print("✓ test_semantic_answer_cache passed")
+    except Exception as e:
+        print(f"✗ test_semantic_answer_cache failed: {e}")
+
+
 if __name__ == "__main__":
     test_format_context()
     test_create_prompt()
+    test_pack_context()
+    test_semantic_answer_cache()
@@ -1,11 +1,18 @@
 # Test retrieval functionality
 import sys
+import tempfile
 from pathlib import Path
 
 # Add src to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-from retrieval import retrieve
+import numpy as np
+
+from retrieval import retrieve, retrieve_many, Retriever, QueryEmbeddingCache, search_index
+from retrieval.indexing import build_faiss_index, index_type_of, update_faiss_index, SUPPORTED_INDEX_TYPES
+from retrieval.store import ChunkStore
+from components.embeddings import BaseEmbedder, EmbedderFactory, EmbeddingCache
+from retrieval.embeddings import embed_texts
 
 
 def test_retrieve():
@@ -21,5 +28,554 @@ def test_retrieve():
         print(f"✗ test_retrieval failed: {e}")
 
 
+class _StubEmbedder(BaseEmbedder):
+    """Bag-of-characters embedder that counts its encode calls."""
+
+    model_name = "stub"
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, sentences, **kwargs):
+        self.calls += 1
+        vectors = np.zeros((len(sentences), 16), dtype=np.float32)
+        for row, sentence in enumerate(sentences):
+            for char in sentence.lower():
+                vectors[row, ord(char) % 16] += 1
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+
+    def get_sentence_embedding_dimension(self):
+        return 16
+
+
+_STUB_TEXTS = [
+    "attention weighs every token",
+    "bert is a bidirectional encoder",
+    "convolutions share weights",
+    "dropout regularizes networks",
+    "embeddings map words to vectors",
+]
+
+
+def _stub_retriever(directory: Path, embedder: _StubEmbedder) -> Retriever:
+    """A Retriever over a small chunk store and flat index written to directory."""
+    from retrieval.indexing import save_index
+    chunks = [
+        {"text": text, "metadata": {"filename": f"doc{i}", "page_number": 1, "chunk_id": 1}}
+        for i, text in enumerate(_STUB_TEXTS)
+    ]
+    store = ChunkStore.write(embedder.encode(_STUB_TEXTS), chunks, directory / "store")
+    save_index(build_faiss_index(store, "flat"), directory / "index.index")
+    embedder.calls = 0
+    return Retriever(
+        index_path=directory / "index.index", store_dir=directory / "store", embedder=embedder,
+        cache_size=0, warmup_path=None, engine="faiss", mode="dense",
+        lexical_dir=directory / "lexical", rerank=False,
+    )
+
+
+def test_retriever_stays_resident():
+    """Test that a Retriever loads once, searches from many threads and swaps artifacts on reload."""
+    try:
+        from concurrent.futures import ThreadPoolExecutor
+        with tempfile.TemporaryDirectory() as tmp:
+            retriever = _stub_retriever(Path(tmp), _StubEmbedder()).load()
+            index = retriever._index
+            first = retriever.search(_STUB_TEXTS[1], top_k=3)
+            assert first[0]["text"] == _STUB_TEXTS[1]
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                results = list(executor.map(lambda _: retriever.search(_STUB_TEXTS[1], top_k=3), range(16)))
+            assert all(result == first for result in results)
+            assert retriever._index is index
+            retriever.reload()
+            assert retriever._index is not index
+            assert retriever.search(_STUB_TEXTS[1], top_k=3) == first
+        print("✓ test_retriever_stays_resident passed")
+    except Exception as e:
+        print(f"✗ test_retriever_stays_resident failed: {e}")
+
+
+def test_retrieve_many():
+    """Test batched retrieval embeds all queries in one call and returns one ordered result list per query."""
+    try:
+        from retrieval import set_default_retriever
+        with tempfile.TemporaryDirectory() as tmp:
+            embedder = _StubEmbedder()
+            set_default_retriever(_stub_retriever(Path(tmp), embedder))
+            try:
+                queries = [_STUB_TEXTS[3], _STUB_TEXTS[0], _STUB_TEXTS[4]]
+                batched = retrieve_many(queries, top_k=2)
+                assert embedder.calls == 1
+                assert [results[0]["text"] for results in batched] == queries
+                assert all(len(results) == 2 for results in batched)
+                assert batched[1] == retrieve(queries[1], top_k=2)
+                single = retrieve_many(queries[:1], top_k=2)
+                assert len(single) == 1 and single[0] == batched[0]
+            finally:
+                set_default_retriever(None)
+        print("✓ test_retrieve_many passed")
+    except Exception as e:
+        print(f"✗ test_retrieve_many failed: {e}")
+
+
+def test_query_embedding_cache():
+    """Test LRU eviction, normalization and hit/miss counters."""
+    try:
+        cache = QueryEmbeddingCache(max_size=2)
+        cache.put("What is  attention?", np.ones(4), "model-a")
+        cache.put("What is BERT?", np.zeros(4), "model-a")
+        assert cache.get(" What is attention? ", "model-a") is not None
+        assert cache.get("What is attention?", "model-b") is None
+        cache.put("What is GPT?", np.ones(4), "model-a")  # evicts BERT
+        assert cache.get("What is BERT?", "model-a") is None
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["size"]) == (1, 2, 2)
+        print("✓ test_query_embedding_cache passed")
+    except Exception as e:
+        print(f"✗ test_query_embedding_cache failed: {e}")
+
+
+def test_build_index_types():
+    """Test that every index type finds an exact duplicate of the query."""
+    try:
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(2000, 32)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        chunks = [
+            {"embedding": v, "text": str(i), "metadata": {}}
+            for i, v in enumerate(vectors)
+        ]
+        for index_type in SUPPORTED_INDEX_TYPES:
+            if index_type == "ivf_pq":
+                continue  # Lossy PQ codes do not guarantee exact duplicates rank first
+            if index_type == "ivf_ondisk":
+                continue  # Writes a lists file; see test_ondisk_ivf_index
+            index = build_faiss_index(chunks, index_type=index_type)
+            results = search_index(vectors[:5], index, chunks, top_k=3)
+            assert [r[0]["text"] for r in results] == ["0", "1", "2", "3", "4"], index_type
+        print("✓ test_build_index_types passed")
+    except Exception as e:
+        print(f"✗ test_build_index_types failed: {e}")
+
+
+def test_update_index_keeps_type():
+    """Test that incremental updates keep the index type, even when they rebuild it."""
+    try:
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(500, 32)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        chunks = [{"embedding": v, "text": str(i), "metadata": {}} for i, v in enumerate(vectors)]
+        for index_type in SUPPORTED_INDEX_TYPES:
+            if index_type in ("ivf_pq", "ivf_ondisk"):
+                continue  # PQ needs more points per dimension; on-disk writes a lists file
+            assert index_type_of(build_faiss_index(chunks, index_type=index_type)) == index_type
+
+        # HNSW cannot delete in place, so removing ids rebuilds it
+        index = build_faiss_index(chunks[:400], index_type="hnsw")
+        index = update_faiss_index(index, chunks, np.arange(400, 500), np.arange(10))
+        assert index_type_of(index) == "hnsw"
+        try:
+            update_faiss_index(index, chunks, np.arange(0), np.arange(10, 20), index_type="flat")
+            raise AssertionError("a different index type was accepted")
+        except ValueError:
+            pass
+        print("✓ test_update_index_keeps_type passed")
+    except Exception as e:
+        print(f"✗ test_update_index_keeps_type failed: {e}")
+
+
+def test_ondisk_ivf_index():
+    """Test that an on-disk IVF index merged from batches loads, searches and rebuilds next to its lists file."""
+    try:
+        from retrieval.indexing import load_faiss_index, save_index, update_faiss_index, build_ondisk_lists
+        from retrieval.indexing import create_index, train_index
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(3000, 32)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        ids = np.arange(3000, dtype=np.int64)
+        with tempfile.TemporaryDirectory() as tmp:
+            index = create_index(32, "ivf_ondisk", num_vectors=3000)
+            train_index(index, vectors)
+            build_ondisk_lists(index, vectors, ids, Path(tmp) / "staging.ivfdata", batch_size=1000)
+            assert index.ntotal == 3000
+
+            path = Path(tmp) / "index" / "vectors.index"
+            save_index(index, path)
+            loaded = load_faiss_index(path)
+            loaded.nprobe = loaded.nlist
+            _, labels = loaded.search(vectors[:5], 1)
+            assert labels[:, 0].tolist() == [0, 1, 2, 3, 4]
+
+            chunks = [{"embedding": v, "text": str(i), "metadata": {}} for i, v in enumerate(vectors)]
+            rebuilt = update_faiss_index(loaded, chunks, np.array([], dtype=np.int64), np.array([0]), "ivf_ondisk")
+            save_index(rebuilt, path)
+            assert len(list(path.parent.glob("*.ivfdata"))) == 1
+            _, labels = loaded.search(vectors[1:2], 1)  # The old mapping stays readable
+            assert labels[0, 0] == 1
+        print("✓ test_ondisk_ivf_index passed")
+    except Exception as e:
+        print(f"✗ test_ondisk_ivf_index failed: {e}")
+
+
+def test_binary_search_rescoring():
+    """Test that binary first-stage search with rescoring finds exact duplicates."""
+    try:
+        from retrieval.binary import SUPPORTED_BINARY_INDEX_TYPES, build_binary_index, search_binary_index
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(2000, 32)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        chunks = [{"text": str(i), "metadata": {"filename": "a.pdf", "page_number": 1, "chunk_id": i}} for i in range(2000)]
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ChunkStore.write(vectors, chunks, Path(tmp) / "store")
+            for index_type in SUPPORTED_BINARY_INDEX_TYPES:
+                index = build_binary_index(store, index_type)
+                results = search_binary_index(vectors[:5], index, store, top_k=3, rescore_factor=10)
+                assert [r[0]["text"] for r in results] == ["0", "1", "2", "3", "4"], index_type
+                scores = [r["similarity_score"] for r in results[0]]
+                assert scores == sorted(scores, reverse=True) and abs(scores[0] - 1.0) < 1e-5
+        print("✓ test_binary_search_rescoring passed")
+    except Exception as e:
+        print(f"✗ test_binary_search_rescoring failed: {e}")
+
+
+def test_lexical_index_incremental():
+    """Test BM25 identifier matching, incremental updates and rank fusion."""
+    try:
+        from retrieval.store import ChunkStoreWriter
+        from retrieval.lexical import build_lexical_index, tokenize
+        from retrieval.search import reciprocal_rank_fusion
+
+        def chunk(i, text):
+            return {"text": text, "metadata": {"filename": "a.pdf", "page_number": 1, "chunk_id": i}}
+
+        assert tokenize("Replace part XJ-4410.") == ["replace", "part", "xj-4410", "xj", "4410"]
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = Path(tmp) / "store"
+            texts = ["the pump uses part XJ-4410", "the valve is rated to 10 bar", "see clause 4.2.1 for the pump"]
+            ChunkStore.write(np.zeros((3, 4)), [chunk(i, t) for i, t in enumerate(texts)], directory)
+            index = build_lexical_index(ChunkStore(directory), Path(tmp) / "lexical")
+            ids, scores = index.search("xj-4410", top_k=5)
+            assert ids.tolist() == [0] and scores[0] > 0
+            assert index.search("pump", top_k=5)[0].tolist() == [0, 2]
+
+            with ChunkStoreWriter(directory, 4, append=True) as writer:
+                writer.append(np.zeros((1, 4)), [chunk(3, "clause 4.2.1 replaced by 4.2.2")])
+                writer.delete([2])
+            index = build_lexical_index(ChunkStore(directory), Path(tmp) / "lexical")
+            assert len(index) == 3
+            assert index.search("4.2.1", top_k=5)[0].tolist() == [3]
+            assert index.vocabulary.lookup("pump") is not None and index.vocabulary.lookup("the") is not None
+
+        dense = [chunk(1, "b"), chunk(2, "c")]
+        lexical = [chunk(2, "c"), chunk(3, "d")]
+        fused = reciprocal_rank_fusion([dense, lexical], top_k=2)
+        assert [r["text"] for r in fused] == ["c", "b"]
+        print("✓ test_lexical_index_incremental passed")
+    except Exception as e:
+        print(f"✗ test_lexical_index_incremental failed: {e}")
+
+
+def test_filtered_search():
+    """Test that metadata filters are applied inside the search, on exact and selector paths."""
+    try:
+        from retrieval.filters import MetadataIndex, filtered_search
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(3000, 32)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        chunks = [
+            {"text": str(i), "metadata": {"filename": f"doc{i % 3}", "page_number": i // 3 % 100 + 1, "chunk_id": 1}}
+            for i in range(3000)
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ChunkStore.write(vectors, chunks, Path(tmp) / "store")
+            ids = MetadataIndex(store).select({"filename": "doc1", "page_number": (10, 20)})
+            assert ids.tolist() == [i for i in range(3000) if i % 3 == 1 and 10 <= i // 3 % 100 + 1 <= 20]
+
+            expected = ids[np.argsort(-(vectors[ids] @ vectors[ids[0]]))[:3]].tolist()
+            for index_type in ("flat", "hnsw"):
+                index = build_faiss_index(store, index_type=index_type)
+                results = search_index(vectors[ids[0]], index, store, top_k=3, ids=ids)
+                assert [int(r["text"]) for r in results[0]] == expected, index_type
+                _, labels = filtered_search(index, vectors[ids[:1]], 3, ids, exact_max_rows=0)
+                assert labels[0].tolist() == expected, index_type
+
+            # A legacy list-backed store is stacked once, not on every filtered query
+            legacy = [{**chunk, "embedding": vector} for chunk, vector in zip(chunks, vectors)]
+            retriever = Retriever(engine="faiss")
+            results = retriever._search(vectors[ids[:1]], index, legacy, 3, ids=ids)
+            assert [int(r["text"]) for r in results[0]] == expected
+            stacked = retriever._stacked[1]
+            retriever._search(vectors[ids[:1]], index, legacy, 3, ids=ids)
+            assert retriever._stacked[1] is stacked
+        print("✓ test_filtered_search passed")
+    except Exception as e:
+        print(f"✗ test_filtered_search failed: {e}")
+
+
+def test_cross_encoder_rerank():
+    """Test that reranking reorders candidates, caches pair scores and respects the budget."""
+    try:
+        from retrieval.rerank import CrossEncoderReranker
+
+        class FakeCrossEncoder:
+            def __init__(self):
+                self.pairs = 0
+
+            def predict(self, pairs, **kwargs):
+                self.pairs += len(pairs)
+                return [float(len(text)) for _, text in pairs]
+
+        model = FakeCrossEncoder()
+        reranker = CrossEncoderReranker(model_name="fake", latency_budget_ms=0, model=model)
+        candidates = [{"text": "a" * n, "metadata": {}, "similarity_score": 0.0} for n in (1, 3, 2)]
+        results = reranker.rerank("query", candidates, top_k=2)
+        assert [r["rerank_score"] for r in results] == [3.0, 2.0]
+        assert model.pairs == 3
+
+        reranker.rerank("  query ", candidates, top_k=2)
+        assert model.pairs == 3 and reranker.cache.hits == 3
+
+        # A budget of one pair scores the first uncached candidate only
+        reranker.latency_budget_ms, reranker.seconds_per_pair = 1, 0.001
+        more = [{"text": "b" * n, "metadata": {}, "similarity_score": 0.0} for n in (1, 5)]
+        results = reranker.rerank("query", more + candidates, top_k=5)
+        assert model.pairs == 4
+        assert [r["rerank_score"] for r in results] == [3.0, 2.0, 1.0, 1.0, None]
+        print("✓ test_cross_encoder_rerank passed")
+    except Exception as e:
+        print(f"✗ test_cross_encoder_rerank failed: {e}")
+
+
+def test_sharded_search_matches_single_index():
+    """Test that shards split by document and merged per query equal one exact index."""
+    try:
+        from retrieval.indexing import build_shards, build_shard, shard_dir, shard_of
+        from retrieval.filters import MetadataIndex
+        from retrieval.sharding import _Shard, merge_shard_results
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(3000, 32)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        chunks = [
+            {"text": str(i), "metadata": {"filename": f"doc{i % 17}", "page_number": i % 20, "chunk_id": i}}
+            for i in range(3000)
+        ]
+        queries = vectors[:20] + 0.05 * rng.normal(size=(20, 32)).astype(np.float32)
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ChunkStore.write(vectors, chunks, Path(tmp) / "store")
+            shards_dir = Path(tmp) / "shards"
+            build_shards(store, num_shards=3, index_type="flat", shards_dir=shards_dir)
+            build_shard(store, 1, 3, "flat", shards_dir)  # Rebuilding one shard leaves the rest as is
+
+            shards = [_Shard(shard_dir(i, shards_dir)) for i in range(3)]
+            assert sum(shard.size for shard in shards) == 3000
+            for shard_id, shard in enumerate(shards):
+                assert {shard_of(name, 3) for name in shard.store.filenames} <= {shard_id}
+
+            for filters in (None, {"page_number": (3, 7)}):
+                ids = MetadataIndex(store).select(filters) if filters else None
+                expected = search_index(queries, build_faiss_index(store, "flat"), store, top_k=10, ids=ids)
+                per_shard = [shard.search(queries, 10, filters) for shard in shards]
+                merged = [
+                    merge_shard_results([results[row] for results in per_shard], 10, higher_is_better=False)
+                    for row in range(len(queries))
+                ]
+                assert [[r["text"] for r in q] for q in merged] == [[r["text"] for r in q] for q in expected]
+        print("✓ test_sharded_search_matches_single_index passed")
+    except Exception as e:
+        print(f"✗ test_sharded_search_matches_single_index failed: {e}")
+
+
+def test_chunk_store_round_trip():
+    """Test that the columnar store reads back what was written."""
+    try:
+        chunks = [
+            {"text": "Attention is all you need", "metadata": {"filename": "a.pdf", "page_number": 1, "chunk_id": 1}},
+            {"text": "Ünïcode text", "metadata": {"filename": "b.pdf", "page_number": 3, "chunk_id": 2}},
+        ]
+        embeddings = np.eye(2, 4, dtype=np.float32)
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ChunkStore.write(embeddings, chunks, Path(tmp) / "store")
+            assert len(store) == 2
+            assert isinstance(store.embeddings, np.memmap)
+            assert np.array_equal(store.embeddings, embeddings)
+            for i, chunk in enumerate(chunks):
+                assert store[i]["text"] == chunk["text"]
+                assert store[i]["metadata"] == chunk["metadata"]
+        print("✓ test_chunk_store_round_trip passed")
+    except Exception as e:
+        print(f"✗ test_chunk_store_round_trip failed: {e}")
+
+
+def test_chunk_store_fingerprints():
+    """Test that stored dedup fingerprints find duplicates of new chunks without rehashing the store."""
+    try:
+        from components.data.dedup import ChunkDeduplicator
+        from retrieval.store import ChunkStoreWriter, write_fingerprints
+        base = "Transformers use self-attention to weigh every token against every other token in the sequence. " * 3
+
+        def chunk(text, filename):
+            return {"text": text, "metadata": {"filename": filename, "page_number": 1, "chunk_id": 1}}
+
+        stored = [
+            chunk(base, "a"), chunk("Convolutional networks share weights across positions.", "b"), chunk("x", "c")
+        ]
+        new = [chunk(base.replace("every other", "each other"), "d"), chunk(base.upper(), "e"), chunk("New text.", "f")]
+        dedup = ChunkDeduplicator()
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = Path(tmp) / "store"
+            with ChunkStoreWriter(directory, 4, fingerprint_params=dedup.params) as writer:
+                writer.append(np.zeros((3, 4)), stored, dedup.fingerprints(stored))
+            assert ChunkStore(directory).fingerprints(dedup.params) is not None
+
+            # Rows appended without fingerprints invalidate them until they are rewritten
+            with ChunkStoreWriter(directory, 4, append=True) as writer:
+                writer.append(np.zeros((1, 4)), [chunk(base, "g")])
+            store = ChunkStore(directory)
+            assert store.fingerprints(dedup.params) is None
+            store = write_fingerprints(store, dedup)
+
+            fingerprints = dedup.fingerprints(new)
+            rows = dedup.matching_rows(fingerprints, store.fingerprints(dedup.params))
+            assert rows.tolist() == [0, 3]
+            digests, signatures, band_keys = store.fingerprints(dedup.params)
+            dedup.add_fingerprint(store.metadata(0), digests[0], signatures[0], band_keys[0])
+            assert dedup.deduplicate_fingerprinted(new, fingerprints).tolist() == [False, False, True]
+            assert dedup.stats()["near_duplicates"] == 1 and dedup.stats()["exact_duplicates"] == 1
+        print("✓ test_chunk_store_fingerprints passed")
+    except Exception as e:
+        print(f"✗ test_chunk_store_fingerprints failed: {e}")
+
+
+def test_float16_chunk_store():
+    """Test that a float16 store keeps its dtype across appends and still indexes."""
+    try:
+        from retrieval.store import ChunkStoreWriter
+        rng = np.random.default_rng(0)
+        embeddings = rng.normal(size=(20, 8)).astype(np.float32)
+        chunks = [{"text": str(i), "metadata": {"filename": "a.pdf", "page_number": 1, "chunk_id": i}} for i in range(20)]
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = Path(tmp) / "store"
+            ChunkStore.write(embeddings[:10], chunks[:10], directory, dtype="float16")
+            with ChunkStoreWriter(directory, 8, append=True) as writer:
+                writer.append(embeddings[10:], chunks[10:])
+            store = ChunkStore(directory)
+            assert store.embeddings.dtype == np.float16
+            assert np.allclose(store.embeddings, embeddings, atol=1e-2)
+            index = build_faiss_index(store, index_type="flat")
+            results = search_index(embeddings[:3], index, store, top_k=1)
+            assert [r[0]["text"] for r in results] == ["0", "1", "2"]
+        print("✓ test_float16_chunk_store passed")
+    except Exception as e:
+        print(f"✗ test_float16_chunk_store failed: {e}")
+
+
+def test_embedder_factory():
+    """Test that the embedding backends are registered and unknown ones are rejected."""
+    try:
+        assert set(EmbedderFactory.list_backends()) >= {"sentence-transformers", "onnx"}
+        try:
+            EmbedderFactory.create("no-such-backend")
+            raise AssertionError("expected ValueError")
+        except ValueError:
+            pass
+        print("✓ test_embedder_factory passed")
+    except Exception as e:
+        print(f"✗ test_embedder_factory failed: {e}")
+
+
+class _PoolBackend(_StubEmbedder):
+    """_StubEmbedder as a registered backend (module level, so spawned pool workers can load it)."""
+
+    def __init__(self, model_name, **kwargs):
+        super().__init__()
+        self.model_name = model_name
+
+
+def test_embedding_pool_keeps_input_order():
+    """Test that EmbeddingPool rows follow the input order after length sorting, in-process and with workers."""
+    try:
+        from tokenizers import Tokenizer, models, pre_tokenizers
+        from transformers import PreTrainedTokenizerFast
+        from components.embeddings import EmbeddingPool
+
+        texts = [" ".join(f"w{j}" for j in range(n)) + f" text {i}" for i, n in enumerate([3, 40, 1, 17, 8, 25, 2, 11])]
+        with tempfile.TemporaryDirectory() as tmp:
+            # A local word-level tokenizer for the length sort, so no download is needed
+            tokenizer = Tokenizer(models.WordLevel({"<unk>": 0}, unk_token="<unk>"))
+            tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+            PreTrainedTokenizerFast(tokenizer_object=tokenizer, unk_token="<unk>").save_pretrained(tmp)
+
+            EmbedderFactory.register_backend("stub-pool", _PoolBackend)
+            try:
+                expected = _PoolBackend(model_name=tmp).encode(texts)
+                for workers in (1, 2):
+                    with EmbeddingPool(backend="stub-pool", model_name=tmp, workers=workers, batch_size=3) as pool:
+                        assert np.allclose(pool.encode(texts), expected), workers
+                        assert np.allclose(pool.encode(texts[3]), expected[3]), workers
+                        # Cache keys match the backend's own, also for registered backends
+                        assert pool.backend_name == _PoolBackend(model_name=tmp).backend_name == f"_PoolBackend:{tmp}"
+            finally:
+                EmbedderFactory.SUPPORTED_BACKENDS.pop("stub-pool")
+        print("✓ test_embedding_pool_keeps_input_order passed")
+    except Exception as e:
+        print(f"✗ test_embedding_pool_keeps_input_order failed: {e}")
+
+
+def test_embedding_cache_resume():
+    """Test that an interrupted embedding run resumes from its last checkpoint."""
+    try:
+        class CountingEmbedder(BaseEmbedder):
+            model_name = "counting"
+
+            def __init__(self, fail_after=None):
+                self.encoded = 0
+                self.fail_after = fail_after
+
+            def encode(self, sentences, **kwargs):
+                if self.fail_after is not None and self.encoded >= self.fail_after:
+                    raise RuntimeError("simulated crash")
+                self.encoded += len(sentences)
+                return np.array([[len(s), 1.0] for s in sentences], dtype=np.float32)
+
+            def get_sentence_embedding_dimension(self):
+                return 2
+
+        texts = [f"chunk {i}" * (i + 1) for i in range(10)]
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = EmbeddingCache(Path(tmp) / "cache.sqlite")
+            crashing = CountingEmbedder(fail_after=4)
+            try:
+                embed_texts(texts, crashing, show_progress_bar=False, cache=cache, checkpoint_size=4)
+            except RuntimeError:
+                pass
+            assert len(cache) == 4
+
+            model = CountingEmbedder()
+            embeddings = embed_texts(texts, model, show_progress_bar=False, cache=cache, checkpoint_size=4)
+            assert model.encoded == 6
+            assert np.array_equal(embeddings, model.encode(texts))
+            cache.close()
+        print("✓ test_embedding_cache_resume passed")
+    except Exception as e:
+        print(f"✗ test_embedding_cache_resume failed: {e}")
+
+
 if __name__ == "__main__":
     test_retrieve()
+    test_retriever_stays_resident()
+    test_retrieve_many()
+    test_query_embedding_cache()
+    test_build_index_types()
+    test_update_index_keeps_type()
+    test_ondisk_ivf_index()
+    test_binary_search_rescoring()
+    test_lexical_index_incremental()
+    test_filtered_search()
+    test_cross_encoder_rerank()
+    test_sharded_search_matches_single_index()
+    test_chunk_store_round_trip()
+    test_chunk_store_fingerprints()
+    test_float16_chunk_store()
+    test_embedder_factory()
+    test_embedding_pool_keeps_input_order()
+    test_embedding_cache_resume()
@@ -0,0 +1,119 @@
+# Test the query server
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from server import MicroBatcher, QueryServer
+
+
+class FakeRetriever:
+    """Records every search_many call instead of searching an index."""
+
+    rerank = False
+    query_cache = None
+
+    def __init__(self):
+        self.calls = []
+
+    def load(self):
+        return self
+
+    def search_many(self, queries, top_k=5, mode=None, filters=None, rerank=None):
+        self.calls.append((list(queries), filters))
+        if mode not in (None, "dense"):
+            raise ValueError(f"Unknown retrieval mode: {mode}")
+        time.sleep(0.01)
+        return [[{"text": query, "metadata": {}, "similarity_score": 1.0}][:top_k] for query in queries]
+
+
+async def _request(port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+    )
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+
+def test_micro_batcher():
+    """Test that concurrent submissions share batches capped at max_batch_size."""
+    try:
+        async def run():
+            batches = []
+
+            def process(items):
+                batches.append(list(items))
+                return [ValueError("bad") if item == "bad" else item * 2 for item in items]
+
+            batcher = MicroBatcher(process, max_batch_size=4, window_ms=50).start()
+            results = await asyncio.gather(*(batcher.submit(i) for i in range(6)))
+            try:
+                await batcher.submit("bad")
+                raise AssertionError("per-item exception was not raised")
+            except ValueError:
+                pass
+            await batcher.close()
+            return results, batches
+
+        results, batches = asyncio.run(run())
+        assert results == [0, 2, 4, 6, 8, 10]
+        assert [len(batch) for batch in batches] == [4, 2, 1]
+        print("✓ test_micro_batcher passed")
+    except Exception as e:
+        print(f"✗ test_micro_batcher failed: {e}")
+
+
+def test_query_server_endpoints():
+    """Test readiness, batched /retrieve requests and error statuses over HTTP."""
+    try:
+        async def run():
+            retriever = FakeRetriever()
+            server = QueryServer(retriever, port=0, batch_window_ms=50, warm_up_llm=False)
+            await server.start()
+            try:
+                for _ in range(100):
+                    if server.ready:
+                        break
+                    await asyncio.sleep(0.01)
+                status, payload = await _request(server.port, "GET", "/ready")
+                assert status == 200 and payload["ready"], payload
+
+                queries = [f"query {i}" for i in range(5)]
+                responses = await asyncio.gather(*(
+                    _request(server.port, "POST", "/retrieve", {"query": query, "top_k": 1}) for query in queries
+                ))
+                assert [payload["results"][0]["text"] for _, payload in responses] == queries
+                assert sorted(retriever.calls[-1][0]) == queries  # One search for all five requests
+
+                filters = {"page_number": {"min": 1, "max": 3}}
+                await _request(server.port, "POST", "/retrieve", {"query": "q", "filters": filters})
+                assert retriever.calls[-1][1] == {"page_number": (1, 3)}
+                await _request(server.port, "POST", "/retrieve", {"query": "q", "filters": {"page_number": {"min": 2}}})
+                assert retriever.calls[-1][1] == {"page_number": (2, float("inf"))}
+                bad_range = {"query": "q", "filters": {"page_number": {"min": "2"}}}
+                assert (await _request(server.port, "POST", "/retrieve", bad_range))[0] == 400
+
+                assert (await _request(server.port, "POST", "/retrieve", {"query": ""}))[0] == 400
+                assert (await _request(server.port, "POST", "/retrieve", {"query": "q", "mode": "x"}))[0] == 400
+                assert (await _request(server.port, "GET", "/retrieve"))[0] == 405
+                assert (await _request(server.port, "GET", "/missing"))[0] == 404
+            finally:
+                await server.close()
+
+        asyncio.run(run())
+        print("✓ test_query_server_endpoints passed")
+    except Exception as e:
+        print(f"✗ test_query_server_endpoints failed: {e}")
+
+
+if __name__ == "__main__":
+    test_micro_batcher()
+    test_query_server_endpoints()
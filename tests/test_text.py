@@ -0,0 +1,126 @@
+# Test text utilities
+import re
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from components.data.dedup import ChunkDeduplicator
+from utils import clean_text, chunk_text, chunk_spans, chunk_texts_by_tokens, split_sentences
+
+
+class WhitespaceTokenizer:
+    """Minimal fast-tokenizer stand-in: one token per word, with offsets."""
+
+    def __call__(self, texts, **kwargs):
+        return {"offset_mapping": [[m.span() for m in re.finditer(r"\S+", text)] for text in texts]}
+
+
+def test_clean_text():
+    """Test page-number removal, whitespace flattening and control stripping."""
+    try:
+        assert clean_text("Intro\n\nPage 2 of 10\tnext  line") == "Intro next line"
+        assert clean_text("a \x00 b\x07c") == "a  bc"
+        assert clean_text("café\u200b naïve  数据") == "café naïve 数据"
+        assert clean_text("") == ""
+        print("✓ test_clean_text passed")
+    except Exception as e:
+        print(f"✗ test_clean_text failed: {e}")
+
+
+def test_chunk_spans():
+    """Test that chunk offsets match the chunks produced by chunk_text."""
+    try:
+        text = "abcdefghij" * 7
+        spans = chunk_spans(len(text), chunk_size=20, overlap=5)
+        assert spans[0] == (0, 20) and spans[1] == (15, 35)
+        assert spans[-1][1] == len(text)
+        assert [text[s:e] for s, e in spans] == chunk_text(text, chunk_size=20, overlap=5)
+        assert chunk_spans(0) == []
+        print("✓ test_chunk_spans passed")
+    except Exception as e:
+        print(f"✗ test_chunk_spans failed: {e}")
+
+
+def test_split_sentences():
+    """Test sentence offsets."""
+    try:
+        text = 'First one. "Second!" Third? tail'
+        assert [text[s:e] for s, e in split_sentences(text)] == ["First one.", '"Second!"', "Third?", "tail"]
+        assert split_sentences("") == []
+        print("✓ test_split_sentences passed")
+    except Exception as e:
+        print(f"✗ test_split_sentences failed: {e}")
+
+
+def test_chunk_texts_by_tokens():
+    """Test sentence-aligned chunks stay within the token budget."""
+    try:
+        page = "One two three. Four five. Six seven eight nine. Ten."
+        long_page = " ".join(f"w{i}" for i in range(25))
+        chunks = chunk_texts_by_tokens([page, long_page, ""], WhitespaceTokenizer(), max_tokens=6, overlap_tokens=2)
+
+        assert chunks[0] == ["One two three. Four five.", "Four five. Six seven eight nine.", "Ten."]
+        assert all(len(chunk.split()) <= 6 for chunk in chunks[1])
+        assert " ".join(chunks[1]) == long_page
+        assert chunks[2] == []
+        print("✓ test_chunk_texts_by_tokens passed")
+    except Exception as e:
+        print(f"✗ test_chunk_texts_by_tokens failed: {e}")
+
+
+def test_chunk_deduplicator():
+    """Test exact and near-duplicate chunks are dropped and mapped to the canonical chunk."""
+    try:
+        base = "Transformers use self-attention to weigh every token against every other token in the sequence. " * 3
+
+        def chunk(text, filename, page):
+            return {"text": text, "metadata": {"filename": filename, "page_number": page, "chunk_id": 1}}
+
+        chunks = [
+            chunk(base, "a", 1),
+            chunk(base.upper(), "b", 1),  # exact after normalization
+            chunk(base.replace("every other", "each other"), "c", 2),  # near duplicate
+            chunk("Convolutional networks share weights across spatial positions.", "d", 3),
+        ]
+        dedup = ChunkDeduplicator()
+        unique = dedup.deduplicate(chunks)
+
+        assert [c["metadata"]["filename"] for c in unique] == ["a", "d"]
+        assert dedup.stats() == {"kept": 2, "exact_duplicates": 1, "near_duplicates": 1}
+        assert [d["filename"] for d in dedup.duplicates.get(chunks[0]["metadata"])] == ["b", "c"]
+        print("✓ test_chunk_deduplicator passed")
+    except Exception as e:
+        print(f"✗ test_chunk_deduplicator failed: {e}")
+
+
+def test_duplicate_map_remove_files():
+    """Test stale duplicates are pruned and orphans of a removed canonical are returned."""
+    try:
+        text = "Every page of this report is confidential and intended only for the named recipient."
+
+        def chunk(filename, page):
+            return {"text": text, "metadata": {"filename": filename, "page_number": page, "chunk_id": 1}}
+
+        # Seeded chunks are canonical without being checked themselves
+        dedup = ChunkDeduplicator()
+        dedup.add(chunk("a", 1))
+        assert dedup.deduplicate([chunk("b", 2), chunk("c", 3)]) == []
+
+        orphans = dedup.duplicates.remove_files(["c"])
+        assert orphans == [] and [d["filename"] for d in dedup.duplicates.get(chunk("a", 1)["metadata"])] == ["b"]
+        orphans = dedup.duplicates.remove_files(["a"])
+        assert [d["filename"] for d in orphans] == ["b"] and len(dedup.duplicates) == 0
+        print("✓ test_duplicate_map_remove_files passed")
+    except Exception as e:
+        print(f"✗ test_duplicate_map_remove_files failed: {e}")
+
+
+if __name__ == "__main__":
+    test_clean_text()
+    test_chunk_spans()
+    test_split_sentences()
+    test_chunk_texts_by_tokens()
+    test_chunk_deduplicator()
+    test_duplicate_map_remove_files()